@@ -14,6 +14,193 @@ class Settings(BaseSettings):
     frontend_url: str = "http://localhost:3000"
     log_level: str = "INFO"
 
+    # Upstream base URLs (overridable to point at local stubs)
+    ncbi_base_url: str = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+    clinical_trials_base_url: str = "https://clinicaltrials.gov/api/v2"
+    europe_pmc_base_url: str = "https://www.ebi.ac.uk/europepmc/webservices/rest"
+    openalex_base_url: str = "https://api.openalex.org"
+    # Empty uses the OpenAI SDK default (or OPENAI_BASE_URL)
+    openai_base_url: str = ""
+
+    # Shared HTTP connection pools (one pooled client per upstream host)
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http2_enabled: bool = True
+
+    # Per-source request timeouts in seconds
+    pubmed_timeout: float = 30.0
+    clinical_trials_timeout: float = 30.0
+    europe_pmc_timeout: float = 30.0
+    openalex_timeout: float = 30.0
+    espell_timeout: float = 10.0
+
+    # Per-source caps on concurrent calls (0 = only the adaptive limiter applies);
+    # calls over the cap queue for a slot
+    pubmed_max_concurrency: int = 0
+    clinical_trials_max_concurrency: int = 0
+    europe_pmc_max_concurrency: int = 0
+    openalex_max_concurrency: int = 0
+
+    # Retries of source calls on transport errors and 429/5xx responses (5xx
+    # only for PubMed, whose 429s the NCBI scheduler already retries), with
+    # exponential backoff and full jitter (Retry-After honored, up to the max);
+    # the per-source timeout bounds a call including its retries
+    source_retries: int = 1
+    source_retry_backoff: float = 0.2
+    source_retry_max_backoff: float = 2.0
+
+    # Sources a search fans out to unless the request picks its own
+    # (comma-separated connector names; empty = every registered connector)
+    search_sources: str = ""
+
+    # Shared NCBI E-utilities scheduler (0 = 3 req/s, or 10 with an API key)
+    ncbi_rate_limit: float = 0.0
+    ncbi_max_retries: int = 2
+    ncbi_efetch_batching: bool = False
+    ncbi_efetch_batch_window: float = 0.02
+    ncbi_efetch_batch_max: int = 200
+
+    # PubMed deep retrieval (history server + paged EFetch) for exports
+    pubmed_deep_page_size: int = 500
+    pubmed_deep_concurrency: int = 3
+    pubmed_deep_max_records: int = 10_000
+
+    # Offload of CPU-bound parsing: "thread", "process" or "off"; payloads
+    # smaller than offload_min_bytes are parsed inline on the event loop
+    offload_mode: str = "thread"
+    offload_workers: int = 4
+    offload_min_bytes: int = 64 * 1024
+
+    # Request-level latency budget for the source fan-out; late sources are cancelled
+    search_deadline: float = 8.0
+
+    # Result ranking: reciprocal-rank fusion of per-source positions plus a BM25
+    # ranking over title/abstract; responses are trimmed to the global top K
+    search_top_k: int = 20
+    rank_rrf_k: int = 60
+    rank_bm25_weight: float = 1.0
+
+    # Hedged requests: re-issue a call once it runs past the source's observed p95
+    hedging_enabled: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_samples: int = 20
+
+    # Per-source circuit breakers (slow calls count as failures)
+    breaker_failure_rate: float = 0.5
+    breaker_min_calls: int = 10
+    breaker_window: int = 50
+    breaker_slow_call_seconds: float = 10.0
+    breaker_open_seconds: float = 30.0
+    breaker_half_open_calls: int = 2
+
+    # Per-source AIMD concurrency limits
+    limiter_initial: float = 20.0
+    limiter_min: float = 2.0
+    limiter_max: float = 100.0
+    limiter_latency_target: float = 5.0
+    limiter_backoff: float = 0.7
+
+    # /api/search response cache (in-process LRU, optional SQLite second tier)
+    search_cache_enabled: bool = True
+    search_cache_size: int = 512
+    search_cache_ttl: float = 600.0
+    search_cache_sqlite_path: str = ""
+    search_cache_sqlite_max_entries: int = 10_000
+
+    # Background pre-warming of popular searches. Searches are counted in a
+    # count-min sketch (halved every prewarm_decay_interval seconds) and the
+    # prewarm_top_k most frequent, once seen prewarm_min_hits times, are
+    # refreshed when their cached result is within prewarm_lead seconds of
+    # expiring. Each prewarm_interval spends at most prewarm_budget upstream
+    # source calls (a refresh costs one per source whose SWR cache has no
+    # fresh page for it)
+    prewarm_enabled: bool = False
+    prewarm_top_k: int = 300
+    prewarm_min_hits: int = 3
+    prewarm_interval: float = 30.0
+    prewarm_lead: float = 120.0
+    prewarm_budget: int = 40
+    prewarm_concurrency: int = 2
+    prewarm_decay_interval: float = 3600.0
+    prewarm_sketch_width: int = 4096
+    prewarm_sketch_depth: int = 4
+
+    # Local study store (SQLite + FTS5, empty path disables it). In "local" search
+    # mode a query is answered from the store when it has local_min_results
+    # matches, with an upstream refresh in the background once the query was
+    # last fetched more than local_max_age seconds ago; otherwise it goes live
+    study_store_path: str = ""
+    search_mode: str = "live"
+    local_min_results: int = 5
+    local_max_age: float = 86400.0
+
+    # Cursor pagination: first-page rankings (one per search cache key) and the
+    # dedup state of searches paged past page 1, kept between pages.
+    # Cursors are HMAC-signed with cursor_secret; set it (the same value on every
+    # worker) or a random per-process key is used and cursors only work there
+    cursor_secret: str = ""
+    page_session_size: int = 1024
+    page_session_ttl: float = 1800.0
+
+    # Search detail: "full" fetches abstracts from every source, "lite" only the
+    # metadata each source returns cheaply. Lite searches hydrate the top
+    # lite_hydrate_top studies before summarizing; any study can be hydrated
+    # on demand through GET /api/study/{id} (results cached here)
+    search_detail: str = "full"
+    lite_hydrate_top: int = 15
+    study_cache_size: int = 4096
+    study_cache_ttl: float = 86400.0
+
+    # /api/search/batch: queries run at once across all batch requests
+    batch_concurrency: int = 8
+
+    # Spell-check: "blocking" waits for ESpell before searching, "speculative"
+    # searches the original query meanwhile and only re-runs on a real correction
+    spellcheck_mode: str = "blocking"
+    spell_cache_size: int = 4096
+    spell_cache_ttl: float = 604800.0
+    # Optional JSON file of {misspelling: correction} seeding the term dictionary
+    spell_dictionary_path: str = ""
+    spell_dictionary_max: int = 100_000
+
+    # Per-source result caches (seconds); stale entries are served while refreshing
+    source_cache_enabled: bool = True
+    source_cache_size: int = 1024
+    source_cache_stale_ttl: float = 3600.0
+    pubmed_cache_ttl: float = 86400.0
+    clinical_trials_cache_ttl: float = 21600.0
+    europe_pmc_cache_ttl: float = 43200.0
+    openalex_cache_ttl: float = 43200.0
+
+    # AI summary: ranked studies are packed into the prompt until it reaches
+    # summary_prompt_tokens, each abstract cut to summary_study_tokens. A
+    # completion not done (or, streaming, not started) within summary_timeout
+    # falls back to an extractive summary of the top abstracts, as does a
+    # missing API key; summary_fallback="off" returns no summary instead
+    summary_prompt_tokens: int = 2500
+    summary_study_tokens: int = 200
+    summary_max_tokens: int = 300
+    summary_timeout: float = 10.0
+    summary_fallback: str = "extractive"
+
+    # AI summary cache keyed on the fingerprint of the prompt inputs
+    summary_cache_size: int = 1024
+    summary_cache_ttl: float = 86400.0
+
+    # Per-request profiling. ?profile=true on /api/search, the profile, cache
+    # stats and upstream admin endpoints need an X-Debug-Token header matching
+    # debug_token (empty disables them); profile_sample_rate profiles that
+    # fraction of searches without the flag.
+    debug_token: str = ""
+    profile_sample_rate: float = 0.0
+    profile_interval: float = 0.005
+    profile_lag_interval: float = 0.01
+    profile_max_artifacts: int = 50
+    profile_ttl: float = 3600.0
+    # Also write <request_id>.json / .collapsed files here when set
+    profile_dir: str = ""
+
     model_config = {
         "env_file": str(_ENV_FILE) if _ENV_FILE.exists() else None,
         "env_file_encoding": "utf-8",
@@ -1,11 +1,19 @@
 import logging
 import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
-from app.routes import router
+from app.routes import prewarmer, router
+from app.services.http import close_clients, start_clients
+from app.services.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from app.services.offload import shutdown_executors, start_executors
+from app.services.summarizer import close_client as close_summary_client
+from app.services.summarizer import load_tokenizer
 
 # Configure structured logging
 logging.basicConfig(
@@ -20,17 +28,38 @@ def _check_environment() -> None:
     """Verify critical environment variables at startup."""
     warnings: list[str] = []
     if not settings.openai_api_key:
-        warnings.append("OPENAI_API_KEY is not set — AI summarization will be disabled")
+        warnings.append("OPENAI_API_KEY is not set — summaries will be extractive only")
     if not settings.ncbi_api_key:
         warnings.append("NCBI_API_KEY is not set — PubMed rate limits may apply")
     for w in warnings:
         logger.warning(w)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Open shared connection pools and parse executors, load the tokenizer and
+    start the pre-warming worker on startup; stop and close them on shutdown."""
+    _check_environment()
+    await start_clients()
+    start_executors()
+    await load_tokenizer()
+    prewarmer.start()
+    logger.info("Plato Evidence API started")
+    try:
+        yield
+    finally:
+        await prewarmer.stop()
+        await close_clients()
+        await close_summary_client()
+        shutdown_executors()
+        logger.info("Plato Evidence API stopped")
+
+
 app = FastAPI(
     title="Plato Evidence API",
     description="Medical evidence search across PubMed, ClinicalTrials.gov, Europe PMC, and OpenAlex",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS — allow the frontend origins (localhost + Vercel deployments)
@@ -50,18 +79,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend read the per-stage breakdown on cross-origin responses
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include search routes
 app.include_router(router, prefix="/api")
 
 
-@app.on_event("startup")
-async def on_startup() -> None:
-    _check_environment()
-    logger.info("Plato Evidence API started")
-
-
 @app.get("/health")
 async def health_check() -> dict:
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,102 @@
+"""Internal records used from the connectors through dedup, ranking and the response.
+
+These are slotted dataclasses rather than pydantic models: a search builds
+hundreds of studies from our own parsers, so there is nothing to validate and
+no reason to pay for it twice (on construction and again on
+``response_model`` serialization). The pydantic classes in ``schemas`` still
+describe the API for the OpenAPI docs; the JSON produced from these records
+has the same shape.
+"""
+
+import sys
+from dataclasses import dataclass, field, fields
+from typing import Any
+
+from app.models.schemas import SourceStatus
+
+OPENALEX_WORK_PREFIX = "https://openalex.org/"
+
+
+@dataclass(slots=True)
+class SourceLinkRecord:
+    """Where a (possibly merged) study was found."""
+
+    source: str
+    url: str = ""
+
+
+@dataclass(slots=True, kw_only=True)
+class StudyRecord:
+    """One study from any source; field order matches ``schemas.Study``.
+
+    Source, journal and author names repeat across studies and sources, so
+    they are interned: each distinct string is stored once. ``id`` is derived
+    from the identifiers (see ``study_id``) and recomputed on every copy.
+    """
+
+    id: str = field(init=False, default="")
+    title: str
+    authors: list[str] = field(default_factory=list)
+    abstract: str = ""
+    source: str
+    url: str = ""
+    publication_date: str = ""
+    journal: str = ""
+    doi: str = ""
+    pmid: str = ""
+    pmcid: str = ""
+    nct_id: str = ""
+    links: list[SourceLinkRecord] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        intern = sys.intern
+        self.source = intern(self.source)
+        self.journal = intern(self.journal)
+        self.authors = [intern(author) for author in self.authors]
+        self.id = study_id(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "StudyRecord":
+        """Inverse of the JSON encoding (used by the SQLite cache and study store)."""
+        links = [SourceLinkRecord(**link) for link in data.get("links", ())]
+        fields_ = {key: value for key, value in data.items() if key != "id"}
+        return cls(**{**fields_, "links": links})
+
+
+def study_id(study: StudyRecord) -> str:
+    """Stable handle for ``GET /api/study/{id}``: ``kind:value`` of the identifier
+    that can be hydrated most cheaply, or "" when the study has none."""
+    if study.pmid:
+        return f"pmid:{study.pmid}"
+    if study.nct_id:
+        return f"nct:{study.nct_id}"
+    if study.pmcid:
+        return f"pmcid:{study.pmcid}"
+    if study.doi:
+        return f"doi:{study.doi.lower()}"
+    if study.url.startswith(OPENALEX_WORK_PREFIX):
+        return f"openalex:{study.url.removeprefix(OPENALEX_WORK_PREFIX)}"
+    return ""
+
+
+@dataclass(slots=True, kw_only=True)
+class SearchResult:
+    """A search response before encoding; field order matches ``schemas.SearchResponse``."""
+
+    query: str
+    corrected_query: str = ""
+    total_results: int
+    studies: list[StudyRecord]
+    summary: str = ""
+    summary_kind: str | None = None
+    sources_queried: list[str] = field(default_factory=list)
+    source_status: list[SourceStatus] = field(default_factory=list)
+    next_cursor: str = ""
+    detail: str = "full"
+
+    def to_dict(self) -> dict[str, Any]:
+        """Shallow dict of the fields (the encoder handles the nested records)."""
+        return {name: getattr(self, name) for name in _SEARCH_RESULT_FIELDS}
+
+
+_SEARCH_RESULT_FIELDS = tuple(f.name for f in fields(SearchResult))
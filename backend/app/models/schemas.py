@@ -1,9 +1,21 @@
+from typing import Annotated, Literal
+
 from pydantic import BaseModel, Field
 
 
+class SourceLink(BaseModel):
+    """Where a (possibly merged) study was found."""
+
+    source: str
+    url: str = ""
+
+
 class Study(BaseModel):
     """Unified study representation across all data sources."""
 
+    id: str = Field(
+        default="", description="Identifier for GET /api/study/{id}, e.g. pmid:123 (empty if none)"
+    )
     title: str = Field(description="Title of the study or article")
     authors: list[str] = Field(default_factory=list, description="List of author names")
     abstract: str = Field(default="", description="Study abstract text")
@@ -12,6 +24,12 @@ class Study(BaseModel):
     publication_date: str = Field(default="", description="Publication or posting date")
     journal: str = Field(default="", description="Journal or registry name")
     doi: str = Field(default="", description="Digital Object Identifier")
+    pmid: str = Field(default="", description="PubMed ID")
+    pmcid: str = Field(default="", description="PubMed Central ID")
+    nct_id: str = Field(default="", description="ClinicalTrials.gov registry ID")
+    links: list[SourceLink] = Field(
+        default_factory=list, description="Every source this study was found in, after deduplication"
+    )
 
 
 class SearchRequest(BaseModel):
@@ -19,6 +37,53 @@ class SearchRequest(BaseModel):
 
     query: str = Field(min_length=1, max_length=500, description="Medical search query")
     max_results: int = Field(default=10, ge=1, le=50, description="Max results per source")
+    top_k: int | None = Field(
+        default=None, ge=1, le=200, description="Studies to return after ranking (default from settings)"
+    )
+    mode: Literal["live", "local"] | None = Field(
+        default=None, description="live, or local to answer from the local study store first"
+    )
+    cursor: str | None = Field(default=None, description="next_cursor from the previous page")
+    detail: Literal["full", "lite"] | None = Field(
+        default=None, description="full, or lite to skip abstracts (hydrate via /api/study/{id})"
+    )
+    sources: list[str] | None = Field(
+        default=None, description="Sources to search, e.g. ClinicalTrials (default: all enabled)"
+    )
+    profile: bool = Field(default=False, description="Profile this request (needs X-Debug-Token)")
+
+
+class BatchSearchRequest(BaseModel):
+    """Many queries searched in one request (e.g. from systematic-review tooling)."""
+
+    queries: list[Annotated[str, Field(min_length=1, max_length=500)]] = Field(
+        min_length=1, max_length=500, description="Medical search queries"
+    )
+    max_results: int = Field(default=10, ge=1, le=50, description="Max results per source")
+    top_k: int | None = Field(
+        default=None, ge=1, le=200, description="Studies to return per query after ranking"
+    )
+    mode: Literal["live", "local"] | None = Field(
+        default=None, description="live, or local to answer from the local study store first"
+    )
+    summarize: bool = Field(default=False, description="Generate an AI summary per query")
+    sources: list[str] | None = Field(
+        default=None, description="Sources to search for every query (default: all enabled)"
+    )
+
+
+class SourceStatus(BaseModel):
+    """Outcome of one upstream source for a single search."""
+
+    source: str
+    status: Literal["ok", "timeout", "error", "unavailable"] = Field(
+        description=(
+            "ok, timeout (search deadline or source timeout), error, "
+            "or unavailable (circuit open / over limit)"
+        )
+    )
+    elapsed_ms: float = Field(default=0.0, description="Time spent waiting on the source")
+    result_count: int = Field(default=0, description="Studies returned before deduplication")
 
 
 class SearchResponse(BaseModel):
@@ -28,5 +93,21 @@ class SearchResponse(BaseModel):
     corrected_query: str = Field(default="", description="Spell-corrected query (empty if no correction)")
     total_results: int
     studies: list[Study]
-    summary: str = Field(default="", description="AI-generated evidence summary")
+    summary: str = Field(default="", description="Evidence summary (see summary_kind)")
+    summary_kind: Literal["llm", "extractive"] | None = Field(
+        default=None,
+        description=(
+            "llm: AI-generated; extractive: sentences quoted from the top abstracts "
+            "(the AI summary was unavailable); null when there is no summary"
+        ),
+    )
     sources_queried: list[str] = Field(default_factory=list)
+    source_status: list[SourceStatus] = Field(
+        default_factory=list, description="Per-source status; partial results if any source failed"
+    )
+    next_cursor: str = Field(
+        default="", description="Opaque cursor for the next page; empty when there are no more results"
+    )
+    detail: Literal["full", "lite"] = Field(
+        default="full", description="lite: abstracts were not fetched, except for the summarized studies"
+    )
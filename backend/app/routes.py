@@ -1,94 +1,1064 @@
 import asyncio
 import logging
+import random
+import re
+import secrets
+import time
+from collections.abc import AsyncIterator
+from typing import Literal
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from app.models.schemas import SearchRequest, SearchResponse, Study
-from app.services.clinical_trials import search_clinical_trials
-from app.services.europe_pmc import search_europe_pmc
-from app.services.openalex import search_openalex
-from app.services.pubmed import search_pubmed
-from app.services.spellcheck import correct_query
-from app.services.summarizer import summarize_studies
+from app.config import settings
+from app.models.schemas import (
+    BatchSearchRequest,
+    SearchRequest,
+    SearchResponse,
+    SourceStatus,
+    Study,
+)
+from app.models.records import SearchResult, StudyRecord
+from app.services.cache import MISSING, SingleFlight, SQLiteCache, TieredCache, TTLCache
+from app.services.connectors import UnknownSourceError, registry
+from app.services.dedup import Deduplicator
+from app.services.encoding import FastJSONResponse, dumps, loads
+from app.services.fanout import gather_sources, iter_sources
+from app.services.hydration import (
+    InvalidStudyIdError,
+    hydrate,
+    hydrate_studies,
+    parse_study_id,
+    study_cache_stats,
+)
+from app.services.metrics import REGISTRY, Counter, Gauge, stage
+from app.services.ncbi import scheduler as ncbi_scheduler
+from app.services.paging import InvalidCursorError, SourcePage, decode_cursor, encode_cursor
+from app.services.pubmed import efetch_batch_stats, iter_pubmed_deep
+from app.services.prewarm import Prewarmer
+from app.services.profiling import get_profile, profile_request, profile_stats
+from app.services.ranking import rank_groups, rank_studies
+from app.services.spellcheck import cached_correction, correct_query, spell_stats
+from app.services.study_store import StudyStore
+from app.services.summarizer import (
+    is_cacheable,
+    stream_summary,
+    summarize_studies,
+    summary_cache_stats,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-SOURCES_QUERIED = ["PubMed", "ClinicalTrials", "EuropePMC", "OpenAlex"]
+# Reported as the only source when a search is answered from the study store
+LOCAL_SOURCE = "Local"
+# Upper bound of max_results (as in the query and request schemas), checked on cursors too
+MAX_RESULTS_PER_SOURCE = 50
+# Part of every search cache key; bump it when the cached result format changes
+# so entries in a persistent tier written in the old format are never read
+SEARCH_CACHE_VERSION = 2
 
 
-def _deduplicate_studies(studies: list[Study]) -> list[Study]:
-    """Remove duplicate studies by normalized title (lowercase, first 50 chars)."""
-    seen: set[str] = set()
-    unique: list[Study] = []
-    for study in studies:
-        key = study.title.strip().lower()[:50]
-        if key and key not in seen:
-            seen.add(key)
-            unique.append(study)
-    return unique
+def _serialize_result(result: dict) -> str:
+    return dumps(
+        {
+            "studies": result["studies"],
+            "summary": result["summary"],
+            "summary_kind": result["summary_kind"],
+            "source_status": result["source_status"],
+            "cursors": result["cursors"],
+        }
+    ).decode()
+
+
+def _deserialize_result(payload: str) -> dict:
+    data = loads(payload)
+    return {
+        "studies": [StudyRecord.from_dict(study) for study in data["studies"]],
+        "summary": data["summary"],
+        "summary_kind": data["summary_kind"],
+        "source_status": [SourceStatus(**status) for status in data["source_status"]],
+        "cursors": data["cursors"],
+    }
+
+
+def _build_search_cache() -> TieredCache | None:
+    """Response cache for /api/search: in-process LRU, plus SQLite when configured."""
+    if not settings.search_cache_enabled:
+        return None
+    tiers = [TTLCache("memory", settings.search_cache_size, settings.search_cache_ttl)]
+    if settings.search_cache_sqlite_path:
+        tiers.append(
+            SQLiteCache(
+                "sqlite",
+                settings.search_cache_sqlite_path,
+                settings.search_cache_ttl,
+                max_entries=settings.search_cache_sqlite_max_entries,
+                serialize=_serialize_result,
+                deserialize=_deserialize_result,
+            )
+        )
+    return TieredCache(tiers)
+
+
+_search_cache = _build_search_cache()
+_study_store = StudyStore(settings.study_store_path) if settings.study_store_path else None
+_local_refreshes = SingleFlight()
+_refresh_tasks: set[asyncio.Task] = set()
+# Query slots shared by every in-flight batch request
+_batch_slots = asyncio.Semaphore(settings.batch_concurrency)
+# Pagination state: first-page rankings by search cache key, sessions by id,
+# and each served follow-up page by its cursor so a retry gets the same page
+_page_sessions = TTLCache("pages", settings.page_session_size, settings.page_session_ttl)
+# Speculative spell-check outcomes: original search kept vs. discarded for a correction
+_speculation = {"kept": 0, "discarded": 0}
+
+
+async def _prewarm(key: str, params: tuple) -> None:
+    """Run a popular search again into the search cache (the pre-warming refresh)."""
+    search_query, max_results, summarize, detail, sources = params
+    await _search_cache.refresh(
+        key,
+        lambda: _fetch_evidence(search_query, max_results, summarize, detail, sources=sources),
+        should_cache=_is_complete,
+    )
+
+
+def _prewarm_cost(params: tuple) -> int:
+    """Upstream source calls a pre-warming refresh would make now; sources
+    whose SWR cache still has a fresh page cost nothing."""
+    search_query, max_results, _, detail, sources = params
+    return registry.upstream_calls(search_query, max_results, sources, detail)
+
+
+# Started and stopped by the app lifespan; only searches that go through the
+# search cache are counted
+prewarmer = Prewarmer(
+    _prewarm,
+    lambda key: _search_cache.expires_in(key) if _search_cache is not None else None,
+    _prewarm_cost,
+)
+
+
+def _search_cache_key(
+    search_query: str,
+    max_results: int,
+    summarize: bool = True,
+    detail: str = "full",
+    *,
+    sources: tuple[str, ...],
+) -> str:
+    """Normalize the (corrected query, max_results) pair into a cache key.
+
+    Results fetched without a summary, without abstracts, or from other than
+    the default sources are cached under their own keys so they never stand
+    in for a full response.
+    """
+    key = f"v{SEARCH_CACHE_VERSION}:{max_results}:{' '.join(search_query.lower().split())}"
+    if detail == "lite":
+        key = f"{key}:lite"
+    if sources != registry.select():
+        key = f"{key}:{'+'.join(sources)}"
+    return key if summarize else f"{key}:nosummary"
+
+
+def _selected_sources(requested: list[str] | None) -> tuple[str, ...]:
+    """The request's sources (default: the configured set), or a 400 for unknown ones."""
+    try:
+        return registry.select(requested)
+    except UnknownSourceError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _next_cursors(
+    pages: dict[str, SourcePage],
+    source_status: list[SourceStatus],
+    cursors: dict[str, str],
+) -> dict[str, str]:
+    """Per-source cursors for the following page.
+
+    Exhausted sources drop out; a source that failed or timed out keeps the
+    cursor it was called with so the next page retries the same slice.
+    """
+    following: dict[str, str] = {}
+    for status in source_status:
+        if status.status != "ok":
+            following[status.source] = cursors[status.source]
+        elif pages[status.source].next_cursor is not None:
+            following[status.source] = pages[status.source].next_cursor
+    return following
+
+
+def _count_search(
+    search_query: str,
+    max_results: int,
+    summarize: bool = True,
+    detail: str = "full",
+    *,
+    sources: tuple[str, ...],
+) -> None:
+    """Count a served search for pre-warming (only searches using the search cache)."""
+    if _search_cache is None:
+        return
+    key = _search_cache_key(search_query, max_results, summarize, detail, sources=sources)
+    params = (search_query, max_results, summarize, detail, sources)
+    prewarmer.record(key, params)
+
+
+def _is_complete(result: dict) -> bool:
+    """Only cache responses where every source answered and the summary is not
+    a stand-in for a failed LLM call; partial results are not cached."""
+    return (
+        bool(result["studies"])
+        and all(status.status == "ok" for status in result["source_status"])
+        and is_cacheable(result["summary_kind"])
+    )
+
+
+def _remember(
+    studies: list[StudyRecord], source_status: list[SourceStatus], answers: str | None
+) -> None:
+    """Write connector results to the local study store (when configured).
+
+    ``answers`` is the query these results are a first page for; it is only
+    marked fresh if every source answered.
+    """
+    if _study_store is not None:
+        complete = all(status.status == "ok" for status in source_status)
+        _study_store.remember(studies, answers if complete else None)
+
+
+async def _gather(
+    search_query: str,
+    max_results: int,
+    cursors: dict[str, str] | None = None,
+    detail: str = "full",
+    sources: tuple[str, ...] | None = None,
+) -> tuple[dict[str, SourcePage], list[SourceStatus]]:
+    """Query the sources in parallel within the request-level deadline.
+
+    Without ``cursors`` this is the first page of ``sources`` (default: the
+    configured set). Lite results, and results from a narrower selection, are
+    stored too (the store keeps any abstract it already has) but never mark
+    the query as fresh for local-first answers.
+    """
+    first_page = cursors is None
+    if cursors is None:
+        cursors = dict.fromkeys(sources or registry.select(), "")
+    pages, source_status = await gather_sources(
+        registry.calls(search_query, max_results, cursors, detail), settings.search_deadline
+    )
+    all_studies = [study for page in pages.values() for study in page.studies]
+    fresh = first_page and detail == "full" and tuple(cursors) == registry.select()
+    answers = search_query if fresh else None
+    _remember(all_studies, source_status, answers)
+    return pages, source_status
+
+
+async def _fetch_evidence(
+    search_query: str,
+    max_results: int,
+    summarize: bool = True,
+    detail: str = "full",
+    *,
+    sources: tuple[str, ...],
+) -> dict:
+    """Query the sources in parallel, deduplicate, rank, and (optionally) summarize.
+
+    Lite searches hydrate the abstracts of the top studies before summarizing,
+    so the summary is written from the same text as in a full search.
+    """
+    with stage("sources"):
+        pages, source_status = await _gather(search_query, max_results, None, detail, sources)
+    all_studies = [study for page in pages.values() for study in page.studies]
+
+    # Deduplicate across sources, then order by fused relevance
+    with stage("dedup"):
+        dedup = Deduplicator()
+        dedup.add_all(all_studies)
+    with stage("rank"):
+        ranked_studies = rank_studies(search_query, dedup)
+
+    logger.info(
+        "Search complete: %d total, %d after dedup",
+        len(all_studies),
+        len(ranked_studies),
+    )
+
+    if summarize and detail == "lite" and settings.lite_hydrate_top:
+        top = settings.lite_hydrate_top
+        with stage("hydrate"):
+            ranked_studies[:top] = await hydrate_studies(ranked_studies[:top])
+
+    # Generate AI summary from the best-ranked studies
+    summary, summary_kind = (
+        await _summarize(search_query, ranked_studies) if summarize else ("", None)
+    )
+    return {
+        "studies": ranked_studies,
+        "summary": summary,
+        "summary_kind": summary_kind,
+        "source_status": source_status,
+        "cursors": _next_cursors(pages, source_status, dict.fromkeys(sources, "")),
+    }
+
+
+async def _local_evidence(
+    search_query: str, max_results: int, top_k: int, summarize: bool = True
+) -> dict | None:
+    """Answer from the local study store, or None if it has too few matches.
+
+    A query not fetched upstream within ``local_max_age`` is still answered
+    locally, with a refresh from the live sources started in the background.
+    """
+    start = time.monotonic()
+    with stage("local"):
+        studies = await _study_store.search(search_query, top_k)
+    if len(studies) < min(settings.local_min_results, top_k):
+        return None
+    elapsed_ms = round((time.monotonic() - start) * 1000, 1)
+
+    fetched_at = await _study_store.fetched_at(search_query)
+    if fetched_at is None or time.time() - fetched_at > settings.local_max_age:
+        _refresh_local(search_query, max_results)
+
+    summary, summary_kind = await _summarize(search_query, studies) if summarize else ("", None)
+    status = SourceStatus(
+        source=LOCAL_SOURCE, status="ok", elapsed_ms=elapsed_ms, result_count=len(studies)
+    )
+    return {
+        "studies": studies,
+        "summary": summary,
+        "summary_kind": summary_kind,
+        "source_status": [status],
+    }
+
+
+async def _summarize(search_query: str, studies: list[StudyRecord]) -> tuple[str, str | None]:
+    with stage("summarize"):
+        return await summarize_studies(search_query, studies)
+
+
+def _refresh_local(search_query: str, max_results: int) -> None:
+    key = (" ".join(search_query.lower().split()), max_results)
+    if key in _local_refreshes:
+        return
+    task = asyncio.ensure_future(
+        _local_refreshes.do(key, lambda: _gather(search_query, max_results))
+    )
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _encode_page(
+    session_id: str,
+    q: str,
+    search_query: str,
+    max_results: int,
+    cursors: dict[str, str],
+    page: int,
+    detail: str = "full",
+    *,
+    first_page: str = "",
+    shown: list[str] | None = None,
+) -> str:
+    return encode_cursor(
+        {
+            "s": session_id,
+            "o": _normalize(q),
+            "q": search_query,
+            "n": max_results,
+            "c": cursors,
+            "p": page,
+            "d": detail,
+            "k": first_page,
+            "r": shown or [],
+        }
+    )
+
+
+def _open_session(
+    q: str,
+    search_query: str,
+    max_results: int,
+    ranked_studies: list[StudyRecord],
+    top_k: int,
+    cursors: dict[str, str],
+    detail: str = "full",
+    *,
+    key: str,
+) -> str:
+    """Return the next_cursor of a first page ("" if there is none).
+
+    Nothing is built for a first page, which is often a cache hit never paged
+    past: the ranked studies are kept under the search cache ``key`` (so
+    repeats of a search share one entry) and the cursor carries the IDs of
+    the studies shown. The dedup state is built when the cursor is redeemed.
+    """
+    if not cursors and len(ranked_studies) <= top_k:
+        return ""
+    _page_sessions.set_nowait(("first", key), ranked_studies)
+    return _encode_page(
+        "",
+        q,
+        search_query,
+        max_results,
+        cursors,
+        page=2,
+        detail=detail,
+        first_page=key,
+        shown=[study.id for study in ranked_studies[:top_k] if study.id],
+    )
+
+
+def _seed_session(first_page: str, shown_ids: set[str]) -> dict:
+    """Session state for page 2: every ranked study of the first page, with the
+    ones shown marked as returned, so follow-up slices merge into (and never
+    repeat) what was shown and the rest are carried over. If the first page
+    is no longer kept, the state starts empty.
+    """
+    dedup = Deduplicator()
+    ranked = _page_sessions.get_nowait(("first", first_page)) if first_page else MISSING
+    if ranked is not MISSING:
+        dedup.add_all([study for study in ranked if study.id in shown_ids])
+    returned = set(dedup.group_ids())
+    if ranked is not MISSING:
+        dedup.add_all([study for study in ranked if study.id not in shown_ids])
+    return {"dedup": dedup, "returned": returned, "shown_ids": shown_ids}
+
+
+async def _next_page(q: str, cursor: str, top_k: int) -> SearchResult:
+    """Serve a follow-up page: fetch only the next slice from each source that
+    has one, merge it into the session's dedup state and return the best
+    studies not shown on an earlier page. Follow-up pages carry no summary.
+
+    If the session has expired (or lives in another worker) the page is still
+    served from the per-source cursors, without the earlier pages' state
+    beyond the first page's study IDs.
+    """
+    try:
+        state = decode_cursor(cursor)
+        session_id, search_query = str(state["s"]), str(state["q"])
+        max_results, page = int(state["n"]), int(state["p"])
+        cursors = {str(label): str(token) for label, token in state["c"].items()}
+        detail, original = str(state["d"]), str(state["o"])
+        first_page, shown_ids = str(state["k"]), {str(study_id) for study_id in state["r"]}
+    except (InvalidCursorError, KeyError, AttributeError, TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    if not (1 <= max_results <= MAX_RESULTS_PER_SOURCE and page >= 1):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (
+        original != _normalize(q)
+        or not set(cursors) <= set(registry.names)
+        or detail not in ("full", "lite")
+    ):
+        raise HTTPException(status_code=400, detail="Cursor does not match this search")
+
+    served = _page_sessions.get_nowait(("page", cursor, top_k))
+    if served is not MISSING:
+        return served
+    session = _page_sessions.get_nowait(session_id) if session_id else MISSING
+    if session is MISSING:
+        session_id = secrets.token_urlsafe(12)
+        session = _seed_session(first_page, shown_ids)
+    dedup: Deduplicator = session["dedup"]
+    returned: set[int] = session["returned"]
+
+    pages, source_status = (
+        await _gather(search_query, max_results, cursors, detail) if cursors else ({}, [])
+    )
+    for page_result in pages.values():
+        dedup.add_all(page_result.studies)
+    shown = {dedup.root(group_id) for group_id in returned}
+    fresh = [(group_id, study) for group_id, study in rank_groups(search_query, dedup)
+             if group_id not in shown and study.id not in session["shown_ids"]]
+    top = fresh[:top_k]
+    returned.update(group_id for group_id, _ in top)
+
+    following = _next_cursors(pages, source_status, cursors)
+    next_cursor = ""
+    if following or len(fresh) > top_k:
+        _page_sessions.set_nowait(session_id, session)
+        next_cursor = _encode_page(
+            session_id, q, search_query, max_results, following, page + 1, detail
+        )
+    logger.info("Search page %d: query=%s, %d new studies", page, search_query, len(top))
+
+    response = SearchResult(
+        query=q,
+        total_results=len(top),
+        studies=[study for _, study in top],
+        sources_queried=list(cursors),
+        source_status=source_status,
+        next_cursor=next_cursor,
+        detail=detail,
+    )
+    _page_sessions.set_nowait(("page", cursor, top_k), response)
+    return response
+
+
+async def _correct(
+    q: str, corrected: str | None = None, *, cache_checked: bool = False
+) -> tuple[str, str]:
+    """Return (query to search with, corrected query or "" if unchanged).
+
+    ``corrected`` is an already-known correction, skipping the ESpell lookup;
+    ``cache_checked`` says the correction caches already missed for ``q``.
+    """
+    if corrected is None:
+        with stage("spellcheck"):
+            corrected = await correct_query(q, cache_checked=cache_checked)
+    search_query = corrected if corrected else q
+    corrected_query = corrected if corrected.lower() != q.lower() else ""
+
+    if corrected_query:
+        logger.info("Using corrected query: '%s' (original: '%s')", search_query, q)
+    return search_query, corrected_query
+
+
+async def _live_evidence(
+    search_query: str,
+    max_results: int,
+    summarize: bool = True,
+    detail: str = "full",
+    *,
+    sources: tuple[str, ...],
+) -> dict:
+    """Fan-out result for ``search_query``, through the search cache when enabled."""
+    if _search_cache is None:
+        return await _fetch_evidence(search_query, max_results, summarize, detail, sources=sources)
+    key = _search_cache_key(search_query, max_results, summarize, detail, sources=sources)
+    return await _search_cache.get_or_load(
+        key,
+        lambda: _fetch_evidence(search_query, max_results, summarize, detail, sources=sources),
+        should_cache=_is_complete,
+    )
+
+
+async def _speculative_evidence(
+    q: str,
+    max_results: int,
+    summarize: bool = True,
+    detail: str = "full",
+    *,
+    sources: tuple[str, ...],
+) -> tuple[str, str, dict]:
+    """Run ESpell and the live search on ``q`` together.
+
+    Most queries come back uncorrected, so the original search is usually the
+    answer and ESpell costs no latency. When ESpell does correct the query the
+    speculative search is cancelled (or its result dropped) and the corrected
+    query is searched instead.
+    """
+    speculative = asyncio.ensure_future(
+        _live_evidence(q, max_results, summarize, detail, sources=sources)
+    )
+    # A dropped speculative search may have failed; don't log that as unretrieved
+    speculative.add_done_callback(lambda task: task.cancelled() or task.exception())
+    try:
+        search_query, corrected_query = await _correct(q, cache_checked=True)
+        if not corrected_query:
+            _speculation["kept"] += 1
+            return q, "", await speculative
+    except BaseException:
+        speculative.cancel()
+        raise
+
+    speculative.cancel()
+    _speculation["discarded"] += 1
+    return search_query, corrected_query, await _live_evidence(
+        search_query, max_results, summarize, detail, sources=sources
+    )
 
 
 @router.get("/search", response_model=SearchResponse)
 async def search(
     q: str = Query(..., min_length=1, max_length=500, description="Search query"),
     max_results: int = Query(default=10, ge=1, le=50, description="Max results per source"),
-) -> SearchResponse:
-    """Search all medical evidence sources in parallel, deduplicate, and summarize."""
+    top_k: int | None = Query(default=None, ge=1, le=200, description="Studies to return after ranking"),
+    mode: Literal["live", "local"] | None = Query(
+        default=None, description="live, or local to answer from the local study store first"
+    ),
+    cursor: str | None = Query(default=None, description="next_cursor from the previous page"),
+    detail: Literal["full", "lite"] | None = Query(
+        default=None, description="full, or lite to skip abstracts (hydrate via /api/study/{id})"
+    ),
+    sources: list[str] | None = Query(
+        default=None,
+        description="Sources to search, repeated or comma-separated (default: all enabled)",
+    ),
+    profile: bool = Query(default=False, description="Profile this request (needs X-Debug-Token)"),
+    x_debug_token: str | None = Header(default=None),
+    x_request_id: str | None = Header(default=None),
+) -> FastJSONResponse:
+    """Search the medical evidence sources in parallel, deduplicate, rank, and summarize.
+
+    The result is encoded directly rather than re-validated through
+    ``response_model``, which only documents the shape.
+    """
     logger.info("Search request: query=%s, max_results=%d", q, max_results)
+    top_k = top_k or settings.search_top_k
+    if profile:
+        _check_debug_token(x_debug_token)
+    elif not (settings.profile_sample_rate and random.random() < settings.profile_sample_rate):
+        result = await _dispatch_search(q, max_results, top_k, mode, cursor, detail, sources)
+        return FastJSONResponse(result.to_dict())
 
-    # Step 1: Spell-correct the query via NCBI ESpell
-    corrected = await correct_query(q)
-    search_query = corrected if corrected else q
-    corrected_query = corrected if corrected.lower() != q.lower() else ""
+    # Profiled: the artifact is kept under the request ID returned in the header
+    request_id = _request_id(x_request_id)
+    context = {
+        "query": q,
+        "max_results": max_results,
+        "top_k": top_k,
+        "mode": mode,
+        "cursor": cursor,
+        "detail": detail,
+        "sources": sources,
+    }
+    async with profile_request(request_id, context, sampled=not profile):
+        result = await _dispatch_search(q, max_results, top_k, mode, cursor, detail, sources)
+    return FastJSONResponse(result.to_dict(), headers={"X-Request-ID": request_id})
 
-    if corrected_query:
-        logger.info("Using corrected query: '%s' (original: '%s')", search_query, q)
 
-    # Step 2: Query all four sources in parallel using asyncio.gather
-    pubmed_results, ct_results, epmc_results, oalex_results = await asyncio.gather(
-        search_pubmed(search_query, max_results),
-        search_clinical_trials(search_query, max_results),
-        search_europe_pmc(search_query, max_results),
-        search_openalex(search_query, max_results),
-        return_exceptions=True,
+async def _dispatch_search(
+    q: str,
+    max_results: int,
+    top_k: int,
+    mode: str | None,
+    cursor: str | None,
+    detail: str | None,
+    sources: list[str] | None = None,
+) -> SearchResult:
+    if cursor:
+        # The cursor carries the detail level and sources of the first page
+        return await _next_page(q, cursor, top_k)
+    return await _run_search(
+        q,
+        max_results,
+        top_k,
+        mode,
+        detail=detail or settings.search_detail,
+        sources=_selected_sources(sources),
     )
 
-    # Collect results, treating exceptions as empty lists
-    all_studies: list[Study] = []
-    for label, result in zip(
-        SOURCES_QUERIED,
-        [pubmed_results, ct_results, epmc_results, oalex_results],
-    ):
-        if isinstance(result, BaseException):
-            logger.error("Source %s returned an exception: %s", label, result)
-        else:
-            all_studies.extend(result)
 
-    # Deduplicate by title similarity
-    unique_studies = _deduplicate_studies(all_studies)
+def _check_debug_token(token: str | None) -> None:
+    if not settings.debug_token:
+        raise HTTPException(status_code=403, detail="Debug endpoints are disabled")
+    if not token or not secrets.compare_digest(token, settings.debug_token):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
 
-    logger.info(
-        "Search complete: %d total, %d after dedup",
-        len(all_studies),
-        len(unique_studies),
+
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+def _request_id(requested: str | None) -> str:
+    """The caller's X-Request-ID when it is safe to use as a file name, else a new one."""
+    if requested and _REQUEST_ID.fullmatch(requested) and requested.strip("."):
+        return requested
+    return secrets.token_hex(8)
+
+
+async def _run_search(
+    q: str,
+    max_results: int,
+    top_k: int,
+    mode: str | None,
+    summarize: bool = True,
+    detail: str = "full",
+    *,
+    sources: tuple[str, ...],
+) -> SearchResult:
+    """Spell-correct, then answer locally or fan out; shared by single and batch search.
+
+    The study store holds every source's studies, so only searches over the
+    default sources are answered from it.
+    """
+    local = (
+        (mode or settings.search_mode) == "local"
+        and _study_store is not None
+        and sources == registry.select()
     )
 
-    # Generate AI summary
-    summary = await summarize_studies(search_query, unique_studies)
+    # Step 1: Spell-correct the query via NCBI ESpell. In speculative mode the
+    # live search starts on the original query while ESpell is in flight.
+    speculate = settings.spellcheck_mode == "speculative" and not local
+    known = cached_correction(q) if speculate else None
+    if speculate and known is None:
+        search_query, corrected_query, result = await _speculative_evidence(
+            q, max_results, summarize, detail, sources=sources
+        )
+    else:
+        search_query, corrected_query = await _correct(q, known)
+
+        # Step 2: Local-first mode answers from the study store when it can
+        if local:
+            local_result = await _local_evidence(search_query, max_results, top_k, summarize)
+            if local_result is not None:
+                return SearchResult(
+                    query=q,
+                    corrected_query=corrected_query,
+                    total_results=len(local_result["studies"]),
+                    studies=local_result["studies"],
+                    summary=local_result["summary"],
+                    summary_kind=local_result["summary_kind"],
+                    sources_queried=[LOCAL_SOURCE],
+                    source_status=local_result["source_status"],
+                )
+
+        # Step 3: Fan out to the sources and summarize (cached per corrected query)
+        result = await _live_evidence(search_query, max_results, summarize, detail, sources=sources)
+    # Counted for the query actually served, never a dropped speculative one
+    _count_search(search_query, max_results, summarize, detail, sources=sources)
+    top_studies: list[StudyRecord] = result["studies"][:top_k]
+    next_cursor = _open_session(
+        q,
+        search_query,
+        max_results,
+        result["studies"],
+        top_k,
+        result["cursors"],
+        detail,
+        key=_search_cache_key(search_query, max_results, summarize, detail, sources=sources),
+    )
 
-    return SearchResponse(
+    return SearchResult(
         query=q,
         corrected_query=corrected_query,
-        total_results=len(unique_studies),
-        studies=unique_studies,
-        summary=summary,
-        sources_queried=SOURCES_QUERIED,
+        total_results=len(top_studies),
+        studies=top_studies,
+        summary=result["summary"],
+        summary_kind=result["summary_kind"],
+        sources_queried=list(sources),
+        source_status=result["source_status"],
+        next_cursor=next_cursor,
+        detail=detail,
     )
 
 
 @router.post("/search", response_model=SearchResponse)
-async def search_post(request: SearchRequest) -> SearchResponse:
+async def search_post(
+    request: SearchRequest,
+    x_debug_token: str | None = Header(default=None),
+    x_request_id: str | None = Header(default=None),
+) -> FastJSONResponse:
     """POST endpoint — delegates to the GET handler."""
-    return await search(q=request.query, max_results=request.max_results)
+    return await search(
+        q=request.query,
+        max_results=request.max_results,
+        top_k=request.top_k,
+        mode=request.mode,
+        cursor=request.cursor,
+        detail=request.detail,
+        sources=request.sources,
+        profile=request.profile,
+        x_debug_token=x_debug_token,
+        x_request_id=x_request_id,
+    )
+
+
+def _ndjson(event: str, **payload: object) -> bytes:
+    return dumps({"event": event, **payload}) + b"\n"
+
+
+async def _batch_events(
+    request: BatchSearchRequest, sources: tuple[str, ...]
+) -> AsyncIterator[bytes]:
+    """Run each distinct query once, bounded by the shared batch semaphore, and
+    emit one NDJSON frame per query in completion order."""
+    indices: dict[str, list[int]] = {}
+    for index, query in enumerate(request.queries):
+        indices.setdefault(" ".join(query.lower().split()), []).append(index)
+    top_k = request.top_k or settings.search_top_k
+
+    async def run(key: str) -> tuple[str, SearchResult | Exception]:
+        async with _batch_slots:
+            query = request.queries[indices[key][0]]
+            try:
+                return key, await _run_search(
+                    query, request.max_results, top_k, request.mode, request.summarize, sources=sources
+                )
+            except Exception as exc:
+                logger.exception("Batch query failed: %s", query)
+                return key, exc
+
+    tasks = [asyncio.ensure_future(run(key)) for key in indices]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, response = await next_done
+            if isinstance(response, Exception):
+                failed += 1
+                detail = response.detail if isinstance(response, HTTPException) else str(response)
+                yield _ndjson(
+                    "error",
+                    indices=indices[key],
+                    query=request.queries[indices[key][0]],
+                    detail=detail or type(response).__name__,
+                )
+                continue
+            yield _ndjson("result", indices=indices[key], **response.to_dict())
+    finally:
+        # Client went away: stop the queries that have not finished
+        for task in tasks:
+            task.cancel()
+    yield _ndjson("done", queries=len(request.queries), unique=len(indices), failed=failed)
+
+
+@router.post("/search/batch")
+async def search_batch(request: BatchSearchRequest) -> StreamingResponse:
+    """Search many queries in one request, streaming NDJSON results as each completes.
+
+    Identical queries (ignoring case and spacing) run once and their frame lists
+    every position they appeared at. All batches share ``batch_concurrency``
+    query slots, plus the usual connection pools, rate limits and caches.
+    """
+    logger.info("Batch search request: %d queries", len(request.queries))
+    sources = _selected_sources(request.sources)
+    return StreamingResponse(
+        _batch_events(request, sources),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _studies_frame(status: SourceStatus, studies: list[StudyRecord]) -> bytes:
+    return _ndjson("studies", **status.model_dump(), studies=studies)
+
+
+def _ranked_frame(studies: list[StudyRecord], top_k: int) -> bytes:
+    return _ndjson("ranked", studies=studies[:top_k])
+
+
+async def _search_events(
+    q: str, max_results: int, top_k: int, sources: tuple[str, ...]
+) -> AsyncIterator[bytes]:
+    """Produce NDJSON frames: correction, per-source studies, ranked top K, summary deltas, summary."""
+    search_query, corrected_query = await _correct(q)
+    yield _ndjson("correction", query=q, corrected_query=corrected_query)
+
+    cache_key = _search_cache_key(search_query, max_results, sources=sources)
+    _count_search(search_query, max_results, sources=sources)
+    cached = await _search_cache.get(cache_key) if _search_cache is not None else MISSING
+    if cached is not MISSING:
+        for status in cached["source_status"]:
+            group = [study for study in cached["studies"] if study.source == status.source]
+            yield _studies_frame(status, group)
+        yield _ranked_frame(cached["studies"], top_k)
+        yield _ndjson(
+            "summary",
+            summary=cached["summary"],
+            summary_kind=cached["summary_kind"],
+            total_results=min(len(cached["studies"]), top_k),
+            sources_queried=list(sources),
+            next_cursor=_open_session(
+                q,
+                search_query,
+                max_results,
+                cached["studies"],
+                top_k,
+                cached["cursors"],
+                key=cache_key,
+            ),
+        )
+        return
+
+    # Frames carry each group's first record as it arrives; once every source
+    # is in, the merged records are ranked for the summary and the cache
+    dedup = Deduplicator()
+    pages: dict[str, SourcePage] = {}
+    all_studies: list[StudyRecord] = []
+    source_status: list[SourceStatus] = []
+    async for page, status in iter_sources(
+        registry.calls(search_query, max_results, dict.fromkeys(sources, "")),
+        settings.search_deadline,
+    ):
+        pages[status.source] = page
+        source_status.append(status)
+        all_studies.extend(page.studies)
+        yield _studies_frame(status, dedup.add_all(page.studies))
+    _remember(all_studies, source_status, search_query if sources == registry.select() else None)
+    ranked_studies = rank_studies(search_query, dedup)
+    yield _ranked_frame(ranked_studies, top_k)
+
+    parts: list[str] = []
+    summary_kind = None
+    async for delta, summary_kind in stream_summary(search_query, ranked_studies):
+        parts.append(delta)
+        yield _ndjson("summary_delta", text=delta, summary_kind=summary_kind)
+    summary = "".join(parts).strip()
+
+    cursors = _next_cursors(pages, source_status, dict.fromkeys(sources, ""))
+    result = {
+        "studies": ranked_studies,
+        "summary": summary,
+        "summary_kind": summary_kind if summary else None,
+        "source_status": source_status,
+        "cursors": cursors,
+    }
+    if _search_cache is not None and _is_complete(result):
+        await _search_cache.set(cache_key, result)
+
+    yield _ndjson(
+        "summary",
+        summary=summary,
+        summary_kind=result["summary_kind"],
+        total_results=min(len(ranked_studies), top_k),
+        sources_queried=list(sources),
+        next_cursor=_open_session(
+            q, search_query, max_results, ranked_studies, top_k, cursors, key=cache_key
+        ),
+    )
+
+
+@router.get("/search/stream")
+async def search_stream(
+    q: str = Query(..., min_length=1, max_length=500, description="Search query"),
+    max_results: int = Query(default=10, ge=1, le=50, description="Max results per source"),
+    top_k: int | None = Query(default=None, ge=1, le=200, description="Studies to return after ranking"),
+    sources: list[str] | None = Query(
+        default=None,
+        description="Sources to search, repeated or comma-separated (default: all enabled)",
+    ),
+) -> StreamingResponse:
+    """Stream search progress as NDJSON frames while each source completes."""
+    logger.info("Streaming search request: query=%s, max_results=%d", q, max_results)
+    selected = _selected_sources(sources)
+    return StreamingResponse(
+        _search_events(q, max_results, top_k or settings.search_top_k, selected),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _export_lines(q: str, limit: int) -> AsyncIterator[bytes]:
+    count = 0
+    try:
+        async for study in iter_pubmed_deep(q, limit):
+            count += 1
+            yield dumps(study) + b"\n"
+    except Exception:
+        logger.exception("PubMed export failed for query: %s", q)
+        yield _ndjson("error", message="PubMed export failed", exported=count)
+        return
+    logger.info("PubMed export complete: query=%s, records=%d", q, count)
+
+
+@router.get("/export/pubmed")
+async def export_pubmed(
+    q: str = Query(..., min_length=1, max_length=500, description="PubMed query"),
+    limit: int = Query(
+        default=1000, ge=1, le=settings.pubmed_deep_max_records, description="Max records"
+    ),
+) -> StreamingResponse:
+    """Stream a large PubMed result set as NDJSON, one Study per line."""
+    logger.info("PubMed export request: query=%s, limit=%d", q, limit)
+    return StreamingResponse(_export_lines(q, limit), media_type="application/x-ndjson")
+
+
+@router.get("/study/{study_id:path}", response_model=Study)
+async def get_study(study_id: str) -> FastJSONResponse:
+    """One study with its abstract, by the ``id`` from a search result (e.g. ``pmid:123``).
+
+    Served from the local study store when it already holds the abstract,
+    otherwise hydrated from the upstream source and remembered.
+    """
+    try:
+        kind, value = parse_study_id(study_id)
+    except InvalidStudyIdError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    key = f"{kind}:{value}"
+    if _study_store is not None and (stored := await _study_store.get(key)) and stored.abstract:
+        return FastJSONResponse(stored)
+    try:
+        with stage("hydrate"):
+            study = await hydrate(key)
+    except Exception as exc:
+        logger.exception("Study hydration failed for %s", study_id)
+        raise HTTPException(status_code=502, detail="Upstream lookup failed") from exc
+    if study is None:
+        raise HTTPException(status_code=404, detail="Study not found")
+    _remember([study], [], None)
+    return FastJSONResponse(study)
+
+
+def _cache_metrics() -> list[Counter | Gauge]:
+    """Scrape-time view of the caches' own counters, plus NCBI queue depth."""
+    hits = Counter("evidence_cache_hits_total", "Cache hits", ["cache"])
+    misses = Counter("evidence_cache_misses_total", "Cache misses", ["cache"])
+    ratio = Gauge("evidence_cache_hit_ratio", "Cache hits / lookups since startup", ["cache"])
+    caches = {
+        "summary": summary_cache_stats(),
+        "spell": spell_stats(),
+        "pages": _page_sessions.stats(),
+        "studies": study_cache_stats(),
+    }
+    if _search_cache is not None:
+        for tier, stats in _search_cache.stats()["tiers"].items():
+            caches[f"search_{tier}"] = stats
+    for source, cache in registry.caches().items():
+        caches[f"source_{source.lower()}"] = cache.stats()
+    for name, stats in caches.items():
+        lookups = stats["hits"] + stats["misses"]
+        hits.inc(stats["hits"], cache=name)
+        misses.inc(stats["misses"], cache=name)
+        ratio.set(stats["hits"] / lookups if lookups else 0.0, cache=name)
+
+    queued = Gauge("evidence_ncbi_queued", "Requests waiting for an NCBI rate-limit slot", ["lane"])
+    for lane, stats in ncbi_scheduler.stats()["lanes"].items():
+        queued.set(stats["queued"], lane=lane)
+    return [hits, misses, ratio, queued]
+
+
+REGISTRY.register_collector(_cache_metrics)
+
+
+@router.get("/cache/stats")
+async def cache_stats(x_debug_token: str | None = Header(default=None)) -> dict:
+    """Hit/miss/eviction counters for each cache tier."""
+    _check_debug_token(x_debug_token)
+    return {
+        "search": _search_cache.stats() if _search_cache is not None else None,
+        "sources": {name: cache.stats() for name, cache in registry.caches().items()},
+        "summary": summary_cache_stats(),
+        "study_store": _study_store.stats() if _study_store is not None else None,
+        "spell": {**spell_stats(), "speculation": _speculation},
+        "profiles": profile_stats(),
+        "studies": study_cache_stats(),
+        "prewarm": prewarmer.stats(),
+    }
+
+
+@router.get("/debug/profiles/{request_id}", response_model=None)
+async def debug_profile(
+    request_id: str,
+    format: Literal["json", "collapsed"] = Query(
+        default="json", description="json summary, or collapsed stacks for flame-graph tools"
+    ),
+    x_debug_token: str | None = Header(default=None),
+) -> dict | PlainTextResponse:
+    """A recent profile by request ID: timings, event-loop lag and hottest frames."""
+    _check_debug_token(x_debug_token)
+    entry = get_profile(request_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired profile")
+    summary, collapsed = entry
+    if format == "collapsed":
+        return PlainTextResponse(collapsed)
+    return summary
+
+
+@router.get("/admin/upstreams")
+async def upstream_stats(x_debug_token: str | None = Header(default=None)) -> dict:
+    """Breaker, limiter, hedging and call policy per source, plus the NCBI scheduler."""
+    _check_debug_token(x_debug_token)
+    return {
+        "sources": registry.stats(),
+        "default_sources": list(registry.select()),
+        "ncbi": {**ncbi_scheduler.stats(), "efetch_batching": efetch_batch_stats()},
+    }
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+# Sentinel returned by cache lookups on a miss (``None`` is a valid cached value)
+MISSING: Any = object()
+
+
+class CacheTier(Protocol):
+    """A single cache level. ``get`` returns ``MISSING`` on a miss."""
+
+    name: str
+
+    async def get(self, key: str) -> Any: ...
+
+    async def set(self, key: str, value: Any) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, name: str, max_size: int, ttl: float) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_nowait(self, key: Hashable) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set_nowait(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def expires_in(self, key: Hashable) -> float | None:
+        """Seconds until ``key`` expires, or None if absent; not counted as a lookup."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return max(0.0, entry[0] - time.monotonic())
+
+    async def get(self, key: str) -> Any:
+        return self.get_nowait(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        self.set_nowait(key, value)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteCache:
+    """Persistent second-tier cache backed by a local SQLite file.
+
+    Values are stored as text produced by ``serialize``; blocking SQLite calls
+    run in a worker thread so they never stall the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        ttl: float,
+        max_entries: int = 10_000,
+        serialize: Callable[[Any], str] = json.dumps,
+        deserialize: Callable[[str], Any] = json.loads,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._serialize = serialize
+        self._deserialize = deserialize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+            value, expires_at = row
+            if expires_at <= time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+        return self._deserialize(value)
+
+    def _set(self, key: str, value: Any) -> None:
+        payload = self._serialize(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, time.time() + self.ttl),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY expires_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    async def get(self, key: str) -> Any:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight call.
+
+    The call runs as its own task, so a caller that is cancelled (e.g. a client
+    disconnect or a fan-out deadline) does not cancel the work other callers are
+    waiting on. Once the last waiter is cancelled the call itself is cancelled
+    and forgotten, so a caller arriving while it winds down starts a new call.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[Hashable, int] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    # Forget the dying call now so a new caller starts a fresh one
+                    del self._inflight[key]
+                    del self._waiters[key]
+                    task.cancel()
+            raise
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+class TieredCache:
+    """Look up tiers in order, back-filling faster tiers on a lower-tier hit."""
+
+    def __init__(self, tiers: list[CacheTier]) -> None:
+        self.tiers = tiers
+        self._flight = SingleFlight()
+
+    async def get(self, key: str) -> Any:
+        for i, tier in enumerate(self.tiers):
+            try:
+                value = await tier.get(key)
+            except Exception:
+                logger.exception("Cache tier %s lookup failed", tier.name)
+                continue
+            if value is not MISSING:
+                for faster in self.tiers[:i]:
+                    await faster.set(key, value)
+                return value
+        return MISSING
+
+    async def set(self, key: str, value: Any) -> None:
+        for tier in self.tiers:
+            try:
+                await tier.set(key, value)
+            except Exception:
+                logger.exception("Cache tier %s store failed", tier.name)
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """Return the cached value or run ``loader`` once for all concurrent callers."""
+        value = await self.get(key)
+        if value is not MISSING:
+            return value
+        return await self.refresh(key, loader, should_cache)
+
+    async def refresh(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """Run ``loader`` and store its result even if ``key`` is cached.
+
+        Shares the call with concurrent ``get_or_load`` misses on ``key``.
+        """
+
+        async def load() -> Any:
+            loaded = await loader()
+            if should_cache(loaded):
+                await self.set(key, loaded)
+            return loaded
+
+        return await self._flight.do(key, load)
+
+    def expires_in(self, key: str) -> float | None:
+        """Seconds until ``key`` expires in the first tier that can tell (None if absent)."""
+        for tier in self.tiers:
+            if hasattr(tier, "expires_in"):
+                return tier.expires_in(key)
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "tiers": {tier.name: tier.stats() for tier in self.tiers},
+            "coalesced": self._flight.coalesced,
+            "inflight": len(self._flight),
+        }
@@ -1,12 +1,15 @@
+import json
 import logging
 
-import httpx
-
-from app.models.schemas import Study
+from app.config import settings
+from app.models.records import StudyRecord
+from app.services.http import CLINICAL_TRIALS, fetch
+from app.services.offload import run_cpu
+from app.services.paging import SourcePage
 
 logger = logging.getLogger(__name__)
 
-CTGOV_API_URL = "https://clinicaltrials.gov/api/v2/studies"
+CTGOV_STUDIES_PATH = "/studies"
 
 # ClinicalTrials.gov requires browser-like headers to avoid WAF blocks
 _HEADERS = {
@@ -21,34 +24,62 @@ _HEADERS = {
 }
 
 
-async def search_clinical_trials(query: str, max_results: int = 10) -> list[Study]:
-    """Search ClinicalTrials.gov v2 API and return unified Study objects."""
-    studies: list[Study] = []
-    try:
-        async with httpx.AsyncClient(
-            timeout=30.0,
-            headers=_HEADERS,
-            follow_redirects=True,
-        ) as client:
-            params = {
-                "query.term": query,
-                "pageSize": max_results,
-            }
-            resp = await client.get(CTGOV_API_URL, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+async def search_clinical_trials(query: str, max_results: int = 10) -> list[StudyRecord]:
+    """Search ClinicalTrials.gov v2 API and return unified StudyRecord objects."""
+    return (await search_clinical_trials_page(query, max_results)).studies
+
+
+async def search_clinical_trials_page(
+    query: str, max_results: int = 10, cursor: str = ""
+) -> SourcePage:
+    """One page of ClinicalTrials.gov results; ``cursor`` is the nextPageToken."""
+    return await _search({"query.term": query}, max_results, cursor)
+
+
+async def search_clinical_trials_lite_page(
+    query: str, max_results: int = 10, cursor: str = ""
+) -> SourcePage:
+    """Like ``search_clinical_trials_page`` but only the fields ``_parse_trial`` reads,
+    minus the brief summary (the full records also carry eligibility, arms,
+    outcomes and locations)."""
+    params = {"query.term": query, "fields": LITE_FIELDS}
+    return await _search(params, max_results, cursor)
+
 
-            for study_data in data.get("studies", []):
-                studies.append(_parse_trial(study_data))
+async def lookup_clinical_trial(nct_id: str) -> list[StudyRecord]:
+    """The registry record for one NCT ID (empty if unknown)."""
+    return (await _search({"filter.ids": nct_id}, 1, "")).studies
 
-    except Exception:
-        logger.exception("ClinicalTrials.gov search failed for query: %s", query)
 
-    return studies
+LITE_FIELDS = "NCTId|BriefTitle|StartDate|LeadSponsorName|OverallOfficialName"
+
+
+async def _search(params: dict[str, str | int], max_results: int, cursor: str) -> SourcePage:
+    params = {**params, "pageSize": max_results}
+    if cursor:
+        params["pageToken"] = cursor
+    resp = await fetch(
+        CLINICAL_TRIALS,
+        CTGOV_STUDIES_PATH,
+        params=params,
+        headers=_HEADERS,
+        follow_redirects=True,
+        timeout=settings.clinical_trials_timeout,
+    )
+    return await run_cpu(_parse_trials_payload, resp.content, size=len(resp.content))
+
+
+def _parse_trials_payload(payload: bytes) -> SourcePage:
+    """Decode a ClinicalTrials.gov response body and parse every study."""
+    data = json.loads(payload)
+    return SourcePage(
+        studies=[_parse_trial(study_data) for study_data in data.get("studies", [])],
+        next_cursor=data.get("nextPageToken"),
+    )
 
 
-def _parse_trial(study_data: dict) -> Study:
-    """Parse a single ClinicalTrials.gov study JSON into a Study."""
+def _parse_trial(study_data: dict) -> StudyRecord:
+    """Parse a single ClinicalTrials.gov study JSON into a StudyRecord."""
     protocol = study_data.get("protocolSection", {})
     id_module = protocol.get("identificationModule", {})
     status_module = protocol.get("statusModule", {})
@@ -80,7 +111,7 @@ def _parse_trial(study_data: dict) -> Study:
 
     url = f"https://clinicaltrials.gov/study/{nct_id}" if nct_id else ""
 
-    return Study(
+    return StudyRecord(
         title=title,
         authors=authors,
         abstract=abstract,
@@ -89,4 +120,5 @@ def _parse_trial(study_data: dict) -> Study:
         publication_date=pub_date,
         journal="ClinicalTrials.gov",
         doi="",
+        nct_id=nct_id,
     )
@@ -0,0 +1,271 @@
+"""Source connectors and the registry the search fan-out runs over.
+
+A ``Connector`` is one source's page functions plus its call policy. The
+registry wraps each one in the shared call stack (timeout, concurrency cap,
+retries, breaker/limiter, hedging, SWR cache) and hands out calls by source
+name, so a source is added here and picked per request without touching the
+routes.
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import partial
+
+from app.config import settings
+from app.services.clinical_trials import (
+    search_clinical_trials_lite_page,
+    search_clinical_trials_page,
+)
+from app.services.europe_pmc import search_europe_pmc_lite_page, search_europe_pmc_page
+from app.services.fanout import HedgedSource, SourceCall
+from app.services.openalex import search_openalex_lite_page, search_openalex_page
+from app.services.paging import PageFn, SourcePage
+from app.services.pubmed import search_pubmed_lite_page, search_pubmed_page
+from app.services.resilience import GuardedSource
+from app.services.retry import RETRY_STATUSES, SERVER_ERROR_STATUSES, with_retries
+from app.services.source_cache import SourceCache
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownSourceError(ValueError):
+    """A requested source is not a registered connector."""
+
+
+@dataclass(frozen=True)
+class Connector:
+    """One upstream source and how it is called.
+
+    ``timeout`` bounds a whole call, retries included. ``max_concurrency``
+    caps calls in flight to the source (0 = only the adaptive limiter); calls
+    over the cap wait for a slot. ``retry_statuses`` are the HTTP statuses
+    retried (transport errors always are). Without a ``lite`` page function,
+    lite searches get the full pages.
+    """
+
+    name: str
+    search: PageFn
+    lite: PageFn | None = None
+    cache_ttl: float = 3600.0
+    timeout: float = 30.0
+    max_concurrency: int = 0
+    retries: int = 0
+    retry_statuses: frozenset[int] = RETRY_STATUSES
+
+
+class SourceStack:
+    """A connector wrapped for the fan-out, per detail level.
+
+    Innermost first: the concurrency slot, retries with backoff and the
+    timeout; then the breaker/limiter, hedging and (when enabled) an SWR
+    cache. Hedging sits below the cache so a hedged retry is not coalesced
+    with the call it is meant to race; the breaker sits below hedging so it
+    sees every upstream attempt. The lite variant runs under the same breaker
+    and limiter (same upstream) but hedges on its own latency and caches its
+    own pages.
+    """
+
+    def __init__(self, connector: Connector) -> None:
+        self.connector = connector
+        self._slots = (
+            asyncio.Semaphore(connector.max_concurrency) if connector.max_concurrency > 0 else None
+        )
+        self.guard = GuardedSource(connector.name, self._with_policy(connector.search))
+        self.hedged: dict[str, HedgedSource] = {}
+        self.caches: dict[str, SourceCache] = {}
+        self._calls = {"full": self._wrap("full", self.guard)}
+        if connector.lite is not None:
+            lite = partial(self.guard.call, self._with_policy(connector.lite))
+            self._calls["lite"] = self._wrap("lite", lite)
+
+    def page_fn(self, detail: str = "full") -> PageFn:
+        return self._calls.get(detail, self._calls["full"])
+
+    def upstream_calls(self, query: str, max_results: int, detail: str = "full") -> int:
+        """Upstream calls a first-page search would make here: 0 when the SWR
+        cache holds a fresh page, else 1."""
+        cache = self.caches.get(detail if detail in self._calls else "full")
+        return 0 if cache is not None and cache.is_fresh(query, max_results) else 1
+
+    def _with_policy(self, fn: PageFn) -> PageFn:
+        connector = self.connector
+
+        async def attempt(query: str, max_results: int, cursor: str) -> SourcePage:
+            if self._slots is None:
+                return await fn(query, max_results, cursor)
+            async with self._slots:
+                return await fn(query, max_results, cursor)
+
+        async def call(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+            try:
+                return await asyncio.wait_for(
+                    with_retries(
+                        connector.name,
+                        lambda: attempt(query, max_results, cursor),
+                        connector.retries,
+                        settings.source_retry_backoff,
+                        settings.source_retry_max_backoff,
+                        connector.retry_statuses,
+                    ),
+                    connector.timeout,
+                )
+            except Exception:
+                logger.exception("%s search failed for query: %s", connector.name, query)
+                raise
+
+        return call
+
+    def _wrap(self, detail: str, fn: PageFn) -> PageFn:
+        name = self.connector.name if detail == "full" else f"{self.connector.name}:{detail}"
+        hedged = HedgedSource(name, fn)
+        self.hedged[detail] = hedged
+        if not settings.source_cache_enabled:
+            return hedged
+        cache = SourceCache(
+            name,
+            hedged,
+            ttl=self.connector.cache_ttl,
+            stale_ttl=settings.source_cache_stale_ttl,
+            max_size=settings.source_cache_size,
+        )
+        self.caches[detail] = cache
+        return cache
+
+    def stats(self) -> dict[str, object]:
+        connector = self.connector
+        return {
+            **self.guard.stats(),
+            **{
+                "hedging" if detail == "full" else f"hedging_{detail}": hedged.stats()
+                for detail, hedged in self.hedged.items()
+            },
+            "policy": {
+                "timeout": connector.timeout,
+                "max_concurrency": connector.max_concurrency,
+                "retries": connector.retries,
+                "retry_statuses": sorted(connector.retry_statuses),
+                "lite": connector.lite is not None,
+            },
+        }
+
+
+class ConnectorRegistry:
+    """Registered connectors by name, in registration order."""
+
+    def __init__(self) -> None:
+        self._stacks: dict[str, SourceStack] = {}
+
+    def register(self, connector: Connector) -> SourceStack:
+        if connector.name.lower() in (name.lower() for name in self._stacks):
+            raise ValueError(f"connector {connector.name!r} is already registered")
+        stack = SourceStack(connector)
+        self._stacks[connector.name] = stack
+        return stack
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._stacks)
+
+    def __getitem__(self, name: str) -> SourceStack:
+        return self._stacks[name]
+
+    def select(self, requested: Iterable[str] | None = None) -> tuple[str, ...]:
+        """Registered names for ``requested``, in registration order.
+
+        Names match case-insensitively and may be comma-separated. Nothing
+        requested means the ``search_sources`` setting, or every connector
+        when that is empty. Raises UnknownSourceError.
+        """
+        wanted = {
+            name.strip().lower(): name.strip()
+            for entry in requested or ()
+            for name in entry.split(",")
+            if name.strip()
+        }
+        if not wanted:
+            configured = [name for name in settings.search_sources.split(",") if name.strip()]
+            if not configured:
+                return tuple(self._stacks)
+            return self.select(configured)
+        by_key = {name.lower(): name for name in self._stacks}
+        unknown = [name for key, name in wanted.items() if key not in by_key]
+        if unknown:
+            raise UnknownSourceError(
+                f"unknown source(s): {', '.join(unknown)} (available: {', '.join(self._stacks)})"
+            )
+        return tuple(name for name in self._stacks if name.lower() in wanted)
+
+    def calls(
+        self, query: str, max_results: int, cursors: dict[str, str], detail: str = "full"
+    ) -> dict[str, SourceCall]:
+        """One call per source in ``cursors``, each for the page at its cursor ("" = first)."""
+        return {
+            name: partial(self._stacks[name].page_fn(detail), query, max_results, cursor)
+            for name, cursor in cursors.items()
+        }
+
+    def upstream_calls(
+        self, query: str, max_results: int, sources: Iterable[str], detail: str = "full"
+    ) -> int:
+        """Upstream calls a first-page search of ``sources`` would make now."""
+        return sum(self._stacks[name].upstream_calls(query, max_results, detail) for name in sources)
+
+    def caches(self) -> dict[str, SourceCache]:
+        return {
+            cache.source: cache for stack in self._stacks.values() for cache in stack.caches.values()
+        }
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        return {name: stack.stats() for name, stack in self._stacks.items()}
+
+
+def default_registry() -> ConnectorRegistry:
+    """The built-in sources with their per-source settings."""
+    registry = ConnectorRegistry()
+    for connector in (
+        Connector(
+            "PubMed",
+            search_pubmed_page,
+            search_pubmed_lite_page,
+            cache_ttl=settings.pubmed_cache_ttl,
+            timeout=settings.pubmed_timeout,
+            max_concurrency=settings.pubmed_max_concurrency,
+            retries=settings.source_retries,
+            # The NCBI scheduler retries 429s itself, slowing its shared rate
+            retry_statuses=SERVER_ERROR_STATUSES,
+        ),
+        Connector(
+            "ClinicalTrials",
+            search_clinical_trials_page,
+            search_clinical_trials_lite_page,
+            cache_ttl=settings.clinical_trials_cache_ttl,
+            timeout=settings.clinical_trials_timeout,
+            max_concurrency=settings.clinical_trials_max_concurrency,
+            retries=settings.source_retries,
+        ),
+        Connector(
+            "EuropePMC",
+            search_europe_pmc_page,
+            search_europe_pmc_lite_page,
+            cache_ttl=settings.europe_pmc_cache_ttl,
+            timeout=settings.europe_pmc_timeout,
+            max_concurrency=settings.europe_pmc_max_concurrency,
+            retries=settings.source_retries,
+        ),
+        Connector(
+            "OpenAlex",
+            search_openalex_page,
+            search_openalex_lite_page,
+            cache_ttl=settings.openalex_cache_ttl,
+            timeout=settings.openalex_timeout,
+            max_concurrency=settings.openalex_max_concurrency,
+            retries=settings.source_retries,
+        ),
+    ):
+        registry.register(connector)
+    return registry
+
+
+registry = default_registry()
@@ -0,0 +1,268 @@
+import random
+import re
+import unicodedata
+import zlib
+from dataclasses import replace
+from functools import lru_cache
+
+from app.models.records import SourceLinkRecord, StudyRecord
+
+# MinHash signature length and LSH banding (bands * rows == NUM_PERM). With 16
+# bands of 4 rows a pair becomes a candidate at ~50% Jaccard similarity; every
+# candidate is then checked against TITLE_THRESHOLD on the exact token sets.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+TITLE_THRESHOLD = 0.8
+# Titles shorter than this only match exactly ("Editorial", "Reply", ...)
+MIN_TITLE_TOKENS = 4
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)
+]
+
+_DOI_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", re.IGNORECASE)
+_PMID_URL = re.compile(r"pubmed\.ncbi\.nlm\.nih\.gov/(\d+)|europepmc\.org/article/med/(\d+)")
+_PMCID = re.compile(r"PMC\d+", re.IGNORECASE)
+_NCT_ID = re.compile(r"NCT\d{8}", re.IGNORECASE)
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_doi(doi: str) -> str:
+    """Lowercase a DOI and strip resolver prefixes (https://doi.org/, doi:)."""
+    return _DOI_PREFIX.sub("", doi.strip()).lower()
+
+
+def normalize_title(title: str) -> str:
+    """Fold case, accents, punctuation and whitespace out of a title."""
+    folded = title.casefold()
+    if not folded.isascii():
+        folded = unicodedata.normalize("NFKD", folded)
+        folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", folded).split())
+
+
+def identifiers(study: StudyRecord) -> list[tuple[str, str]]:
+    """Normalized (kind, value) identifiers of a study.
+
+    A PMID, PMCID or NCT ID is also taken from the study URL when its field
+    is empty, for sources that put the identifier only in the link (e.g. a
+    registered connector returning PubMed or ClinicalTrials.gov URLs).
+    """
+    ids: list[tuple[str, str]] = []
+    if study.doi:
+        ids.append(("doi", normalize_doi(study.doi)))
+
+    pmid = study.pmid.strip()
+    if not pmid and (match := _PMID_URL.search(study.url)):
+        pmid = match.group(1) or match.group(2)
+    if pmid:
+        ids.append(("pmid", pmid))
+
+    pmcid = study.pmcid or study.url
+    if match := _PMCID.search(pmcid):
+        ids.append(("pmcid", match.group(0).upper()))
+
+    nct_id = study.nct_id or study.url
+    if match := _NCT_ID.search(nct_id):
+        ids.append(("nct", match.group(0).upper()))
+    return ids
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_hashes(token: str) -> tuple[int, ...]:
+    h = zlib.crc32(token.encode())
+    return tuple((a * h + b) % _MERSENNE for a, b in _PERMUTATIONS)
+
+
+def minhash(tokens: set[str]) -> tuple[int, ...]:
+    """MinHash signature of a non-empty token set.
+
+    Title vocabulary repeats heavily across records, so each token's NUM_PERM
+    hash values are computed once and cached; the signature is then an
+    element-wise min over the cached vectors.
+    """
+    return tuple(map(min, zip(*map(_token_hashes, tokens))))
+
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b)
+
+
+def _conflicting(a: dict[str, str], b: dict[str, str]) -> bool:
+    """Two records that carry different values for the same identifier are distinct."""
+    return any(kind in b and b[kind] != value for kind, value in a.items())
+
+
+class Deduplicator:
+    """Incrementally group studies that describe the same work.
+
+    Records are matched first on shared identifiers (DOI, PMID, PMCID, NCT ID),
+    then on an identical normalized title, then on MinHash/LSH similarity of
+    title tokens verified against ``TITLE_THRESHOLD``. Title matches are
+    refused when both records carry different values for the same identifier.
+    Each record costs O(NUM_PERM * tokens) plus its LSH candidates, so grouping
+    stays near-linear in the number of records.
+    """
+
+    def __init__(self) -> None:
+        # Group id -> indices into _records; merged-away groups are left empty
+        self._groups: list[list[int]] = []
+        self._parent: list[int] = []
+        self._by_id: dict[tuple[str, str], int] = {}
+        self._by_title: dict[str, int] = {}
+        self._buckets: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+        # Per record: (study, group it was added to, title tokens, identifiers)
+        self._records: list[tuple[StudyRecord, int, set[str], dict[str, str]]] = []
+        # Per record: 1-based position within its source's result list
+        self._positions: list[int] = []
+        self._seen_per_source: dict[str, int] = {}
+
+    def _find(self, group: int) -> int:
+        while self._parent[group] != group:
+            self._parent[group] = self._parent[self._parent[group]]
+            group = self._parent[group]
+        return group
+
+    def _union(self, a: int, b: int) -> int:
+        a, b = self._find(a), self._find(b)
+        if a != b:
+            # Keep the earlier group as the root so output order is first-seen
+            a, b = min(a, b), max(a, b)
+            self._parent[b] = a
+            self._groups[a].extend(self._groups[b])
+            self._groups[b] = []
+        return a
+
+    def add(self, study: StudyRecord) -> bool:
+        """Add a study; return True if it starts a new group (is not a duplicate)."""
+        ids = dict(identifiers(study))
+        title = normalize_title(study.title)
+        tokens = set(title.split())
+
+        matches = {self._find(self._by_id[item]) for item in ids.items() if item in self._by_id}
+        if title and title in self._by_title:
+            group = self._find(self._by_title[title])
+            if not any(_conflicting(ids, self._records[i][3]) for i in self._groups[group]):
+                matches.add(group)
+
+        bands: list[tuple[int, tuple[int, ...]]] = []
+        if len(tokens) >= MIN_TITLE_TOKENS:
+            signature = minhash(tokens)
+            bands = [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+            if not matches:
+                matches.update(self._similar(tokens, ids, bands))
+
+        index = len(self._records)
+        if matches:
+            group = min(matches)
+            for other in matches:
+                group = self._union(group, other)
+            self._groups[group].append(index)
+        else:
+            group = len(self._groups)
+            self._groups.append([index])
+            self._parent.append(group)
+        self._records.append((study, group, tokens, ids))
+        position = self._seen_per_source.get(study.source, 0) + 1
+        self._seen_per_source[study.source] = position
+        self._positions.append(position)
+        for item in ids.items():
+            self._by_id.setdefault(item, group)
+        if title:
+            self._by_title.setdefault(title, group)
+        for key in bands:
+            self._buckets.setdefault(key, []).append(index)
+        return not matches
+
+    def _similar(
+        self,
+        tokens: set[str],
+        ids: dict[str, str],
+        bands: list[tuple[int, tuple[int, ...]]],
+    ) -> set[int]:
+        candidates: set[int] = set()
+        for key in bands:
+            candidates.update(self._buckets.get(key, ()))
+        matches: set[int] = set()
+        for index in candidates:
+            _, group, other_tokens, other_ids = self._records[index]
+            if _jaccard(tokens, other_tokens) >= TITLE_THRESHOLD and not _conflicting(ids, other_ids):
+                matches.add(self._find(group))
+        return matches
+
+    def add_all(self, studies: list[StudyRecord]) -> list[StudyRecord]:
+        """Add studies in order and return those that started a new group."""
+        return [study for study in studies if self.add(study)]
+
+    def group_ids(self) -> list[int]:
+        """Stable ids of the current groups, in the same order as ``groups``."""
+        return [group_id for group_id, group in enumerate(self._groups) if group]
+
+    def root(self, group_id: int) -> int:
+        """Id of the group that ``group_id`` has since been merged into (if any)."""
+        return self._find(group_id)
+
+    def groups(self) -> list[list[StudyRecord]]:
+        """Duplicate groups in first-seen order."""
+        return [[self._records[i][0] for i in sorted(group)] for group in self._groups if group]
+
+    def positions(self) -> list[list[tuple[str, int]]]:
+        """Per group (same order as ``groups``), each member's (source, position).
+
+        Positions count records added per source, so they are source ranks as
+        long as each source's results are added in the order it returned them.
+        """
+        return [
+            [(self._records[i][0].source, self._positions[i]) for i in sorted(group)]
+            for group in self._groups
+            if group
+        ]
+
+    def merged(self) -> list[StudyRecord]:
+        """One merged record per group, in first-seen order."""
+        return [merge_group(group) for group in self.groups()]
+
+
+def merge_group(group: list[StudyRecord]) -> StudyRecord:
+    """Merge duplicate records into one.
+
+    The first record provides the source and URL. Other fields take the first
+    non-empty value, except the abstract and author list, which take the
+    longest. ``links`` lists every distinct source URL in the group.
+    """
+    primary = group[0]
+
+    def first(field: str) -> str:
+        return next((value for study in group if (value := getattr(study, field))), "")
+
+    links: list[SourceLinkRecord] = []
+    seen: set[tuple[str, str]] = set()
+    for study in group:
+        for link in study.links or [SourceLinkRecord(source=study.source, url=study.url)]:
+            if (link.source, link.url) not in seen:
+                seen.add((link.source, link.url))
+                links.append(link)
+
+    return replace(
+        primary,
+        title=first("title"),
+        authors=max((study.authors for study in group), key=len),
+        abstract=max((study.abstract for study in group), key=len),
+        publication_date=first("publication_date"),
+        journal=first("journal"),
+        doi=first("doi"),
+        pmid=first("pmid"),
+        pmcid=first("pmcid"),
+        nct_id=first("nct_id"),
+        links=links,
+    )
+
+
+def deduplicate_studies(studies: list[StudyRecord]) -> list[StudyRecord]:
+    """Collapse duplicate studies into merged records, keeping first-seen order."""
+    dedup = Deduplicator()
+    dedup.add_all(studies)
+    return dedup.merged()
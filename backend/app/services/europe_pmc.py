@@ -1,51 +1,90 @@
+import json
 import logging
 
-import httpx
-
-from app.models.schemas import Study
+from app.config import settings
+from app.models.records import StudyRecord
+from app.services.http import EUROPE_PMC, fetch
+from app.services.offload import run_cpu
+from app.services.paging import SourcePage
 
 logger = logging.getLogger(__name__)
 
-EPMC_API_URL = "https://www.ebi.ac.uk/europepmc/webservices/rest/search"
+EPMC_SEARCH_PATH = "/search"
+
+
+async def search_europe_pmc(query: str, max_results: int = 10) -> list[StudyRecord]:
+    """Search Europe PMC REST API and return unified StudyRecord objects."""
+    return (await search_europe_pmc_page(query, max_results)).studies
+
+
+async def search_europe_pmc_page(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+    """One page of Europe PMC results; ``cursor`` is the cursorMark."""
+    return await _search(query, max_results, cursor, "core")
+
+
+async def search_europe_pmc_lite_page(
+    query: str, max_results: int = 10, cursor: str = ""
+) -> SourcePage:
+    """Like ``search_europe_pmc_page`` with ``resultType=lite``: no abstracts or author details."""
+    return await _search(query, max_results, cursor, "lite")
 
 
-async def search_europe_pmc(query: str, max_results: int = 10) -> list[Study]:
-    """Search Europe PMC REST API and return unified Study objects."""
-    studies: list[Study] = []
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            params = {
-                "query": query,
-                "format": "json",
-                "pageSize": max_results,
-                "resultType": "core",
-            }
-            resp = await client.get(EPMC_API_URL, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+async def lookup_europe_pmc(kind: str, value: str) -> list[StudyRecord]:
+    """Core records for one identifier (``pmid``, ``pmcid`` or ``doi``)."""
+    return (await _search(_LOOKUP_QUERIES[kind].format(value), 5, "", "core")).studies
 
-            result_list = data.get("resultList", {}).get("result", [])
-            for item in result_list:
-                studies.append(_parse_epmc_result(item))
 
-    except Exception:
-        logger.exception("Europe PMC search failed for query: %s", query)
+# Europe PMC query syntax for an exact identifier match
+_LOOKUP_QUERIES = {
+    "pmid": "EXT_ID:{} AND SRC:MED",
+    "pmcid": "PMCID:{}",
+    "doi": 'DOI:"{}"',
+}
 
-    return studies
+
+async def _search(query: str, max_results: int, cursor: str, result_type: str) -> SourcePage:
+    params = {
+        "query": query,
+        "format": "json",
+        "pageSize": max_results,
+        "resultType": result_type,
+        "cursorMark": cursor or "*",
+    }
+    resp = await fetch(
+        EUROPE_PMC, EPMC_SEARCH_PATH, params=params, timeout=settings.europe_pmc_timeout
+    )
+    page = await run_cpu(_parse_epmc_payload, resp.content, size=len(resp.content))
+
+    # The last page repeats the cursorMark it was requested with
+    if not page.studies or page.next_cursor == params["cursorMark"]:
+        page.next_cursor = None
+    return page
+
+
+def _parse_epmc_payload(payload: bytes) -> SourcePage:
+    """Decode a Europe PMC search response body and parse every result."""
+    data = json.loads(payload)
+    result_list = data.get("resultList", {}).get("result", [])
+    return SourcePage(
+        studies=[_parse_epmc_result(item) for item in result_list],
+        next_cursor=data.get("nextCursorMark"),
+    )
 
 
-def _parse_epmc_result(item: dict) -> Study:
-    """Parse a single Europe PMC result into a Study."""
+def _parse_epmc_result(item: dict) -> StudyRecord:
+    """Parse a single Europe PMC result into a StudyRecord."""
     title = item.get("title", "")
     abstract = item.get("abstractText", "")
 
-    # Authors
+    # Authors — lite results only carry the "Patel ES, Silva KR." string
     authors: list[str] = []
     author_list = item.get("authorList", {}).get("author", [])
     for author in author_list:
         full_name = author.get("fullName", "")
         if full_name:
             authors.append(full_name)
+    if not author_list and item.get("authorString"):
+        authors = [name.strip() for name in item["authorString"].rstrip(".").split(",") if name.strip()]
 
     # Journal — field is nested inside journalInfo.journal.title
     journal_info = item.get("journalInfo", {})
@@ -68,7 +107,7 @@ def _parse_epmc_result(item: dict) -> Study:
     else:
         url = ""
 
-    return Study(
+    return StudyRecord(
         title=title,
         authors=authors,
         abstract=abstract,
@@ -77,4 +116,6 @@ def _parse_epmc_result(item: dict) -> Study:
         publication_date=pub_date,
         journal=journal,
         doi=doi,
+        pmid=pmid,
+        pmcid=pmcid,
     )
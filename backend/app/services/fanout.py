@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from app.config import settings
+from app.models.schemas import SourceStatus
+from app.services.metrics import SOURCE_SECONDS, record_timing
+from app.services.paging import PageFn, SourcePage
+from app.services.resilience import SourceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+SourceCall = Callable[[], Awaitable[SourcePage]]
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies (seconds) for one source."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """Return the ``q`` quantile, or None until enough samples are collected."""
+        if len(self._samples) < settings.hedge_min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgedSource:
+    """Wrap a connector so a call still running past the source's p95 is re-issued.
+
+    Whichever attempt succeeds first wins and the other is cancelled. Hedging
+    only starts once the tracker has ``hedge_min_samples`` latencies.
+    """
+
+    def __init__(self, source: str, fn: PageFn) -> None:
+        self.source = source
+        self._fn = fn
+        self.latency = LatencyTracker()
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def __call__(self, query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        start = time.monotonic()
+        threshold = (
+            self.latency.percentile(settings.hedge_percentile)
+            if settings.hedging_enabled
+            else None
+        )
+        primary = asyncio.ensure_future(self._fn(query, max_results, cursor))
+        attempts = {primary}
+        try:
+            if threshold is not None:
+                done, _ = await asyncio.wait(attempts, timeout=threshold)
+                if not done:
+                    self.hedges += 1
+                    logger.info("Hedging %s request after %.0f ms", self.source, threshold * 1000)
+                    attempts.add(asyncio.ensure_future(self._fn(query, max_results, cursor)))
+
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self.latency.record(time.monotonic() - start)
+                        return task.result()
+            # Every attempt failed: surface the primary's error
+            return primary.result()
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    def stats(self) -> dict[str, float | int | None]:
+        p95 = self.latency.percentile(settings.hedge_percentile)
+        return {
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+def _observe(status: SourceStatus) -> None:
+    seconds = status.elapsed_ms / 1000
+    SOURCE_SECONDS.observe(seconds, source=status.source, status=status.status)
+    record_timing(f"source-{status.source.lower()}", seconds)
+
+
+async def iter_sources(
+    calls: dict[str, SourceCall], deadline: float
+) -> AsyncIterator[tuple[SourcePage, SourceStatus]]:
+    """Run all source calls concurrently and yield each page as it completes.
+
+    Calls still pending when ``deadline`` seconds have elapsed are cancelled and
+    reported with a ``timeout`` status, as are calls that ran out their own
+    timeout; other failures are reported as ``error``.
+    Sources that did not answer yield an empty page.
+    """
+    start = time.monotonic()
+    pending = {asyncio.ensure_future(call()): label for label, call in calls.items()}
+    try:
+        while pending:
+            remaining = deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            elapsed_ms = round((time.monotonic() - start) * 1000, 1)
+            for task in done:
+                label = pending.pop(task)
+                if task.cancelled():
+                    logger.warning("Source %s call was cancelled", label)
+                    page, status = SourcePage(), SourceStatus(
+                        source=label, status="error", elapsed_ms=elapsed_ms
+                    )
+                elif isinstance(task.exception(), SourceUnavailableError):
+                    logger.warning("Source %s skipped: %s", label, task.exception())
+                    page, status = SourcePage(), SourceStatus(
+                        source=label, status="unavailable", elapsed_ms=elapsed_ms
+                    )
+                elif isinstance(task.exception(), TimeoutError):
+                    logger.warning("Source %s timed out", label)
+                    page, status = SourcePage(), SourceStatus(
+                        source=label, status="timeout", elapsed_ms=elapsed_ms
+                    )
+                elif task.exception() is not None:
+                    logger.error("Source %s returned an exception: %s", label, task.exception())
+                    page, status = SourcePage(), SourceStatus(
+                        source=label, status="error", elapsed_ms=elapsed_ms
+                    )
+                else:
+                    page = task.result()
+                    status = SourceStatus(
+                        source=label, status="ok", elapsed_ms=elapsed_ms, result_count=len(page.studies)
+                    )
+                _observe(status)
+                yield page, status
+
+        timed_out = list(pending.values())
+        for task in pending:
+            task.cancel()
+        pending.clear()
+        for label in timed_out:
+            logger.warning("Source %s missed the %.1f s search deadline", label, deadline)
+            status = SourceStatus(source=label, status="timeout", elapsed_ms=round(deadline * 1000, 1))
+            _observe(status)
+            yield SourcePage(), status
+    finally:
+        # Consumer stopped early (e.g. client disconnect): drop the remaining calls
+        for task in pending:
+            task.cancel()
+
+
+async def gather_sources(
+    calls: dict[str, SourceCall], deadline: float
+) -> tuple[dict[str, SourcePage], list[SourceStatus]]:
+    """Collect every source within the deadline, keeping results in ``calls`` order."""
+    pages: dict[str, SourcePage] = {}
+    statuses: dict[str, SourceStatus] = {}
+    async for page, status in iter_sources(calls, deadline):
+        pages[status.source] = page
+        statuses[status.source] = status
+    return {label: pages[label] for label in calls}, [statuses[label] for label in calls]
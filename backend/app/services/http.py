@@ -0,0 +1,159 @@
+import logging
+import time
+from collections.abc import AsyncIterator
+
+import httpx
+
+from app.config import settings
+from app.services.metrics import (
+    UPSTREAM_BYTES,
+    UPSTREAM_INFLIGHT,
+    UPSTREAM_RESPONSES,
+    UPSTREAM_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# One pooled client per upstream host, shared by every connector that talks to it
+NCBI = "ncbi"
+CLINICAL_TRIALS = "clinicaltrials"
+EUROPE_PMC = "europepmc"
+OPENALEX = "openalex"
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+class _MeteredStream(httpx.AsyncByteStream):
+    """Count body bytes and record latency once the body is fully read or closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, upstream: str, start: float) -> None:
+        self._stream = stream
+        self._upstream = upstream
+        self._start = start
+        self._bytes = 0
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            UPSTREAM_BYTES.inc(self._bytes, upstream=self._upstream)
+            UPSTREAM_SECONDS.observe(time.perf_counter() - self._start, upstream=self._upstream)
+        await self._stream.aclose()
+
+
+class MeteredClient(httpx.AsyncClient):
+    """AsyncClient that reports status codes, latency, bytes and in-flight requests."""
+
+    def __init__(self, upstream: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.upstream = upstream
+
+    async def send(self, request: httpx.Request, *, stream: bool = False, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        UPSTREAM_INFLIGHT.inc(upstream=self.upstream)
+        try:
+            response = await super().send(request, stream=True, **kwargs)
+        except Exception:
+            UPSTREAM_RESPONSES.inc(upstream=self.upstream, code="error")
+            raise
+        finally:
+            UPSTREAM_INFLIGHT.dec(upstream=self.upstream)
+
+        UPSTREAM_RESPONSES.inc(upstream=self.upstream, code=str(response.status_code))
+        response.stream = _MeteredStream(response.stream, self.upstream, start)
+        if not stream:
+            # Same as httpx's non-streaming send, which we bypassed to meter the body
+            try:
+                await response.aread()
+            except BaseException:
+                await response.aclose()
+                raise
+        return response
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (installed via ``httpx[http2]``)."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _base_urls() -> dict[str, str]:
+    return {
+        NCBI: settings.ncbi_base_url,
+        CLINICAL_TRIALS: settings.clinical_trials_base_url,
+        EUROPE_PMC: settings.europe_pmc_base_url,
+        OPENALEX: settings.openalex_base_url,
+    }
+
+
+def _build_client(host: str) -> httpx.AsyncClient:
+    """Create a pooled client for one upstream host.
+
+    HTTP/2 is negotiated via ALPN, so hosts that only speak HTTP/1.1 fall back
+    transparently. Timeouts are set per request by each connector.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    return MeteredClient(
+        host,
+        base_url=_base_urls()[host],
+        limits=limits,
+        http2=settings.http2_enabled and _http2_available(),
+    )
+
+
+def get_client(host: str) -> httpx.AsyncClient:
+    """Return the shared client for ``host``, creating it on first use."""
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        client = _build_client(host)
+        _clients[host] = client
+    return client
+
+
+async def fetch(
+    host: str,
+    path: str,
+    *,
+    params: dict[str, str | int],
+    timeout: float,
+    headers: dict[str, str] | None = None,
+    follow_redirects: bool = False,
+) -> httpx.Response:
+    """GET ``path`` on ``host``'s pooled client; raises HTTPStatusError on 4xx/5xx."""
+    resp = await get_client(host).get(
+        path, params=params, headers=headers, follow_redirects=follow_redirects, timeout=timeout
+    )
+    resp.raise_for_status()
+    return resp
+
+
+async def start_clients() -> None:
+    """Open the pooled clients for every upstream host (called from the app lifespan)."""
+    for host in _base_urls():
+        get_client(host)
+    logger.info(
+        "HTTP clients ready: %s (http2=%s)",
+        ", ".join(_clients),
+        settings.http2_enabled and _http2_available(),
+    )
+
+
+async def close_clients() -> None:
+    """Close all pooled clients and drop their keep-alive connections."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+    logger.info("HTTP clients closed")
@@ -0,0 +1,170 @@
+"""Full study records (with abstracts) fetched on demand by study ID.
+
+Lite searches return metadata only; ``hydrate`` resolves one ``kind:value`` ID
+(see ``records.study_id``) against the source that can answer it most
+cheaply, falling back to the next source when the first has no abstract.
+Results are cached and concurrent lookups of one ID share a single call.
+"""
+
+import asyncio
+import logging
+import re
+from collections.abc import Awaitable, Callable
+
+from app.config import settings
+from app.models.records import OPENALEX_WORK_PREFIX, StudyRecord
+from app.services.cache import MISSING, SingleFlight, TTLCache
+from app.services.clinical_trials import lookup_clinical_trial
+from app.services.dedup import identifiers, merge_group, normalize_doi
+from app.services.europe_pmc import lookup_europe_pmc
+from app.services.openalex import lookup_openalex
+from app.services.pubmed import fetch_pubmed_articles
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidStudyIdError(ValueError):
+    """The study ID is not ``kind:value`` with a known kind."""
+
+
+async def _pubmed(kind: str, value: str) -> list[StudyRecord]:
+    return list((await fetch_pubmed_articles([value])).values())
+
+
+async def _clinical_trials(kind: str, value: str) -> list[StudyRecord]:
+    return await lookup_clinical_trial(value)
+
+
+Lookup = Callable[[str, str], Awaitable[list[StudyRecord]]]
+
+# Sources tried in order for each kind of ID
+_LOOKUPS: dict[str, tuple[Lookup, ...]] = {
+    "pmid": (_pubmed,),
+    "nct": (_clinical_trials,),
+    "pmcid": (lookup_europe_pmc, lookup_openalex),
+    "doi": (lookup_europe_pmc, lookup_openalex),
+    "openalex": (lookup_openalex,),
+}
+
+# Accepted values per kind (after normalization). Values are interpolated into
+# upstream query syntax (Europe PMC's DOI:"...", OpenAlex's comma-separated
+# filter), so quotes, commas, pipes and whitespace are never accepted.
+_ID_PATTERNS = {
+    "pmid": re.compile(r"\d+"),
+    "nct": re.compile(r"NCT\d+"),
+    "pmcid": re.compile(r"PMC\d+"),
+    "doi": re.compile(r"10\.[^\s\",|]+"),
+    "openalex": re.compile(r"W\d+"),
+}
+
+_studies = TTLCache("studies", settings.study_cache_size, settings.study_cache_ttl)
+_flight = SingleFlight()
+
+
+def parse_study_id(study_id: str) -> tuple[str, str]:
+    """Split and normalize ``kind:value``; raises InvalidStudyIdError."""
+    kind, _, value = study_id.partition(":")
+    value = value.strip()
+    if kind not in _LOOKUPS or not value:
+        raise InvalidStudyIdError(f"invalid study id: {study_id!r}")
+    value = normalize_doi(value) if kind == "doi" else value.upper()
+    if not _ID_PATTERNS[kind].fullmatch(value):
+        raise InvalidStudyIdError(f"invalid {kind} id: {value!r}")
+    return kind, value
+
+
+async def hydrate(study_id: str) -> StudyRecord | None:
+    """The full record for ``study_id``, or None if no source has it.
+
+    Upstream errors propagate when no source could answer.
+    """
+    kind, value = parse_study_id(study_id)
+    key = f"{kind}:{value}"
+    cached = _studies.get_nowait(key)
+    if cached is not MISSING:
+        return cached
+    return await _flight.do(key, lambda: _load(kind, value))
+
+
+async def hydrate_studies(studies: list[StudyRecord]) -> list[StudyRecord]:
+    """Fill in the abstracts of ``studies`` that lack one.
+
+    PMIDs go to PubMed in one EFetch call; other IDs are looked up
+    concurrently. Studies that cannot be hydrated (including any whose ID a
+    connector produced malformed) are returned unchanged.
+    """
+    keys: dict[str, tuple[str, str]] = {}
+    for study in studies:
+        if not study.abstract and study.id:
+            try:
+                keys[study.id] = parse_study_id(study.id)
+            except InvalidStudyIdError as exc:
+                logger.warning("Not hydrating study: %s", exc)
+
+    found: dict[str, StudyRecord] = {}
+    to_load: dict[str, tuple[str, str]] = {}
+    for study_id, (kind, value) in keys.items():
+        cached = _studies.get_nowait(f"{kind}:{value}")
+        if cached is MISSING:
+            to_load[study_id] = (kind, value)
+        elif cached is not None:
+            found[study_id] = cached
+
+    pmids = {value: study_id for study_id, (kind, value) in to_load.items() if kind == "pmid"}
+    others = {study_id: key for study_id, key in to_load.items() if key[0] != "pmid"}
+    batches: list[Awaitable] = [
+        _flight.do(f"{kind}:{value}", lambda kind=kind, value=value: _load(kind, value))
+        for kind, value in others.values()
+    ]
+    if pmids:
+        batches.append(fetch_pubmed_articles(list(pmids)))
+    results = await asyncio.gather(*batches, return_exceptions=True)
+
+    for study_id, result in zip(others, results):
+        if isinstance(result, StudyRecord):
+            found[study_id] = result
+    if pmids and isinstance(results[-1], dict):
+        for pmid, study in results[-1].items():
+            _studies.set_nowait(f"pmid:{pmid}", study)
+            if pmid in pmids:
+                found[pmids[pmid]] = study
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Study hydration failed: %s", result)
+
+    return [
+        merge_group([study, found[study.id]]) if study.id in found else study
+        for study in studies
+    ]
+
+
+async def _load(kind: str, value: str) -> StudyRecord | None:
+    best: StudyRecord | None = None
+    error: Exception | None = None
+    for lookup in _LOOKUPS[kind]:
+        try:
+            candidates = await lookup(kind, value)
+        except Exception as exc:
+            error = exc
+            continue
+        match = next((study for study in candidates if _matches(study, kind, value)), None)
+        if match is not None and match.abstract:
+            best = match
+            break
+        best = best or match
+    if best is None and error is not None:
+        raise error
+    if best is not None:
+        _studies.set_nowait(f"{kind}:{value}", best)
+    return best
+
+
+def _matches(study: StudyRecord, kind: str, value: str) -> bool:
+    """Whether ``study`` is the one asked for (lookups can return near matches)."""
+    if kind == "openalex":
+        return study.url.upper() == f"{OPENALEX_WORK_PREFIX}{value}".upper()
+    return (kind, value) in identifiers(study)
+
+
+def study_cache_stats() -> dict[str, int]:
+    return {**_studies.stats(), "coalesced": _flight.coalesced}
@@ -0,0 +1,281 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Metrics are only touched from the event loop, so no locking is needed.
+Values that already live elsewhere (cache counters, for instance) are read at
+scrape time through collectors rather than mirrored on every update.
+"""
+
+import bisect
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterator[tuple[str, LabelValues, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, value in self.samples():
+            names = self.labels + ("le",) if suffix == "_bucket" else self.labels
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}"
+            )
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[tuple[str, LabelValues, float]]:
+        for key, value in self._values.items():
+            yield "", key, value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, +Inf last), sum]
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def samples(self) -> Iterator[tuple[str, LabelValues, float]]:
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", key + (_format_value(bound),), cumulative
+            yield "_sum", key, total[0]
+            yield "_count", key, cumulative
+
+
+Collector = Callable[[], Iterable[_Metric]]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Collector] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def register_collector(self, collector: Collector) -> None:
+        """Add a callable that builds metrics from existing state on each scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            metrics.extend(collector())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+    metric = Counter(name, help, labels)
+    REGISTRY.register(metric)
+    return metric
+
+
+def gauge(name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+    metric = Gauge(name, help, labels)
+    REGISTRY.register(metric)
+    return metric
+
+
+def histogram(
+    name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    metric = Histogram(name, help, labels, buckets)
+    REGISTRY.register(metric)
+    return metric
+
+
+HTTP_REQUESTS = counter(
+    "evidence_http_requests_total", "API requests by route and status", ["route", "method", "status"]
+)
+HTTP_SECONDS = histogram(
+    "evidence_http_request_seconds", "API request latency, to the last body byte", ["route", "method"]
+)
+HTTP_INFLIGHT = gauge("evidence_http_requests_inflight", "API requests being served")
+STAGE_SECONDS = histogram(
+    "evidence_stage_seconds",
+    "Time in each search stage (spellcheck, sources, dedup, rank, summarize, parse, ...)",
+    ["stage"],
+)
+SOURCE_SECONDS = histogram(
+    "evidence_source_seconds", "Per-source fan-out latency by outcome", ["source", "status"]
+)
+UPSTREAM_RESPONSES = counter(
+    "evidence_upstream_responses_total",
+    "Upstream HTTP responses by host and status code (\"error\" for transport failures)",
+    ["upstream", "code"],
+)
+UPSTREAM_SECONDS = histogram(
+    "evidence_upstream_request_seconds", "Upstream HTTP latency, to the last body byte", ["upstream"]
+)
+UPSTREAM_BYTES = counter(
+    "evidence_upstream_bytes_total", "Response body bytes received from each upstream", ["upstream"]
+)
+UPSTREAM_INFLIGHT = gauge(
+    "evidence_upstream_requests_inflight", "Upstream HTTP requests in flight", ["upstream"]
+)
+
+# Stage durations (seconds) for the request being served, for Server-Timing
+_timings: ContextVar[dict[str, float] | None] = ContextVar("server_timing", default=None)
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """Add ``seconds`` to the current request's Server-Timing entry ``name``."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block into ``evidence_stage_seconds`` and the request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        record_timing(name, elapsed)
+
+
+def server_timing(timings: dict[str, float], total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def _route_label(scope: Scope) -> str:
+    """The matched route template (e.g. "/api/search"), keeping label cardinality bounded.
+
+    Routes of an included router may report their path relative to the
+    router's prefix, so the prefix is recovered from the request path.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    path = scope["path"]
+    for i, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+
+class MetricsMiddleware:
+    """Count and time every HTTP request, and attach a Server-Timing header.
+
+    The header lists the stages recorded before the response started, so it
+    appears on regular responses (e.g. /api/search) but not on streams, which
+    start before any stage has run.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: dict[str, float] = {}
+        token = _timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", server_timing(timings, time.perf_counter() - start)
+                    )
+            await send(message)
+
+        HTTP_INFLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            HTTP_INFLIGHT.dec()
+            route = _route_label(scope)
+            HTTP_SECONDS.observe(time.perf_counter() - start, route=route, method=scope["method"])
+            HTTP_REQUESTS.inc(route=route, method=scope["method"], status=str(status))
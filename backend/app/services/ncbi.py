@@ -0,0 +1,259 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+
+from app.config import settings
+from app.services.http import NCBI, get_client
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes for E-utilities traffic: higher number is served first
+SPELL = "spell"
+SEARCH = "search"
+FETCH = "fetch"
+_PRIORITY = {SPELL: 0, SEARCH: 1, FETCH: 2}
+
+
+class NCBIScheduler:
+    """Token-bucket scheduler shared by every E-utilities call in the process.
+
+    NCBI allows 3 requests/s per client (10 with an API key). Callers wait in
+    priority lanes so in-progress work (EFetch) drains before new searches and
+    spell checks start. Queue time is recorded per lane.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, float, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+        self.throttled = 0
+        self.lanes: dict[str, dict[str, float]] = {
+            lane: {"requests": 0, "queued": 0, "queue_ms_total": 0.0, "queue_ms_max": 0.0}
+            for lane in _PRIORITY
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _record(self, lane: str, waited: float) -> None:
+        stats = self.lanes[lane]
+        stats["requests"] += 1
+        stats["queue_ms_total"] += waited * 1000
+        stats["queue_ms_max"] = max(stats["queue_ms_max"], waited * 1000)
+
+    async def acquire(self, lane: str) -> None:
+        """Wait for a request slot in ``lane``."""
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self._record(lane, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters,
+            (-_PRIORITY[lane], next(self._seq), time.monotonic(), lane, future),
+        )
+        self.lanes[lane]["queued"] += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        try:
+            await future
+        finally:
+            self.lanes[lane]["queued"] -= 1
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            _, _, enqueued, lane, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Waiter was cancelled while queued; its slot goes to the next one
+                continue
+            self._tokens -= 1
+            self._record(lane, time.monotonic() - enqueued)
+            future.set_result(None)
+
+    def penalize(self, seconds: float) -> None:
+        """Back off the whole bucket after NCBI signals we are over quota."""
+        self.throttled += 1
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+    def stats(self) -> dict[str, Any]:
+        lanes = {}
+        for lane, stats in self.lanes.items():
+            requests = stats["requests"]
+            lanes[lane] = {
+                "requests": int(requests),
+                "queued": int(stats["queued"]),
+                "queue_ms_avg": round(stats["queue_ms_total"] / requests, 2) if requests else 0.0,
+                "queue_ms_max": round(stats["queue_ms_max"], 2),
+            }
+        return {"rate_per_s": self.rate, "throttled": self.throttled, "lanes": lanes}
+
+
+def _default_rate() -> float:
+    if settings.ncbi_rate_limit > 0:
+        return settings.ncbi_rate_limit
+    return 10.0 if settings.ncbi_api_key else 3.0
+
+
+scheduler = NCBIScheduler(_default_rate(), burst=_default_rate())
+
+
+async def _send(
+    path: str,
+    params: dict,
+    lane: str,
+    timeout: float,
+    slot_acquired: bool,
+    stream: bool,
+) -> httpx.Response:
+    if settings.ncbi_api_key:
+        params = {**params, "api_key": settings.ncbi_api_key}
+    client = get_client(NCBI)
+    for attempt in range(settings.ncbi_max_retries + 1):
+        if attempt or not slot_acquired:
+            await scheduler.acquire(lane)
+        request = client.build_request("GET", path, params=params, timeout=timeout)
+        resp = await client.send(request, stream=stream)
+        if resp.status_code != 429 or attempt == settings.ncbi_max_retries:
+            break
+        await resp.aclose()
+        try:
+            retry_after = float(resp.headers.get("Retry-After", "1"))
+        except ValueError:
+            retry_after = 1.0
+        logger.warning("NCBI rate limit hit on %s, backing off %.1f s", path, retry_after)
+        scheduler.penalize(retry_after)
+    if resp.is_error:
+        await resp.aclose()
+    resp.raise_for_status()
+    return resp
+
+
+async def ncbi_get(
+    path: str,
+    params: dict,
+    lane: str,
+    timeout: float,
+    slot_acquired: bool = False,
+) -> httpx.Response:
+    """GET an E-utilities endpoint through the shared scheduler.
+
+    Adds the API key, and retries HTTP 429 responses after backing off the
+    bucket by the server's ``Retry-After`` (default 1 s). ``slot_acquired``
+    means the caller already holds a slot for the first attempt.
+    """
+    return await _send(path, params, lane, timeout, slot_acquired, stream=False)
+
+
+@asynccontextmanager
+async def ncbi_stream(
+    path: str,
+    params: dict,
+    lane: str,
+    timeout: float,
+    slot_acquired: bool = False,
+) -> AsyncIterator[httpx.Response]:
+    """Like ``ncbi_get`` but yields an unread response for ``aiter_bytes``."""
+    resp = await _send(path, params, lane, timeout, slot_acquired, stream=True)
+    try:
+        yield resp
+    finally:
+        await resp.aclose()
+
+
+class KeyBatcher:
+    """Merge concurrent lookups for sets of keys into one upstream call.
+
+    Callers' keys are collected for ``window`` seconds and then, if ``gate`` is
+    given, for as long as the batch waits on it (e.g. for a rate-limit slot),
+    so batches grow exactly when the upstream is the bottleneck. A batch is
+    sealed early once it would exceed ``max_keys``. Each caller gets back its
+    own subset of the results.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[list[str]], Awaitable[dict[str, Any]]],
+        window: float,
+        max_keys: int,
+        gate: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        self._fetch = fetch
+        self._gate = gate
+        self.window = window
+        self.max_keys = max_keys
+        self._batch: asyncio.Future | None = None
+        self._keys: dict[str, None] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+        self.batches = 0
+        self.merged_calls = 0
+
+    async def load(self, keys: list[str]) -> dict[str, Any]:
+        if self._batch is not None and len(self._keys) + len(keys) > self.max_keys:
+            self._seal()
+        if self._batch is None:
+            loop = asyncio.get_running_loop()
+            self._batch = loop.create_future()
+            self._keys = {}
+            self._timer = loop.call_later(self.window, self._start)
+        else:
+            self.merged_calls += 1
+        batch = self._batch
+        self._keys.update(dict.fromkeys(keys))
+        results = await asyncio.shield(batch)
+        return {key: results[key] for key in keys if key in results}
+
+    def _seal(self) -> None:
+        """Stop accepting keys into the open batch, starting it if still waiting."""
+        if self._timer is not None:
+            self._start()
+        self._batch = None
+
+    def _start(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.batches += 1
+        task = asyncio.ensure_future(self._run(self._batch, self._keys))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: asyncio.Future, keys: dict[str, None]) -> None:
+        try:
+            if self._gate is not None:
+                await self._gate()
+            if self._batch is batch:
+                self._batch = None
+            batch.set_result(await self._fetch(list(keys)))
+        except asyncio.CancelledError:
+            batch.cancel()
+            raise
+        except Exception as exc:
+            if self._batch is batch:
+                self._batch = None
+            batch.set_exception(exc)
+            # Retrieved here so a batch whose callers all went away stays quiet
+            batch.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {"batches": self.batches, "merged_calls": self.merged_calls}
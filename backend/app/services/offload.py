@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from app.config import settings
+from app.services.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_threads: ThreadPoolExecutor | None = None
+_processes: ProcessPoolExecutor | None = None
+
+
+def _thread_pool() -> ThreadPoolExecutor:
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(
+            max_workers=settings.offload_workers, thread_name_prefix="parse"
+        )
+    return _threads
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _processes
+    if _processes is None:
+        _processes = ProcessPoolExecutor(max_workers=settings.offload_workers)
+    return _processes
+
+
+def _executor(picklable: bool) -> Executor | None:
+    if settings.offload_mode == "process" and picklable:
+        return _process_pool()
+    if settings.offload_mode in ("thread", "process"):
+        return _thread_pool()
+    return None
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, size: int, picklable: bool = True) -> T:
+    """Run CPU-bound parsing/normalization off the event loop.
+
+    Work on payloads smaller than ``offload_min_bytes`` runs inline, since the
+    executor hand-off would cost more than it saves. ``picklable=False`` keeps
+    stateful work (e.g. an incremental parser) on the thread pool even when
+    ``offload_mode`` is "process".
+    """
+    executor = _executor(picklable)
+    with stage("parse"):
+        if executor is None or size < settings.offload_min_bytes:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+def start_executors() -> None:
+    """Create the configured pools up front (called from the app lifespan)."""
+    if settings.offload_mode in ("thread", "process"):
+        _thread_pool()
+    if settings.offload_mode == "process":
+        _process_pool()
+    logger.info(
+        "Parse offload: mode=%s, workers=%d, min_bytes=%d",
+        settings.offload_mode,
+        settings.offload_workers,
+        settings.offload_min_bytes,
+    )
+
+
+def shutdown_executors() -> None:
+    global _threads, _processes
+    for pool in (_threads, _processes):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _threads = None
+    _processes = None
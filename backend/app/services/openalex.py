@@ -1,45 +1,87 @@
+import json
 import logging
 
-import httpx
-
 from app.config import settings
-from app.models.schemas import Study
+from app.models.records import StudyRecord
+from app.services.http import OPENALEX, fetch
+from app.services.offload import run_cpu
+from app.services.paging import SourcePage
 
 logger = logging.getLogger(__name__)
 
-OPENALEX_API_URL = "https://api.openalex.org/works"
+OPENALEX_WORKS_PATH = "/works"
+
+
+async def search_openalex(query: str, max_results: int = 10) -> list[StudyRecord]:
+    """Search OpenAlex works API and return unified StudyRecord objects."""
+    return (await search_openalex_page(query, max_results)).studies
+
+
+async def search_openalex_page(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+    """One page of OpenAlex results; ``cursor`` is the works API cursor."""
+    return await _search(query, max_results, cursor)
+
+
+async def search_openalex_lite_page(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+    """Like ``search_openalex_page`` but selecting only the metadata fields.
+
+    The abstract inverted index is usually the bulk of a work's JSON.
+    """
+    return await _search(query, max_results, cursor, select=LITE_FIELDS)
 
 
-async def search_openalex(query: str, max_results: int = 10) -> list[Study]:
-    """Search OpenAlex works API and return unified Study objects."""
-    studies: list[Study] = []
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            params: dict[str, str | int] = {
-                "search": query,
-                "per_page": max_results,
-                "sort": "relevance_score:desc",
-            }
-            # OpenAlex uses api_key param for polite pool access
-            if settings.openalex_api_key:
-                params["api_key"] = settings.openalex_api_key
-            else:
-                params["mailto"] = "openevidence@example.com"
-            resp = await client.get(OPENALEX_API_URL, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+async def lookup_openalex(kind: str, value: str) -> list[StudyRecord]:
+    """Works for one identifier (``openalex`` work ID, ``doi``, ``pmid`` or ``pmcid``)."""
+    params = {"filter": f"{_LOOKUP_FILTERS[kind]}:{value}", "per_page": 5}
+    return (await _get_works(params)).studies
 
-            for work in data.get("results", []):
-                studies.append(_parse_openalex_work(work))
 
-    except Exception:
-        logger.exception("OpenAlex search failed for query: %s", query)
+# Works fields read by _parse_openalex_work, minus abstract_inverted_index
+LITE_FIELDS = "id,doi,title,publication_date,authorships,primary_location,ids"
+_LOOKUP_FILTERS = {
+    "openalex": "ids.openalex",
+    "doi": "doi",
+    "pmid": "ids.pmid",
+    "pmcid": "ids.pmcid",
+}
 
-    return studies
 
+async def _search(query: str, max_results: int, cursor: str, select: str = "") -> SourcePage:
+    params: dict[str, str | int] = {
+        "search": query,
+        "per_page": max_results,
+        "sort": "relevance_score:desc",
+        "cursor": cursor or "*",
+    }
+    if select:
+        params["select"] = select
+    page = await _get_works(params)
+    if not page.studies:
+        page.next_cursor = None
+    return page
 
-def _parse_openalex_work(work: dict) -> Study:
-    """Parse a single OpenAlex work into a Study."""
+
+async def _get_works(params: dict[str, str | int]) -> SourcePage:
+    # OpenAlex uses api_key param for polite pool access
+    if settings.openalex_api_key:
+        params["api_key"] = settings.openalex_api_key
+    else:
+        params["mailto"] = "openevidence@example.com"
+    resp = await fetch(OPENALEX, OPENALEX_WORKS_PATH, params=params, timeout=settings.openalex_timeout)
+    return await run_cpu(_parse_openalex_payload, resp.content, size=len(resp.content))
+
+
+def _parse_openalex_payload(payload: bytes) -> SourcePage:
+    """Decode an OpenAlex works response body and parse every work."""
+    data = json.loads(payload)
+    return SourcePage(
+        studies=[_parse_openalex_work(work) for work in data.get("results", [])],
+        next_cursor=(data.get("meta") or {}).get("next_cursor"),
+    )
+
+
+def _parse_openalex_work(work: dict) -> StudyRecord:
+    """Parse a single OpenAlex work into a StudyRecord."""
     title = work.get("title", "") or ""
 
     # Abstract — OpenAlex returns an inverted index; reconstruct it
@@ -65,10 +107,15 @@ def _parse_openalex_work(work: dict) -> Study:
     doi_url = work.get("doi", "") or ""
     doi = doi_url.replace("https://doi.org/", "") if doi_url else ""
 
+    # PubMed identifiers come back as URLs, e.g. https://pubmed.ncbi.nlm.nih.gov/123
+    ids = work.get("ids") or {}
+    pmid = (ids.get("pmid") or "").rstrip("/").rsplit("/", 1)[-1]
+    pmcid = (ids.get("pmcid") or "").rstrip("/").rsplit("/", 1)[-1]
+
     # URL
     url = doi_url or work.get("id", "")
 
-    return Study(
+    return StudyRecord(
         title=title,
         authors=authors,
         abstract=abstract,
@@ -77,6 +124,8 @@ def _parse_openalex_work(work: dict) -> Study:
         publication_date=pub_date,
         journal=journal,
         doi=doi,
+        pmid=pmid,
+        pmcid=pmcid,
     )
 
 
@@ -0,0 +1,87 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from app.config import settings
+from app.models.records import StudyRecord
+
+logger = logging.getLogger(__name__)
+
+CURSOR_VERSION = 3
+# Bytes of the HMAC-SHA256 tag kept in a cursor
+_TAG_BYTES = 16
+
+
+@dataclass
+class SourcePage:
+    """One slice of a source's results plus the token for the slice after it.
+
+    ``next_cursor`` is in the source's own format (PubMed retstart, Europe PMC
+    cursorMark, OpenAlex cursor, ClinicalTrials.gov nextPageToken) and is None
+    once the source has no more results. Connectors take "" for the first page.
+    """
+
+    studies: list[StudyRecord] = field(default_factory=list)
+    next_cursor: str | None = None
+
+
+# A connector's page function: (query, max_results, cursor) -> SourcePage
+PageFn = Callable[[str, int, str], Awaitable[SourcePage]]
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed or from an incompatible version."""
+
+
+@lru_cache(maxsize=1)
+def _cursor_key() -> bytes:
+    """The cursor signing key: ``cursor_secret``, else a random per-process key."""
+    if settings.cursor_secret:
+        return settings.cursor_secret.encode()
+    logger.warning("CURSOR_SECRET not set — page cursors only work within this process")
+    return secrets.token_bytes(32)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode((text + "=" * (-len(text) % 4)).encode())
+
+
+def _tag(payload: bytes) -> bytes:
+    return hmac.new(_cursor_key(), payload, hashlib.sha256).digest()[:_TAG_BYTES]
+
+
+def encode_cursor(state: dict[str, Any]) -> str:
+    """Pack pagination state into an opaque, URL-safe token signed with HMAC-SHA256."""
+    payload = json.dumps({"v": CURSOR_VERSION, **state}, separators=(",", ":")).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_tag(payload))}"
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """Inverse of ``encode_cursor``; raises InvalidCursorError on bad input,
+    including a cursor whose signature does not match (tampered or foreign)."""
+    try:
+        encoded_payload, encoded_tag = cursor.split(".")
+        payload, tag = _b64decode(encoded_payload), _b64decode(encoded_tag)
+    except (binascii.Error, UnicodeEncodeError, ValueError) as exc:
+        raise InvalidCursorError("malformed cursor") from exc
+    if not hmac.compare_digest(tag, _tag(payload)):
+        raise InvalidCursorError("invalid cursor signature")
+    try:
+        state = json.loads(payload)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursorError("malformed cursor") from exc
+    if not isinstance(state, dict) or state.pop("v", None) != CURSOR_VERSION:
+        raise InvalidCursorError("unsupported cursor version")
+    return state
@@ -0,0 +1,240 @@
+"""Background refresh of the most requested searches before their cached results expire.
+
+Search frequency is tracked approximately in fixed memory: a count-min sketch
+counts every search key and a bounded top-K keeps the heaviest ones together
+with the parameters needed to run them again. Counts are halved periodically
+so popularity follows recent traffic.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections.abc import Awaitable, Callable, Hashable
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CountMinSketch:
+    """Approximate per-key counts in ``width * depth`` counters.
+
+    Estimates never undercount; with conservative update they overcount by
+    at most about ``e / width`` of the total with probability ``1 - e^-depth``.
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4) -> None:
+        self.width = width
+        self.depth = depth
+        self._rows = [[0] * width for _ in range(depth)]
+        self.total = 0
+
+    def _slots(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [
+            int.from_bytes(digest[4 * row : 4 * row + 4], "little") % self.width
+            for row in range(self.depth)
+        ]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count ``key`` and return its new estimate."""
+        slots = self._slots(key)
+        estimate = min(row[slot] for row, slot in zip(self._rows, slots)) + count
+        # Conservative update: only raise counters that are below the new estimate
+        for row, slot in zip(self._rows, slots):
+            if row[slot] < estimate:
+                row[slot] = estimate
+        self.total += count
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[slot] for row, slot in zip(self._rows, self._slots(key)))
+
+    def decay(self) -> None:
+        """Halve every counter."""
+        self._rows = [[count >> 1 for count in row] for row in self._rows]
+        self.total >>= 1
+
+
+class TopK:
+    """The ``k`` keys with the highest sketch estimates (heavy hitters)."""
+
+    def __init__(self, k: int, sketch: CountMinSketch) -> None:
+        self.k = k
+        self.sketch = sketch
+        self.counts: dict[str, int] = {}
+        # Lower bound on the smallest tracked count (only rises until decay)
+        self._floor = 0
+
+    def add(self, key: str) -> str | None:
+        """Count ``key``; returns the key it displaced from the top K, if any."""
+        estimate = self.sketch.add(key)
+        if key in self.counts or len(self.counts) < self.k:
+            self.counts[key] = estimate
+            return None
+        if estimate <= self._floor:
+            return None
+        coldest = min(self.counts, key=self.counts.__getitem__)
+        self._floor = self.counts[coldest]
+        if estimate <= self._floor:
+            return None
+        del self.counts[coldest]
+        self.counts[key] = estimate
+        return coldest
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def most_common(self, n: int | None = None) -> list[tuple[str, int]]:
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+    def decay(self) -> None:
+        self.sketch.decay()
+        self.counts = {key: count >> 1 for key, count in self.counts.items() if count > 1}
+        self._floor = 0
+
+
+# Refresh one search: (cache key, replay parameters) -> None
+RefreshFn = Callable[[str, Hashable], Awaitable[None]]
+# Seconds until a cached search expires, or None if it is not cached
+ExpiresInFn = Callable[[str], float | None]
+# Upstream calls refreshing a search would make right now
+CostFn = Callable[[Hashable], int]
+
+
+class Prewarmer:
+    """Refresh the hottest searches shortly before their cached results expire.
+
+    Every ``prewarm_interval`` seconds, tracked searches seen at least
+    ``prewarm_min_hits`` times whose result expires within ``prewarm_lead``
+    seconds (or is no longer cached) are refreshed, hottest first, at most
+    ``prewarm_concurrency`` at a time. ``cost`` prices a refresh in upstream
+    calls when the cycle runs, so sources still answered from their own
+    caches are free; a cycle stops once ``prewarm_budget`` calls are spent and
+    the rest wait for the next cycle.
+    """
+
+    def __init__(
+        self, refresh: RefreshFn, expires_in: ExpiresInFn, cost: CostFn = lambda params: 1
+    ) -> None:
+        self._refresh = refresh
+        self._expires_in = expires_in
+        self._cost = cost
+        self.top = TopK(
+            settings.prewarm_top_k,
+            CountMinSketch(settings.prewarm_sketch_width, settings.prewarm_sketch_depth),
+        )
+        # Replay parameters of each tracked search
+        self._searches: dict[str, Hashable] = {}
+        self._attempted: dict[str, float] = {}
+        self._task: asyncio.Task | None = None
+        self.cycles = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.deferred = 0
+
+    def record(self, key: str, params: Hashable) -> None:
+        """Count one request for the search cached under ``key``."""
+        if not settings.prewarm_enabled:
+            return
+        displaced = self.top.add(key)
+        if displaced is not None:
+            self._searches.pop(displaced, None)
+            self._attempted.pop(displaced, None)
+        if key in self.top:
+            self._searches[key] = params
+
+    def due(self) -> list[str]:
+        """Tracked searches worth refreshing now, hottest first."""
+        now = time.monotonic()
+        keys = []
+        for key, count in self.top.most_common():
+            if count < settings.prewarm_min_hits:
+                break
+            # A refresh that did not get the result cached is retried after the lead time
+            if now - self._attempted.get(key, float("-inf")) < settings.prewarm_lead:
+                continue
+            expires_in = self._expires_in(key)
+            if expires_in is None or expires_in <= settings.prewarm_lead:
+                keys.append(key)
+        return keys
+
+    async def run_once(self) -> int:
+        """Refresh the searches that are due, within the budget; returns how many ran."""
+        self.cycles += 1
+        budget = settings.prewarm_budget
+        batch: list[tuple[str, Hashable]] = []
+        deferred = 0
+        for key in self.due():
+            params = self._searches[key]
+            cost = self._cost(params)
+            if cost > budget:
+                deferred += 1
+                continue
+            budget -= cost
+            batch.append((key, params))
+        self.deferred += deferred
+
+        slots = asyncio.Semaphore(max(1, settings.prewarm_concurrency))
+
+        async def refresh(key: str, params: Hashable) -> None:
+            async with slots:
+                self._attempted[key] = time.monotonic()
+                try:
+                    await self._refresh(key, params)
+                    self.refreshed += 1
+                except Exception:
+                    self.failed += 1
+                    logger.exception("Pre-warming failed for search %s", key)
+
+        await asyncio.gather(*(refresh(key, params) for key, params in batch))
+        if batch:
+            logger.info("Pre-warmed %d searches (%d deferred)", len(batch), deferred)
+        return len(batch)
+
+    async def _run(self) -> None:
+        last_decay = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.prewarm_interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Pre-warming cycle failed")
+            if time.monotonic() - last_decay >= settings.prewarm_decay_interval:
+                self.top.decay()
+                for key in self._searches.keys() - self.top.counts.keys():
+                    del self._searches[key]
+                    self._attempted.pop(key, None)
+                last_decay = time.monotonic()
+
+    def start(self) -> None:
+        """Start the worker (called from the app lifespan); a no-op unless enabled."""
+        if settings.prewarm_enabled and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="prewarm")
+            logger.info("Pre-warming started: top %d searches", self.top.k)
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "enabled": settings.prewarm_enabled,
+            "running": self._task is not None,
+            "tracked": len(self.top),
+            "searches_counted": self.top.sketch.total,
+            "cycles": self.cycles,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "deferred": self.deferred,
+        }
@@ -0,0 +1,184 @@
+"""Opt-in per-request profiling: a sampling profiler plus an event-loop lag monitor.
+
+The sampler is a daemon thread that reads the event-loop thread's stack (and
+the parse pool's threads) every ``profile_interval`` seconds and counts
+collapsed stacks, the format flame-graph tools take. Unlike cProfile it adds
+no per-call overhead and can run for several requests at once. Because the
+loop is shared, a profile also covers whatever else the loop ran meanwhile;
+idle time shows up under the selector's ``select``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from types import FrameType
+from typing import Any
+
+from app.config import settings
+from app.services.cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Executor threads whose stacks are sampled alongside the loop (see offload.py)
+PARSE_THREAD_PREFIX = "parse"
+TOP_FUNCTIONS = 25
+
+_artifacts = TTLCache("profiles", settings.profile_max_artifacts, settings.profile_ttl)
+_stats = {"profiled": 0, "sampled": 0}
+
+
+def _collapse(frame: FrameType | None) -> str:
+    names: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Count collapsed stacks of the given thread (plus parse threads) until stopped."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        names = {}
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in frames.items():
+                name = names.get(ident, "")
+                if ident == self.thread_id:
+                    self.stacks[_collapse(frame)] += 1
+                elif name.startswith(PARSE_THREAD_PREFIX):
+                    self.stacks[f"{name};{_collapse(frame)}"] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = TOP_FUNCTIONS) -> list[dict[str, Any]]:
+        """Leaf frames by sample count: where the CPU (or idle wait) actually was."""
+        leaves: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [{"frame": frame, "samples": count} for frame, count in leaves.most_common(limit)]
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes a sleeper, i.e. how long it was blocked."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.lags: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - start - self.interval))
+
+    def stats(self) -> dict[str, float | int]:
+        if not self.lags:
+            return {"checks": 0, "max_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0}
+        ordered = sorted(self.lags)
+        at = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)  # noqa: E731
+        return {
+            "checks": len(ordered),
+            "max_ms": round(ordered[-1] * 1000, 2),
+            "p50_ms": at(0.5),
+            "p99_ms": at(0.99),
+        }
+
+
+@asynccontextmanager
+async def profile_request(
+    request_id: str, context: dict[str, Any], sampled: bool = False
+) -> AsyncIterator[None]:
+    """Profile the enclosed block and keep the artifact under ``request_id``."""
+    profiler = SamplingProfiler(threading.get_ident(), settings.profile_interval)
+    lag = LoopLagMonitor(settings.profile_lag_interval)
+    start = time.perf_counter()
+    profiler.start()
+    lag.start()
+    try:
+        yield
+    finally:
+        await lag.stop()
+        await asyncio.to_thread(profiler.stop)
+        elapsed = time.perf_counter() - start
+        _stats["sampled" if sampled else "profiled"] += 1
+        artifact = {
+            "request_id": request_id,
+            **context,
+            "sampled": sampled,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "samples": profiler.samples,
+            "interval_ms": settings.profile_interval * 1000,
+            "loop_lag": lag.stats(),
+            "top_functions": profiler.top_functions(),
+        }
+        collapsed = profiler.collapsed()
+        _artifacts.set_nowait(request_id, (artifact, collapsed))
+        if settings.profile_dir:
+            await asyncio.to_thread(_write_artifact, request_id, artifact, collapsed)
+        logger.info(
+            "Profiled request %s: %.0f ms, %d samples, max loop lag %.1f ms",
+            request_id,
+            elapsed * 1000,
+            profiler.samples,
+            artifact["loop_lag"]["max_ms"],
+        )
+
+
+def _write_artifact(request_id: str, artifact: dict[str, Any], collapsed: str) -> None:
+    try:
+        os.makedirs(settings.profile_dir, exist_ok=True)
+        base = os.path.join(settings.profile_dir, request_id)
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(artifact, f, indent=2)
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            f.write(collapsed)
+    except OSError:
+        logger.exception("Could not write profile %s to %s", request_id, settings.profile_dir)
+
+
+def get_profile(request_id: str) -> tuple[dict[str, Any], str] | None:
+    """(summary, collapsed stacks) for a recent profile, or None if unknown or expired."""
+    entry = _artifacts.get_nowait(request_id)
+    return None if entry is MISSING else entry
+
+
+def profile_stats() -> dict[str, int]:
+    return {**_stats, "kept": len(_artifacts)}
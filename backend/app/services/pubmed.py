@@ -1,77 +1,321 @@
+import asyncio
+import json
 import logging
 import xml.etree.ElementTree as ET
+from collections import deque
+from collections.abc import AsyncIterator
 
 import httpx
 
 from app.config import settings
-from app.models.schemas import Study
+from app.models.records import StudyRecord
+from app.services.ncbi import FETCH, SEARCH, KeyBatcher, ncbi_get, ncbi_stream, scheduler
+from app.services.offload import run_cpu
+from app.services.paging import SourcePage
 
 logger = logging.getLogger(__name__)
 
-ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+ESEARCH_PATH = "/esearch.fcgi"
+ESUMMARY_PATH = "/esummary.fcgi"
+EFETCH_PATH = "/efetch.fcgi"
 
 
-async def search_pubmed(query: str, max_results: int = 10) -> list[Study]:
-    """Search PubMed/NCBI via E-utilities and return unified Study objects."""
-    studies: list[Study] = []
+async def search_pubmed(query: str, max_results: int = 10) -> list[StudyRecord]:
+    """Search PubMed/NCBI via E-utilities and return unified StudyRecord objects."""
+    return (await search_pubmed_page(query, max_results)).studies
+
+
+async def search_pubmed_page(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+    """One page of PubMed results; ``cursor`` is the ESearch retstart."""
+    page = SourcePage()
+    # Step 1: ESearch to get PMIDs
+    id_list, page.next_cursor = await _esearch(query, max_results, cursor)
+    if not id_list:
+        return page
+
+    # Step 2: EFetch to get article details in XML
+    by_pmid = await fetch_pubmed_articles(id_list)
+    page.studies = [by_pmid[pmid] for pmid in id_list if pmid in by_pmid]
+    return page
+
+
+async def search_pubmed_lite_page(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+    """Like ``search_pubmed_page`` but with ESummary metadata (no abstracts).
+
+    ESummary JSON is a fraction of the EFetch XML for the same PMIDs and
+    much cheaper to parse.
+    """
+    page = SourcePage()
+    id_list, page.next_cursor = await _esearch(query, max_results, cursor)
+    if not id_list:
+        return page
+    summary_params = {"db": "pubmed", "id": ",".join(id_list), "retmode": "json"}
+    resp = await ncbi_get(ESUMMARY_PATH, summary_params, lane=FETCH, timeout=settings.pubmed_timeout)
+    page.studies = await run_cpu(_parse_esummary_payload, resp.content, size=len(resp.content))
+    return page
+
+
+async def _esearch(query: str, max_results: int, cursor: str) -> tuple[list[str], str | None]:
+    """PMIDs for one page of ``query`` plus the retstart of the page after it."""
+    retstart = int(cursor or 0)
+    search_params = {
+        "db": "pubmed",
+        "term": query,
+        "retmax": max_results,
+        "retstart": retstart,
+        "retmode": "json",
+        "sort": "relevance",
+    }
+    search_resp = await ncbi_get(
+        ESEARCH_PATH, search_params, lane=SEARCH, timeout=settings.pubmed_timeout
+    )
+    search_data = search_resp.json().get("esearchresult", {})
+
+    id_list = search_data.get("idlist", [])
+    next_start = retstart + len(id_list)
+    if id_list and next_start < int(search_data.get("count", 0)):
+        return id_list, str(next_start)
+    return id_list, None
+
+
+async def fetch_pubmed_articles(id_list: list[str]) -> dict[str, StudyRecord]:
+    """Full EFetch records (with abstracts) by PMID; missing PMIDs are left out."""
+    if settings.ncbi_efetch_batching:
+        return await _efetch_batcher.load(id_list)
+    return dict(await _efetch(id_list))
+
+
+async def _efetch(id_list: list[str], slot_acquired: bool = False) -> list[tuple[str, StudyRecord]]:
+    """EFetch article XML for ``id_list`` and return (PMID, StudyRecord) pairs."""
+    fetch_params = {
+        "db": "pubmed",
+        "id": ",".join(id_list),
+        "retmode": "xml",
+        "rettype": "abstract",
+    }
+    async with ncbi_stream(
+        EFETCH_PATH,
+        fetch_params,
+        lane=FETCH,
+        timeout=settings.pubmed_timeout,
+        slot_acquired=slot_acquired,
+    ) as fetch_resp:
+        return [item async for item in _iter_articles(fetch_resp)]
+
+
+async def _efetch_by_pmid(id_list: list[str]) -> dict[str, StudyRecord]:
+    return dict(await _efetch(id_list, slot_acquired=True))
+
+
+# Merges EFetch calls from concurrent searches into one request (opt-in). The
+# batch stays open while it waits for its rate-limit slot.
+_efetch_batcher = KeyBatcher(
+    _efetch_by_pmid,
+    window=settings.ncbi_efetch_batch_window,
+    max_keys=settings.ncbi_efetch_batch_max,
+    gate=lambda: scheduler.acquire(FETCH),
+)
+
+
+async def iter_pubmed_deep(query: str, limit: int) -> AsyncIterator[StudyRecord]:
+    """Stream up to ``limit`` PubMed records for large exports.
+
+    ESearch stores the result set on the NCBI history server (``usehistory=y``)
+    and EFetch pages through it by WebEnv/query_key and ``retstart``. Up to
+    ``pubmed_deep_concurrency`` pages are fetched ahead (all through the shared
+    rate limiter) and yielded in order, so memory stays bounded by that window
+    rather than by the export size.
+    """
+    search_params = {
+        "db": "pubmed",
+        "term": query,
+        "retmax": 0,
+        "retmode": "json",
+        "sort": "relevance",
+        "usehistory": "y",
+    }
+    search_resp = await ncbi_get(
+        ESEARCH_PATH, search_params, lane=SEARCH, timeout=settings.pubmed_timeout
+    )
+    result = search_resp.json().get("esearchresult", {})
+    total = min(int(result.get("count", 0)), limit, settings.pubmed_deep_max_records)
+    webenv = result.get("webenv", "")
+    query_key = result.get("querykey", "")
+    if not total or not webenv:
+        return
+
+    page_size = settings.pubmed_deep_page_size
+    offsets = iter(range(0, total, page_size))
+    window: deque[asyncio.Task] = deque()
+
+    def schedule_next() -> None:
+        retstart = next(offsets, None)
+        if retstart is not None:
+            retmax = min(page_size, total - retstart)
+            window.append(
+                asyncio.ensure_future(_efetch_history_page(webenv, query_key, retstart, retmax))
+            )
+
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Step 1: ESearch to get PMIDs
-            search_params = {
-                "db": "pubmed",
-                "term": query,
-                "retmax": max_results,
-                "retmode": "json",
-                "sort": "relevance",
-            }
-            if settings.ncbi_api_key:
-                search_params["api_key"] = settings.ncbi_api_key
-
-            search_resp = await client.get(ESEARCH_URL, params=search_params)
-            search_resp.raise_for_status()
-            search_data = search_resp.json()
-
-            id_list = search_data.get("esearchresult", {}).get("idlist", [])
-            if not id_list:
-                return studies
-
-            # Step 2: EFetch to get article details in XML
-            fetch_params = {
-                "db": "pubmed",
-                "id": ",".join(id_list),
-                "retmode": "xml",
-                "rettype": "abstract",
-            }
-            if settings.ncbi_api_key:
-                fetch_params["api_key"] = settings.ncbi_api_key
-
-            fetch_resp = await client.get(EFETCH_URL, params=fetch_params)
-            fetch_resp.raise_for_status()
-
-            root = ET.fromstring(fetch_resp.text)
-            for article_elem in root.findall(".//PubmedArticle"):
-                studies.append(_parse_pubmed_article(article_elem))
-
-    except Exception:
-        logger.exception("PubMed search failed for query: %s", query)
-
-    return studies
-
-
-def _parse_pubmed_article(article_elem: ET.Element) -> Study:
-    """Parse a single PubmedArticle XML element into a Study."""
-    medline = article_elem.find(".//MedlineCitation")
-    article = medline.find(".//Article") if medline is not None else None
+        for _ in range(settings.pubmed_deep_concurrency):
+            schedule_next()
+        while window:
+            page = await window.popleft()
+            schedule_next()
+            for study in page:
+                yield study
+    finally:
+        for task in window:
+            task.cancel()
+
+
+async def _efetch_history_page(
+    webenv: str, query_key: str, retstart: int, retmax: int
+) -> list[StudyRecord]:
+    fetch_params = {
+        "db": "pubmed",
+        "query_key": query_key,
+        "WebEnv": webenv,
+        "retstart": retstart,
+        "retmax": retmax,
+        "retmode": "xml",
+        "rettype": "abstract",
+    }
+    async with ncbi_stream(
+        EFETCH_PATH, fetch_params, lane=FETCH, timeout=settings.pubmed_timeout
+    ) as fetch_resp:
+        return [study async for _, study in _iter_articles(fetch_resp)]
+
+
+class PubmedArticleParser:
+    """Incremental EFetch parser: feed bytes, get (PMID, StudyRecord) per finished article.
+
+    Each ``PubmedArticle`` is parsed as soon as its end tag arrives and then
+    detached from the tree, so memory holds at most one article plus the
+    unread tail of the current chunk.
+    """
+
+    def __init__(self) -> None:
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: ET.Element | None = None
+
+    def feed(self, chunk: bytes) -> list[tuple[str, StudyRecord]]:
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> list[tuple[str, StudyRecord]]:
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> list[tuple[str, StudyRecord]]:
+        articles: list[tuple[str, StudyRecord]] = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                continue
+            if elem.tag != "PubmedArticle":
+                continue
+            articles.append(
+                (elem.findtext("MedlineCitation/PMID", ""), _parse_pubmed_article(elem))
+            )
+            try:
+                self._root.remove(elem)
+            except ValueError:
+                # Not a direct child of the root (e.g. wrapped in another set)
+                elem.clear()
+        return articles
+
+
+async def _iter_articles(resp: httpx.Response) -> AsyncIterator[tuple[str, StudyRecord]]:
+    """Parse a streamed EFetch response article by article.
+
+    Network chunks are buffered up to ``offload_min_bytes`` and each buffer is
+    fed to the parser off the event loop on the thread pool (the parser is
+    stateful). In "process" offload mode the body is read whole and parsed in
+    a worker process instead, trading body-sized memory for no GIL contention.
+    """
+    if settings.offload_mode == "process":
+        payload = await resp.aread()
+        for item in await run_cpu(_parse_efetch_payload, payload, size=len(payload)):
+            yield item
+        return
+
+    parser = PubmedArticleParser()
+    buffer: list[bytes] = []
+    buffered = 0
+    async for chunk in resp.aiter_bytes():
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= settings.offload_min_bytes:
+            data = b"".join(buffer)
+            buffer, buffered = [], 0
+            for item in await run_cpu(parser.feed, data, size=len(data), picklable=False):
+                yield item
+    data = b"".join(buffer)
+    for item in await run_cpu(_feed_and_close, parser, data, size=len(data), picklable=False):
+        yield item
+
+
+def _feed_and_close(parser: PubmedArticleParser, data: bytes) -> list[tuple[str, StudyRecord]]:
+    return parser.feed(data) + parser.close()
+
+
+def _parse_efetch_payload(payload: bytes) -> list[tuple[str, StudyRecord]]:
+    return _feed_and_close(PubmedArticleParser(), payload)
+
+
+def efetch_batch_stats() -> dict[str, int | bool]:
+    return {"enabled": settings.ncbi_efetch_batching, **_efetch_batcher.stats()}
+
+
+def _parse_esummary_payload(payload: bytes) -> list[StudyRecord]:
+    """Parse an ESummary (JSON, version 2.0) response into abstract-less records."""
+    result = json.loads(payload).get("result", {})
+    return [
+        _parse_pubmed_summary(result[uid])
+        for uid in result.get("uids", [])
+        if uid in result and "error" not in result[uid]
+    ]
+
+
+def _parse_pubmed_summary(doc: dict) -> StudyRecord:
+    """Parse one ESummary document; the fields match what EFetch provides, minus the abstract."""
+    pmid = doc.get("uid", "")
+    article_ids = {aid.get("idtype"): aid.get("value", "") for aid in doc.get("articleids", [])}
+    return StudyRecord(
+        title=doc.get("title", ""),
+        authors=[
+            author["name"]
+            for author in doc.get("authors", [])
+            if author.get("name") and author.get("authtype", "Author") == "Author"
+        ],
+        source="PubMed",
+        url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else "",
+        publication_date=doc.get("pubdate", ""),
+        journal=doc.get("fulljournalname", "") or doc.get("source", ""),
+        doi=article_ids.get("doi", ""),
+        pmid=pmid,
+        pmcid=article_ids.get("pmc", ""),
+    )
+
+
+def _parse_pubmed_article(article_elem: ET.Element) -> StudyRecord:
+    """Parse a single PubmedArticle XML element into a StudyRecord.
+
+    Uses direct child paths from the PubMed DTD rather than descendant scans.
+    """
+    medline = article_elem.find("MedlineCitation")
+    article = medline.find("Article") if medline is not None else None
 
     # Title
-    title_elem = article.find(".//ArticleTitle") if article is not None else None
+    title_elem = article.find("ArticleTitle") if article is not None else None
     title = _get_text(title_elem)
 
     # Abstract
     abstract_parts: list[str] = []
     if article is not None:
-        for abs_text in article.findall(".//Abstract/AbstractText"):
+        for abs_text in article.iterfind("Abstract/AbstractText"):
             label = abs_text.get("Label", "")
             text = _get_text(abs_text)
             if label:
@@ -83,34 +327,41 @@ def _parse_pubmed_article(article_elem: ET.Element) -> Study:
     # Authors
     authors: list[str] = []
     if article is not None:
-        for author in article.findall(".//AuthorList/Author"):
+        for author in article.iterfind("AuthorList/Author"):
             last = _get_text(author.find("LastName"))
             fore = _get_text(author.find("ForeName"))
             if last:
                 authors.append(f"{fore} {last}".strip())
 
     # Journal
-    journal_elem = article.find(".//Journal/Title") if article is not None else None
+    journal_elem = article.find("Journal/Title") if article is not None else None
     journal = _get_text(journal_elem)
 
     # Publication date
-    pub_date_elem = article.find(".//Journal/JournalIssue/PubDate") if article is not None else None
+    pub_date_elem = article.find("Journal/JournalIssue/PubDate") if article is not None else None
     pub_date = _parse_pub_date(pub_date_elem)
 
     # PMID
-    pmid_elem = medline.find(".//PMID") if medline is not None else None
+    pmid_elem = medline.find("PMID") if medline is not None else None
     pmid = _get_text(pmid_elem)
     url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else ""
 
     # DOI
     doi = ""
     if article is not None:
-        for eid in article.findall(".//ELocationID"):
+        for eid in article.iterfind("ELocationID"):
             if eid.get("EIdType") == "doi":
                 doi = _get_text(eid)
                 break
 
-    return Study(
+    # PMC ID, when the article is in PubMed Central
+    pmcid = ""
+    for aid in article_elem.iterfind("PubmedData/ArticleIdList/ArticleId"):
+        if aid.get("IdType") == "pmc":
+            pmcid = _get_text(aid)
+            break
+
+    return StudyRecord(
         title=title,
         authors=authors,
         abstract=abstract,
@@ -119,6 +370,8 @@ def _parse_pubmed_article(article_elem: ET.Element) -> Study:
         publication_date=pub_date,
         journal=journal,
         doi=doi,
+        pmid=pmid,
+        pmcid=pmcid,
     )
 
 
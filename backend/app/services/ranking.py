@@ -0,0 +1,88 @@
+import math
+import re
+from collections import Counter
+
+from app.config import settings
+from app.models.records import StudyRecord
+from app.services.dedup import Deduplicator
+
+# Okapi BM25 parameters; title terms are counted TITLE_BOOST times
+K1 = 1.2
+B = 0.75
+TITLE_BOOST = 2
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def bm25_scores(query: str, studies: list[StudyRecord]) -> list[float]:
+    """BM25 score of each study's title + abstract against ``query``.
+
+    Scored term-at-a-time: each query term's IDF is computed once and its
+    contribution is added across the corpus in a single pass, so the cost is
+    one tokenization per document plus O(query terms * documents).
+    """
+    terms = set(_tokens(query))
+    if not terms or not studies:
+        return [0.0] * len(studies)
+
+    counts: list[Counter[str]] = []
+    lengths: list[int] = []
+    for study in studies:
+        title = _tokens(study.title)
+        abstract = _tokens(study.abstract)
+        tf = Counter(abstract)
+        for token in title:
+            tf[token] += TITLE_BOOST
+        counts.append(tf)
+        lengths.append(len(title) * TITLE_BOOST + len(abstract))
+
+    n = len(studies)
+    avg_length = sum(lengths) / n or 1.0
+    norms = [K1 * (1 - B + B * length / avg_length) for length in lengths]
+    scores = [0.0] * n
+    for term in terms:
+        freqs = [tf[term] for tf in counts]
+        df = n - freqs.count(0)
+        if not df:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        scores = [
+            score + idf * f * (K1 + 1) / (f + norm) if f else score
+            for score, f, norm in zip(scores, freqs, norms)
+        ]
+    return scores
+
+
+def rank_studies(query: str, dedup: Deduplicator) -> list[StudyRecord]:
+    """Order deduplicated studies by fused relevance, best first."""
+    return [study for _, study in rank_groups(query, dedup)]
+
+
+def rank_groups(query: str, dedup: Deduplicator) -> list[tuple[int, StudyRecord]]:
+    """(group id, merged study) pairs ordered by fused relevance, best first.
+
+    Each merged study scores ``1 / (k + position)`` for every source that
+    returned it (reciprocal-rank fusion, so agreement across sources counts),
+    plus ``rank_bm25_weight / (k + bm25_rank)`` from the local BM25 ranking.
+    Studies with no query term in their title or abstract get no BM25 share.
+    Ties keep first-seen order.
+    """
+    studies = dedup.merged()
+    group_ids = dedup.group_ids()
+    k = settings.rank_rrf_k
+    fused = [
+        sum(1 / (k + position) for _, position in members)
+        for members in dedup.positions()
+    ]
+
+    bm25 = bm25_scores(query, studies)
+    by_bm25 = sorted((i for i in range(len(studies)) if bm25[i] > 0), key=lambda i: -bm25[i])
+    for rank, i in enumerate(by_bm25, 1):
+        fused[i] += settings.rank_bm25_weight / (k + rank)
+
+    order = sorted(range(len(studies)), key=lambda i: -fused[i])
+    return [(group_ids[i], studies[i]) for i in order]
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from app.config import settings
+from app.services.paging import PageFn, SourcePage
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class SourceUnavailableError(Exception):
+    """Raised instead of calling an upstream that is shedding load."""
+
+
+class CircuitOpenError(SourceUnavailableError):
+    """The source's circuit breaker is open."""
+
+
+class ConcurrencyLimitError(SourceUnavailableError):
+    """The source already has as many calls in flight as its limiter allows."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by error rate and slow calls.
+
+    Outcomes are kept in a rolling window; a call slower than
+    ``slow_call_seconds`` counts as a failure. Once the window has at least
+    ``min_calls`` outcomes and the failure rate reaches ``failure_rate`` the
+    breaker opens for ``open_seconds``, then admits ``half_open_calls`` probes.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        failure_rate: float,
+        min_calls: int,
+        window: int,
+        slow_call_seconds: float,
+        open_seconds: float,
+        half_open_calls: int,
+    ) -> None:
+        self.source = source
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def before_call(self) -> None:
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.source} circuit is open")
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.source} circuit is half-open")
+            self._probes += 1
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        success = ok and elapsed < self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probes -= 1
+            self._transition(CLOSED if success else OPEN)
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_rate
+        ):
+            self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning("Circuit breaker for %s: %s -> %s", self.source, self.state, state)
+        self.state = state
+        if state == OPEN:
+            self.trips += 1
+            self._opened_at = time.monotonic()
+        if state == CLOSED:
+            self._outcomes.clear()
+        self._probes = 0
+
+    def stats(self) -> dict[str, object]:
+        outcomes = len(self._outcomes)
+        return {
+            "state": self.state,
+            "failure_rate": round(self._outcomes.count(False) / outcomes, 3) if outcomes else 0.0,
+            "window_calls": outcomes,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class AdaptiveLimiter:
+    """AIMD cap on concurrent calls to one upstream.
+
+    Each fast success raises the limit by ``1 / limit`` (about +1 per window of
+    calls); an error or a call slower than ``latency_target`` multiplies it by
+    ``backoff``. Calls over the limit are rejected rather than queued so they
+    do not pile up sockets and coroutines on a degraded source.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        initial: float,
+        min_limit: float,
+        max_limit: float,
+        latency_target: float,
+        backoff: float,
+    ) -> None:
+        self.source = source
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.inflight = 0
+        self.rejected = 0
+
+    def acquire(self) -> None:
+        if self.inflight >= int(self.limit):
+            self.rejected += 1
+            raise ConcurrencyLimitError(
+                f"{self.source} concurrency limit reached ({int(self.limit)} in flight)"
+            )
+        self.inflight += 1
+
+    def cancel(self) -> None:
+        """Give back a slot that never reached the upstream."""
+        self.inflight -= 1
+
+    def release(self, ok: bool, elapsed: float) -> None:
+        self.inflight -= 1
+        if ok and elapsed < self.latency_target:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "rejected": self.rejected,
+        }
+
+
+class GuardedSource:
+    """Run a connector behind its circuit breaker and adaptive concurrency limit."""
+
+    def __init__(self, source: str, fn: PageFn) -> None:
+        self.source = source
+        self._fn = fn
+        self.breaker = CircuitBreaker(
+            source,
+            failure_rate=settings.breaker_failure_rate,
+            min_calls=settings.breaker_min_calls,
+            window=settings.breaker_window,
+            slow_call_seconds=settings.breaker_slow_call_seconds,
+            open_seconds=settings.breaker_open_seconds,
+            half_open_calls=settings.breaker_half_open_calls,
+        )
+        self.limiter = AdaptiveLimiter(
+            source,
+            initial=settings.limiter_initial,
+            min_limit=settings.limiter_min,
+            max_limit=settings.limiter_max,
+            latency_target=settings.limiter_latency_target,
+            backoff=settings.limiter_backoff,
+        )
+
+    async def __call__(self, query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        return await self.call(self._fn, query, max_results, cursor)
+
+    async def call(self, fn: PageFn, query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        """Run ``fn``, another page function for the same upstream, under this guard."""
+        self.limiter.acquire()
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.limiter.cancel()
+            raise
+        start = time.monotonic()
+        ok = False
+        try:
+            result = await fn(query, max_results, cursor)
+            ok = True
+            return result
+        except asyncio.CancelledError:
+            # Cancelled by the deadline or a winning hedge: not an upstream error,
+            # but still judged on how long it had been running
+            ok = True
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            self.limiter.release(ok, elapsed)
+            self.breaker.record(ok, elapsed)
+
+    def stats(self) -> dict[str, object]:
+        return {"breaker": self.breaker.stats(), "limiter": self.limiter.stats()}
+
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import random
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+import httpx
+
+from app.services.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Statuses worth another attempt: rate limiting and transient gateway/server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# For sources whose client already retries 429 itself (the NCBI scheduler backs
+# off its shared rate on each one), so a throttle response is not retried twice
+SERVER_ERROR_STATUSES = RETRY_STATUSES - {429}
+
+SOURCE_RETRIES = counter(
+    "evidence_source_retries_total", "Source calls retried after a transient error", ["source"]
+)
+
+
+def is_transient(exc: BaseException, statuses: frozenset[int] = RETRY_STATUSES) -> bool:
+    """Whether ``exc`` is an upstream failure that a later attempt may not hit."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in statuses
+    return isinstance(exc, httpx.TransportError)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, exc: BaseException) -> float:
+    """Seconds to wait before retry number ``attempt`` (0-based).
+
+    Exponential backoff with full jitter, or the server's ``Retry-After`` (in
+    seconds, capped) when it sent one.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        try:
+            return min(cap, max(0.0, float(exc.response.headers["Retry-After"])))
+        except (KeyError, ValueError):
+            pass
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def _describe(exc: BaseException) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"HTTP {exc.response.status_code}"
+    return type(exc).__name__
+
+
+async def with_retries(
+    source: str,
+    fn: Callable[[], Awaitable[T]],
+    retries: int,
+    backoff: float,
+    max_backoff: float,
+    statuses: frozenset[int] = RETRY_STATUSES,
+) -> T:
+    """Await ``fn()``, calling it again up to ``retries`` times on transient errors
+    (transport errors and HTTP ``statuses``)."""
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as exc:
+            if attempt >= retries or not is_transient(exc, statuses):
+                raise
+            delay = backoff_delay(attempt, backoff, max_backoff, exc)
+            attempt += 1
+            SOURCE_RETRIES.inc(source=source)
+            logger.warning(
+                "%s call failed (%s), retry %d/%d in %.2f s",
+                source, _describe(exc), attempt, retries, delay,
+            )
+            await asyncio.sleep(delay)
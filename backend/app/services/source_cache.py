@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+
+from app.services.cache import MISSING, SingleFlight, TTLCache
+from app.services.paging import PageFn, SourcePage
+
+logger = logging.getLogger(__name__)
+
+
+class SourceCache:
+    """Stale-while-revalidate cache wrapped around one connector's page function.
+
+    Entries younger than ``ttl`` are served as-is. Entries between ``ttl`` and
+    ``ttl + stale_ttl`` are served immediately while a background task refreshes
+    them. Older entries are a miss and hit the upstream synchronously.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        fn: PageFn,
+        ttl: float,
+        stale_ttl: float,
+        max_size: int,
+    ) -> None:
+        self.source = source
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._fn = fn
+        self._cache = TTLCache(source, max_size, ttl + stale_ttl)
+        self._flight = SingleFlight()
+        self._refreshes: set[asyncio.Task] = set()
+        self.stale_hits = 0
+
+    @staticmethod
+    def _key(query: str, max_results: int, cursor: str) -> tuple[str, int, str]:
+        return " ".join(query.lower().split()), max_results, cursor
+
+    async def __call__(self, query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        key = self._key(query, max_results, cursor)
+        entry = self._cache.get_nowait(key)
+        if entry is MISSING:
+            return await self._flight.do(key, lambda: self._load(key, query, max_results, cursor))
+
+        fetched_at, page = entry
+        if time.monotonic() - fetched_at >= self.ttl:
+            self.stale_hits += 1
+            self._schedule_refresh(key, query, max_results, cursor)
+        return page
+
+    async def _load(
+        self, key: tuple[str, int, str], query: str, max_results: int, cursor: str
+    ) -> SourcePage:
+        # Upstream failures raise, so anything returned here is safe to cache
+        page = await self._fn(query, max_results, cursor)
+        self._cache.set_nowait(key, (time.monotonic(), page))
+        return page
+
+    def _schedule_refresh(
+        self, key: tuple[str, int, str], query: str, max_results: int, cursor: str
+    ) -> None:
+        if key in self._flight:
+            return
+        task = asyncio.ensure_future(
+            self._flight.do(key, lambda: self._load(key, query, max_results, cursor))
+        )
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("%s background refresh failed: %s", self.source, task.exception())
+
+    def is_fresh(self, query: str, max_results: int = 10, cursor: str = "") -> bool:
+        """Whether a call would be served without an upstream request (a stale
+        entry is refreshed in the background, so it is not fresh). Not counted
+        as a lookup."""
+        expires_in = self._cache.expires_in(self._key(query, max_results, cursor))
+        return expires_in is not None and expires_in > self.stale_ttl
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self._cache.stats(),
+            "stale_hits": self.stale_hits,
+            "refreshing": len(self._refreshes),
+        }
@@ -1,45 +1,145 @@
+import json
 import logging
 import xml.etree.ElementTree as ET
 
-import httpx
-
 from app.config import settings
+from app.services.cache import MISSING, SingleFlight, TTLCache
+from app.services.ncbi import SPELL, ncbi_get
+from app.services.offload import run_cpu
 
 logger = logging.getLogger(__name__)
 
-ESPELL_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/espell.fcgi"
+ESPELL_PATH = "/espell.fcgi"
+
+# Whole-query ESpell answers, including "no correction" (stored as the query)
+_corrections = TTLCache("spell", settings.spell_cache_size, settings.spell_cache_ttl)
+_flight = SingleFlight()
+
+# Term-level dictionary: misspelled -> corrected terms, and the terms ESpell
+# has corrected to. A query made up only of known terms is corrected locally.
+_term_fixes: dict[str, str] = {}
+_known_terms: set[str] = set()
+_stats = {"dictionary_hits": 0, "espell_calls": 0, "learned_fixes": 0}
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _load_dictionary(path: str) -> None:
+    """Seed the term dictionary from a JSON object of {misspelling: correction}."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        logger.exception("Could not load spelling dictionary from %s", path)
+        return
+    for wrong, right in entries.items():
+        _term_fixes[wrong.lower()] = right.lower()
+        _known_terms.add(right.lower())
+    logger.info("Loaded %d spelling corrections from %s", len(entries), path)
+
+
+def _learn(query: str, corrected: str) -> None:
+    """Record the terms ESpell changed when query and correction line up 1:1.
+
+    Only changed terms are learned: a term ESpell left alone may just be a
+    misspelling it has no suggestion for, so it is never marked as known.
+    """
+    before, after = query.split(), corrected.split()
+    if len(before) != len(after):
+        return
+    for wrong, right in zip(before, after):
+        if wrong == right:
+            continue
+        if len(_known_terms) + len(_term_fixes) >= settings.spell_dictionary_max:
+            return
+        _known_terms.add(right)
+        if wrong not in _term_fixes:
+            _term_fixes[wrong] = right
+            _stats["learned_fixes"] += 1
+
 
+def cached_correction(query: str) -> str | None:
+    """Return the correction for ``query`` without calling NCBI, or None if unknown.
 
-async def correct_query(query: str) -> str:
+    Like ``correct_query``, returns ``query`` itself when no correction applies.
+    """
+    key = _normalize(query)
+    cached = _corrections.get_nowait(key)
+    if cached is not MISSING:
+        return query if cached == key else cached
+
+    terms = key.split()
+    if terms and all(term in _known_terms or term in _term_fixes for term in terms):
+        _stats["dictionary_hits"] += 1
+        corrected = " ".join(_term_fixes.get(term, term) for term in terms)
+        return query if corrected == key else corrected
+    return None
+
+
+async def correct_query(query: str, *, cache_checked: bool = False) -> str:
     """Use NCBI ESpell API to correct misspelled medical/scientific terms.
 
     Returns the corrected query string, or the original query if no
-    correction is available or the API call fails.
+    correction is available or the API call fails. Known queries and queries
+    made up of known terms are answered locally (skipped with
+    ``cache_checked`` when the caller's ``cached_correction`` already missed);
+    concurrent identical lookups share one ESpell call.
     """
+    if not cache_checked:
+        known = cached_correction(query)
+        if known is not None:
+            return known
+    return await _flight.do(_normalize(query), lambda: _espell(query))
+
+
+async def _espell(query: str) -> str:
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            params: dict[str, str] = {
-                "db": "pubmed",
-                "term": query,
-            }
-            if settings.ncbi_api_key:
-                params["api_key"] = settings.ncbi_api_key
-
-            resp = await client.get(ESPELL_URL, params=params)
-            resp.raise_for_status()
-
-            root = ET.fromstring(resp.text)
-            corrected_elem = root.find("CorrectedQuery")
-
-            if corrected_elem is not None and corrected_elem.text:
-                corrected = corrected_elem.text.strip()
-                if corrected and corrected.lower() != query.lower():
-                    logger.info(
-                        "Spell correction: '%s' -> '%s'", query, corrected
-                    )
-                    return corrected
+        params: dict[str, str] = {
+            "db": "pubmed",
+            "term": query,
+        }
+        _stats["espell_calls"] += 1
+        resp = await ncbi_get(
+            ESPELL_PATH, params, lane=SPELL, timeout=settings.espell_timeout
+        )
 
+        corrected = await run_cpu(_parse_espell, resp.content, size=len(resp.content))
     except Exception:
+        # Failures are not cached, so the next request asks ESpell again
         logger.exception("ESpell spell-check failed for query: %s", query)
+        return query
+
+    key = _normalize(query)
+    if corrected and corrected.lower() != query.lower():
+        logger.info(
+            "Spell correction: '%s' -> '%s'", query, corrected
+        )
+        _corrections.set_nowait(key, corrected)
+        _learn(key, _normalize(corrected))
+        return corrected
 
+    _corrections.set_nowait(key, key)
     return query
+
+
+def _parse_espell(payload: bytes) -> str:
+    """Extract the CorrectedQuery text from an ESpell response ("" if none)."""
+    root = ET.fromstring(payload)
+    corrected_elem = root.find("CorrectedQuery")
+    if corrected_elem is not None and corrected_elem.text:
+        return corrected_elem.text.strip()
+    return ""
+
+
+def spell_stats() -> dict[str, int]:
+    return {
+        **_corrections.stats(),
+        **_stats,
+        "dictionary_terms": len(_known_terms) + len(_term_fixes),
+    }
+
+
+if settings.spell_dictionary_path:
+    _load_dictionary(settings.spell_dictionary_path)
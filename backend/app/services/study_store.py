@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from app.models.records import StudyRecord
+from app.services import encoding
+from app.services.dedup import identifiers, merge_group, normalize_title
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS studies "
+    "(key TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)",
+    # Every identifier seen for a study, mapped to the key it is stored under
+    "CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, key TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS queries (query TEXT PRIMARY KEY, fetched_at REAL NOT NULL)",
+    # Full-text index of title and abstract; each row shares the rowid of its
+    # study, so an update deletes the old entry by rowid instead of scanning
+    # (the store never runs VACUUM, which could renumber those rowids)
+    "CREATE VIRTUAL TABLE IF NOT EXISTS studies_fts USING fts5("
+    "title, abstract, tokenize = 'porter unicode61')",
+)
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _match_expression(query: str) -> str:
+    """FTS5 query requiring every word of ``query``; words are quoted so
+    operators and punctuation in user input are matched literally."""
+    return " ".join(f'"{token}"' for token in _TOKEN.findall(query.lower()))
+
+
+class StudyStore:
+    """Persistent local copy of every study returned by the connectors.
+
+    Studies are keyed by their first canonical identifier (DOI, PMID, PMCID,
+    NCT ID, else the normalized title). Every identifier is kept as an alias,
+    so a record later seen under another ID merges into the same row. Title
+    and abstract are indexed with FTS5 for ``search``. Blocking SQLite work
+    runs in a worker thread, like ``SQLiteCache``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self._writes: set[asyncio.Task] = set()
+        self.stored = 0
+        self.searches = 0
+
+    def _upsert(self, studies: list[StudyRecord]) -> None:
+        now = time.time()
+        with self._lock:
+            for study in studies:
+                aliases = [f"{kind}:{value}" for kind, value in identifiers(study)]
+                title = normalize_title(study.title)
+                if title:
+                    aliases.append(f"title:{title}")
+                if not aliases:
+                    continue
+
+                key = aliases[0]
+                for alias in aliases:
+                    row = self._conn.execute(
+                        "SELECT key FROM aliases WHERE alias = ?", (alias,)
+                    ).fetchone()
+                    if row is not None:
+                        key = row[0]
+                        break
+
+                row = self._conn.execute(
+                    "SELECT rowid, data FROM studies WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    rowid, data = row
+                    study = merge_group([StudyRecord.from_dict(encoding.loads(data)), study])
+                    # Updated in place so the study keeps the rowid its index entry uses
+                    self._conn.execute(
+                        "UPDATE studies SET data = ?, updated_at = ? WHERE rowid = ?",
+                        (encoding.dumps(study).decode(), now, rowid),
+                    )
+                    self._conn.execute("DELETE FROM studies_fts WHERE rowid = ?", (rowid,))
+                else:
+                    rowid = self._conn.execute(
+                        "INSERT INTO studies (key, data, updated_at) VALUES (?, ?, ?)",
+                        (key, encoding.dumps(study).decode(), now),
+                    ).lastrowid
+                self._conn.execute(
+                    "INSERT INTO studies_fts (rowid, title, abstract) VALUES (?, ?, ?)",
+                    (rowid, study.title, study.abstract),
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO aliases (alias, key) VALUES (?, ?)",
+                    [(alias, key) for alias in aliases],
+                )
+                self.stored += 1
+            self._conn.commit()
+
+    def _search(self, query: str, limit: int) -> list[StudyRecord]:
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.data FROM studies_fts JOIN studies s ON s.rowid = studies_fts.rowid "
+                "WHERE studies_fts MATCH ? "
+                "ORDER BY bm25(studies_fts, 2.0, 1.0) LIMIT ?",
+                (expression, limit),
+            ).fetchall()
+        self.searches += 1
+        return [StudyRecord.from_dict(encoding.loads(data)) for (data,) in rows]
+
+    def _get(self, alias: str) -> StudyRecord | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT s.data FROM aliases a JOIN studies s ON s.key = a.key WHERE a.alias = ?",
+                (alias,),
+            ).fetchone()
+        return StudyRecord.from_dict(encoding.loads(row[0])) if row is not None else None
+
+    def _mark_fetched(self, query: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queries (query, fetched_at) VALUES (?, ?)",
+                (_normalize_query(query), time.time()),
+            )
+            self._conn.commit()
+
+    def _fetched_at(self, query: str) -> float | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM queries WHERE query = ?", (_normalize_query(query),)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _record(self, studies: list[StudyRecord], query: str | None) -> None:
+        self._upsert(studies)
+        if query is not None:
+            self._mark_fetched(query)
+
+    def remember(self, studies: list[StudyRecord], query: str | None = None) -> None:
+        """Store studies in the background; the caller does not wait on the write.
+
+        Pass ``query`` when ``studies`` is a complete upstream answer for it, so
+        local-first searches know how fresh the index is for that query.
+        """
+        if not studies and query is None:
+            return
+        task = asyncio.ensure_future(asyncio.to_thread(self._record, studies, query))
+        self._writes.add(task)
+        task.add_done_callback(self._write_done)
+
+    def _write_done(self, task: asyncio.Task) -> None:
+        self._writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Study store write failed: %s", task.exception())
+
+    async def upsert(self, studies: list[StudyRecord]) -> None:
+        await asyncio.to_thread(self._upsert, studies)
+
+    async def search(self, query: str, limit: int) -> list[StudyRecord]:
+        """Best local matches for ``query`` (every word must appear), BM25-ordered."""
+        return await asyncio.to_thread(self._search, query, limit)
+
+    async def get(self, alias: str) -> StudyRecord | None:
+        """The stored study with identifier ``alias`` (``pmid:123``, ``doi:10.1/x``...)."""
+        return await asyncio.to_thread(self._get, alias)
+
+    async def fetched_at(self, query: str) -> float | None:
+        """Unix time ``query`` was last answered upstream, or None if never."""
+        return await asyncio.to_thread(self._fetched_at, query)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM studies").fetchone()
+        return {
+            "studies": count,
+            "stored": self.stored,
+            "searches": self.searches,
+            "pending_writes": len(self._writes),
+        }
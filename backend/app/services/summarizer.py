@@ -1,9 +1,23 @@
+import asyncio
+import hashlib
 import logging
+import re
+from collections import Counter
+from collections.abc import AsyncIterator
+from functools import lru_cache
+from typing import Literal
 
 from openai import AsyncOpenAI
 
 from app.config import settings
-from app.models.schemas import Study
+from app.models.records import StudyRecord
+from app.services.cache import MISSING, SingleFlight, TTLCache
+from app.services.offload import run_cpu
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to an estimate
+    tiktoken = None
 
 logger = logging.getLogger(__name__)
 
@@ -15,46 +29,345 @@ SYSTEM_PROMPT = (
     "Do not provide medical advice. Be objective and concise."
 )
 
+MODEL = "gpt-4o-mini"
+MAX_PROMPT_STUDIES = 25
+# A study whose abstract would get fewer tokens than this is left out of the prompt
+MIN_SNIPPET_TOKENS = 32
+# Rough size of a token in English text, when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# What produced a summary: the LLM, or the local extractive fallback (which
+# must never be presented as AI synthesis)
+SummaryKind = Literal["llm", "extractive"]
+LLM: SummaryKind = "llm"
+EXTRACTIVE: SummaryKind = "extractive"
+
+_summary_cache = TTLCache("summary", settings.summary_cache_size, settings.summary_cache_ttl)
+_summary_flight = SingleFlight()
+_client: AsyncOpenAI | None = None
+_outcomes = {"timeouts": 0, "errors": 0, "fallbacks": 0}
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """The model's tokenizer, or None when tiktoken or its encoding files are unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(MODEL)
+    except Exception as exc:
+        logger.warning("Tokenizer for %s unavailable (%s); estimating token counts", MODEL, exc)
+        return None
+
+
+async def load_tokenizer() -> None:
+    """Load the tokenizer off the event loop (called from the app lifespan).
+
+    tiktoken builds the BPE ranks on first use, which takes hundreds of
+    milliseconds and would otherwise block the loop in the first request.
+    """
+    await asyncio.to_thread(_encoding)
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to ``max_tokens``, at a sentence end when one is near, else a word."""
+    encoding = _encoding()
+    if encoding is None:
+        if len(text) <= max_tokens * CHARS_PER_TOKEN:
+            return text
+        cut = text[: max_tokens * CHARS_PER_TOKEN]
+    else:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        cut = encoding.decode(tokens[:max_tokens])
+    sentence_end = cut.rfind(". ")
+    if sentence_end >= len(cut) // 2:
+        return cut[: sentence_end + 1]
+    return cut.rsplit(" ", 1)[0] + "…"
+
+
+def _build_user_message(query: str, studies: list[StudyRecord]) -> str:
+    """Build the user prompt within ``summary_prompt_tokens``.
+
+    Studies are taken in the order given (ranked, most relevant first), each
+    abstract capped at ``summary_study_tokens``, until the budget runs out.
+    """
+    header = f"Search query: \"{query}\"\n\nStudies found ({len(studies)} total):\n\n"
+    footer = "\n\nProvide a 2-3 sentence evidence-based summary."
+    budget = settings.summary_prompt_tokens - count_tokens(SYSTEM_PROMPT + header + footer)
+
+    study_texts: list[str] = []
+    for i, study in enumerate(studies[:MAX_PROMPT_STUDIES], 1):
+        heading = f"{i}. [{study.source}] {study.title}\n   "
+        room = min(settings.summary_study_tokens, budget - count_tokens(heading) - 1)
+        if room < MIN_SNIPPET_TOKENS:
+            break
+        snippet = _truncate(study.abstract, room) if study.abstract else "No abstract available."
+        text = heading + snippet
+        study_texts.append(text)
+        budget -= count_tokens(text) + 1
 
-async def summarize_studies(query: str, studies: list[Study]) -> str:
-    """Generate a 2-3 sentence AI summary of the retrieved studies."""
+    return header + "\n\n".join(study_texts) + footer
+
+
+async def _user_message(query: str, studies: list[StudyRecord]) -> str:
+    """``_build_user_message`` off the event loop.
+
+    Tokenizing the abstracts costs far more per byte than parsing a payload,
+    so it is always handed to the thread pool, where the tokenizer is shared.
+    """
+    return await run_cpu(
+        _build_user_message, query, studies, size=settings.offload_min_bytes, picklable=False
+    )
+
+
+def _fingerprint(user_message: str) -> str:
+    """Content fingerprint of the prompt actually sent (model plus packed studies)."""
+    digest = hashlib.sha256()
+    digest.update(MODEL.encode())
+    digest.update(b"\0" + user_message.encode())
+    return digest.hexdigest()
+
+
+def _get_client() -> AsyncOpenAI:
+    """The shared OpenAI client (and its connection pool), created on first use."""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=settings.openai_api_key, base_url=settings.openai_base_url or None
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared OpenAI client (called from the app lifespan)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.close()
+
+
+async def summarize_studies(
+    query: str, studies: list[StudyRecord]
+) -> tuple[str, SummaryKind | None]:
+    """Generate a 2-3 sentence AI summary of the retrieved studies.
+
+    Returns (summary, kind), or ("", None) without a summary. Summaries are
+    cached by prompt fingerprint and concurrent identical prompts share a
+    single OpenAI call. Without an API key, or when the completion fails or
+    takes longer than ``summary_timeout``, the summary is extractive instead
+    (see ``extractive_summary``) and not cached here; callers caching whole
+    responses check ``is_cacheable``.
+    """
     if not studies:
-        return ""
+        return "", None
 
     if not settings.openai_api_key:
-        logger.warning("OpenAI API key not configured — skipping summarization")
-        return ""
+        logger.debug("OpenAI API key not configured — using the extractive summary")
+        return _fallback(query, studies)
+
+    user_message = await _user_message(query, studies)
+    key = _fingerprint(user_message)
+    cached = _summary_cache.get_nowait(key)
+    if cached is not MISSING:
+        return cached, LLM
 
+    summary = await _summary_flight.do(key, lambda: _complete(query, user_message))
+    # Failed completions return "" and are not cached
+    if summary:
+        _summary_cache.set_nowait(key, summary)
+        return summary, LLM
+    return _fallback(query, studies)
+
+
+async def stream_summary(
+    query: str, studies: list[StudyRecord]
+) -> AsyncIterator[tuple[str, SummaryKind]]:
+    """Yield (delta, kind) pairs as summary tokens arrive from OpenAI.
+
+    A cached summary is yielded in one piece; a completed stream is cached
+    under the same fingerprint as ``summarize_studies``. If no token arrives
+    within ``summary_timeout`` (or the call fails first) the extractive
+    summary is yielded instead; a stream that breaks off midway just ends.
+    """
+    if not studies:
+        return
+    if not settings.openai_api_key:
+        fallback, kind = _fallback(query, studies)
+        if fallback:
+            yield fallback, kind
+        return
+
+    user_message = await _user_message(query, studies)
+    key = _fingerprint(user_message)
+    cached = _summary_cache.get_nowait(key)
+    if cached is not MISSING:
+        yield cached, LLM
+        return
+
+    parts: list[str] = []
+    stream = None
     try:
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
-
-        # Build context from top studies (limit to avoid token overflow)
-        study_texts: list[str] = []
-        for i, study in enumerate(studies[:15], 1):
-            snippet = study.abstract[:500] if study.abstract else "No abstract available."
-            study_texts.append(
-                f"{i}. [{study.source}] {study.title}\n   {snippet}"
+        # Only the wait for the first token is bounded; nothing is yielded inside it
+        async with asyncio.timeout(settings.summary_timeout) as first_token:
+            stream = await _get_client().chat.completions.create(
+                model=MODEL,
+                messages=_messages(user_message),
+                max_tokens=settings.summary_max_tokens,
+                temperature=0.3,
+                stream=True,
             )
-        context = "\n\n".join(study_texts)
-
-        user_message = (
-            f"Search query: \"{query}\"\n\n"
-            f"Studies found ({len(studies)} total):\n\n{context}\n\n"
-            "Provide a 2-3 sentence evidence-based summary."
+            chunks = aiter(stream)
+            while not parts:
+                chunk = await anext(chunks, None)
+                if chunk is None:
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+            first_token.reschedule(None)
+        if parts:
+            yield parts[0], LLM
+            async for chunk in chunks:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta, LLM
+    except TimeoutError:
+        _outcomes["timeouts"] += 1
+        logger.warning(
+            "OpenAI stream gave no tokens within %.1f s for query: %s", settings.summary_timeout, query
         )
+    except Exception:
+        _outcomes["errors"] += 1
+        logger.exception("OpenAI streaming summarization failed for query: %s", query)
+        if parts:
+            return
+    finally:
+        # Stop the upstream generation (billed tokens) on a timeout, an error
+        # or when the consumer goes away mid-stream
+        if stream is not None:
+            await stream.close()
+
+    summary = "".join(parts).strip()
+    if summary:
+        _summary_cache.set_nowait(key, summary)
+        return
+    fallback, kind = _fallback(query, studies)
+    if fallback:
+        yield fallback, kind
+
+
+def _messages(user_message: str) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_message},
+    ]
 
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_message},
-            ],
-            max_tokens=300,
-            temperature=0.3,
-        )
 
-        return response.choices[0].message.content.strip()
+async def _complete(query: str, user_message: str) -> str:
+    try:
+        response = await asyncio.wait_for(
+            _get_client().chat.completions.create(
+                model=MODEL,
+                messages=_messages(user_message),
+                max_tokens=settings.summary_max_tokens,
+                temperature=0.3,
+            ),
+            settings.summary_timeout,
+        )
+        return (response.choices[0].message.content or "").strip()
 
+    except TimeoutError:
+        _outcomes["timeouts"] += 1
+        logger.warning(
+            "OpenAI summarization took over %.1f s for query: %s", settings.summary_timeout, query
+        )
+        return ""
     except Exception:
+        _outcomes["errors"] += 1
         logger.exception("OpenAI summarization failed for query: %s", query)
         return ""
+
+
+def is_cacheable(kind: SummaryKind | None) -> bool:
+    """Whether a response with this summary may be cached with its search.
+
+    With an API key configured, an extractive summary only stands in for a
+    completion that timed out or failed, so the next request should try the
+    LLM again instead of being served the fallback until the entry expires.
+    """
+    return kind != EXTRACTIVE or not settings.openai_api_key
+
+
+def _fallback(query: str, studies: list[StudyRecord]) -> tuple[str, SummaryKind | None]:
+    if settings.summary_fallback != "extractive":
+        return "", None
+    _outcomes["fallbacks"] += 1
+    return extractive_summary(query, studies), EXTRACTIVE
+
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(])")
+# Structured-abstract labels ("RESULTS:", "Conclusions:") opening a sentence
+_SECTION = re.compile(r"^([A-Z][A-Za-z /&-]{2,30}):\s+")
+_FINDING_SECTIONS = {"results", "result", "conclusion", "conclusions", "findings", "interpretation"}
+EXTRACTIVE_STUDIES = 10
+EXTRACTIVE_SENTENCES = 3
+
+
+def extractive_summary(query: str, studies: list[StudyRecord]) -> str:
+    """A deterministic summary picked from the top abstracts, without the LLM.
+
+    Sentences are scored on the query terms they contain, with a bonus for
+    results and conclusions; the best ones (at most one per study) are
+    returned in rank order after a line counting the studies per source.
+    """
+    if not studies:
+        return ""
+    terms = set(_WORD.findall(query.lower()))
+    candidates: list[tuple[float, int, int, str]] = []
+    for rank, study in enumerate(studies[:EXTRACTIVE_STUDIES]):
+        section = ""
+        for position, sentence in enumerate(_SENTENCE_SPLIT.split(study.abstract)):
+            label = _SECTION.match(sentence)
+            if label:
+                section = label.group(1).lower()
+                sentence = sentence[label.end():]
+            if not 40 <= len(sentence) <= 400:
+                continue
+            overlap = len(terms & set(_WORD.findall(sentence.lower())))
+            score = overlap + (1.5 if section in _FINDING_SECTIONS else 0.0) - 0.1 * rank
+            candidates.append((score, rank, position, sentence.strip()))
+
+    picked: dict[int, str] = {}
+    for _, rank, _, sentence in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        if rank not in picked:
+            picked[rank] = sentence
+            if len(picked) == EXTRACTIVE_SENTENCES:
+                break
+
+    by_source = Counter(study.source for study in studies)
+    counts = ", ".join(f"{count} {source}" for source, count in by_source.most_common())
+    lead = f"{len(studies)} studies found ({counts})."
+    if not picked:
+        return f"{lead} Most relevant: \"{studies[0].title}\"."
+    return " ".join([lead, *(picked[rank] for rank in sorted(picked))])
+
+
+def summary_cache_stats() -> dict[str, float]:
+    """Summary cache counters plus hit rate, coalesced OpenAI calls and fallbacks."""
+    stats: dict[str, float] = dict(_summary_cache.stats())
+    lookups = _summary_cache.hits + _summary_cache.misses
+    stats["hit_rate"] = round(_summary_cache.hits / lookups, 4) if lookups else 0.0
+    stats["coalesced"] = _summary_flight.coalesced
+    stats.update(_outcomes)
+    return stats
@@ -0,0 +1,103 @@
+"""Exercise the search deadline and hedged requests against a fake upstream.
+
+Scenario "deadline": OpenAlex is delayed past the request budget, so the
+response should come back at roughly ``--deadline`` with OpenAlex marked
+``timeout`` and the other sources ``ok``.
+
+Scenario "hedging": Europe PMC has a heavy latency tail (``--tail-rate`` of
+calls take ``--tail`` seconds). With hedging enabled, calls that pass the
+observed p95 are re-issued, which should cut the p99.
+
+Usage (from backend/):
+    python -m benchmarks.bench_deadlines --deadline 1.0 --rounds 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from app.config import settings
+from app.services import http
+from app.services.europe_pmc import search_europe_pmc_page
+from app.services.fanout import HedgedSource, gather_sources
+from app.services.openalex import search_openalex_page
+from app.services.pubmed import search_pubmed_page
+from benchmarks.stub_server import StubServer, default_routes
+
+
+def _point_at(server: StubServer) -> None:
+    settings.ncbi_base_url = server.base_url
+    settings.clinical_trials_base_url = server.base_url
+    settings.europe_pmc_base_url = server.base_url
+    settings.openalex_base_url = server.base_url
+
+
+async def _deadline_scenario(server: StubServer, deadline: float) -> dict:
+    server.route_latency["/works"] = deadline * 3
+    start = time.perf_counter()
+    pages, statuses = await gather_sources(
+        {
+            "PubMed": lambda: search_pubmed_page("statin", 10),
+            "EuropePMC": lambda: search_europe_pmc_page("statin", 10),
+            "OpenAlex": lambda: search_openalex_page("statin", 10),
+        },
+        deadline,
+    )
+    server.route_latency.clear()
+    return {
+        "scenario": "deadline",
+        "deadline_s": deadline,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "studies": sum(len(page.studies) for page in pages.values()),
+        "source_status": [status.model_dump() for status in statuses],
+    }
+
+
+async def _hedging_scenario(server: StubServer, rounds: int, tail: float, tail_rate: float) -> list[dict]:
+    rng = random.Random(7)
+    server.route_latency["/search"] = lambda: tail if rng.random() < tail_rate else 0.01
+    results = []
+    for enabled in (False, True):
+        settings.hedging_enabled = enabled
+        hedged = HedgedSource("EuropePMC", search_europe_pmc_page)
+        latencies: list[float] = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await hedged("statin", 10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        results.append({
+            "scenario": "hedging",
+            "hedging_enabled": enabled,
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+            **hedged.stats(),
+        })
+    server.route_latency.clear()
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deadline", type=float, default=1.0)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--tail", type=float, default=0.5)
+    parser.add_argument("--tail-rate", type=float, default=0.03)
+    args = parser.parse_args()
+
+    server = await StubServer(default_routes()).start()
+    _point_at(server)
+    try:
+        results = [await _deadline_scenario(server, args.deadline)]
+        results += await _hedging_scenario(server, args.rounds, args.tail, args.tail_rate)
+    finally:
+        await http.close_clients()
+        await server.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
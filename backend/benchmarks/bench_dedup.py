@@ -0,0 +1,145 @@
+"""Micro-benchmark: title-prefix dedup vs the identifier + MinHash/LSH engine.
+
+Generates a synthetic multi-source result set in which each underlying work
+appears one to four times with realistic variation: DOI case and resolver
+prefixes, punctuation and trailing periods, a dropped word, and only some
+sources carrying a PMID. A share of distinct works deliberately share a long
+title prefix ("... : a randomized trial" vs "... : a meta-analysis").
+
+"legacy" is the previous first-50-lowercased-characters key. "engine" is
+``app.services.dedup.Deduplicator``. Reports wall time plus pairwise precision
+and recall against the generated ground truth.
+
+Usage (from backend/):
+    python -m benchmarks.bench_dedup --records 10000
+"""
+
+import argparse
+import itertools
+import json
+import random
+import time
+from collections import defaultdict
+
+from app.models.records import StudyRecord
+from app.services.dedup import Deduplicator
+
+SOURCES = ["PubMed", "ClinicalTrials", "EuropePMC", "OpenAlex"]
+SUFFIXES = ["a randomized controlled trial", "a systematic review and meta-analysis",
+            "a prospective cohort study", "protocol for a multicentre trial"]
+
+
+def _vocabulary(rng: random.Random, size: int = 3000) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choices(letters, k=rng.randint(4, 11))) for _ in range(size)]
+
+
+def _variant(title: str, rng: random.Random) -> str:
+    roll = rng.random()
+    if roll < 0.25:
+        return title.upper() if rng.random() < 0.2 else title.title()
+    if roll < 0.5:
+        return title + "."
+    if roll < 0.65:
+        return title.replace(":", " -").replace(",", "")
+    if roll < 0.75:
+        words = title.split()
+        del words[rng.randrange(1, len(words))]
+        return " ".join(words)
+    return title
+
+
+def synthetic_records(records: int, seed: int = 7) -> tuple[list[StudyRecord], list[int]]:
+    """Return shuffled studies and, per study, the id of the work it describes."""
+    rng = random.Random(seed)
+    vocab = _vocabulary(rng)
+    studies: list[StudyRecord] = []
+    truth: list[int] = []
+    work = 0
+    while len(studies) < records:
+        stem = " ".join(rng.choices(vocab, k=rng.randint(8, 14)))
+        # ~20% of stems are shared by several distinct works
+        titles = (
+            [f"{stem}: {suffix}" for suffix in rng.sample(SUFFIXES, rng.randint(2, 3))]
+            if rng.random() < 0.2
+            else [stem]
+        )
+        for title in titles:
+            doi = f"10.{rng.randint(1000, 9999)}/{rng.getrandbits(40):x}"
+            pmid = str(20_000_000 + work)
+            for source in rng.sample(SOURCES, rng.randint(1, 4)):
+                has_doi = source != "ClinicalTrials" and rng.random() < 0.7
+                studies.append(
+                    StudyRecord(
+                        title=_variant(title, rng),
+                        source=source,
+                        doi=(rng.choice(["", "https://doi.org/", "doi:"]) + doi.upper()) if has_doi else "",
+                        pmid=pmid if source in ("PubMed", "EuropePMC") and rng.random() < 0.8 else "",
+                    )
+                )
+                truth.append(work)
+            work += 1
+    order = list(range(records))
+    rng.shuffle(order)
+    return [studies[i] for i in order], [truth[i] for i in order]
+
+
+def legacy_groups(studies: list[StudyRecord]) -> list[list[int]]:
+    groups: dict[str, list[int]] = defaultdict(list)
+    for index, study in enumerate(studies):
+        key = study.title.strip().lower()[:50]
+        if key:
+            groups[key].append(index)
+    return list(groups.values())
+
+
+def engine_groups(studies: list[StudyRecord]) -> list[list[int]]:
+    dedup = Deduplicator()
+    for study in studies:
+        dedup.add(study)
+    position = {id(study): index for index, study in enumerate(studies)}
+    return [[position[id(study)] for study in group] for group in dedup.groups()]
+
+
+def _pairs(groups: list[list[int]]) -> set[tuple[int, int]]:
+    return {pair for group in groups for pair in itertools.combinations(sorted(group), 2)}
+
+
+def _score(name: str, fn, studies: list[StudyRecord], truth: list[int], repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        groups = fn(studies)
+        timings.append(time.perf_counter() - start)
+
+    by_work: dict[int, list[int]] = defaultdict(list)
+    for index, work in enumerate(truth):
+        by_work[work].append(index)
+    expected = _pairs(list(by_work.values()))
+    found = _pairs(groups)
+    correct = len(expected & found)
+    return {
+        "dedup": name,
+        "best_ms": round(min(timings) * 1000, 1),
+        "groups": len(groups),
+        "precision": round(correct / len(found), 4) if found else 1.0,
+        "recall": round(correct / len(expected), 4) if expected else 1.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    studies, truth = synthetic_records(args.records)
+    results = [
+        _score("legacy", legacy_groups, studies, truth, args.repeat),
+        _score("engine", engine_groups, studies, truth, args.repeat),
+    ]
+    print(json.dumps({"records": len(studies), "works": len(set(truth)), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark: per-search HTTP clients vs the shared pooled clients.
+
+Starts one local stub server per upstream host, points the connectors at it and
+runs the spell-check + four-source fan-out repeatedly. The "unpooled" mode
+closes every client after each search, which reproduces the old
+client-per-call behaviour; "pooled" keeps the app-scoped clients open.
+
+Usage (from backend/):
+    python -m benchmarks.bench_http_pool --rounds 200 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.config import settings
+from app.services import http
+from app.services.clinical_trials import search_clinical_trials
+from app.services.europe_pmc import search_europe_pmc
+from app.services.openalex import search_openalex
+from app.services.pubmed import search_pubmed
+from app.services.spellcheck import correct_query
+from benchmarks.stub_server import StubServer, default_routes
+
+
+async def _one_search(query: str) -> None:
+    corrected = await correct_query(query)
+    await asyncio.gather(
+        search_pubmed(corrected, 10),
+        search_clinical_trials(corrected, 10),
+        search_europe_pmc(corrected, 10),
+        search_openalex(corrected, 10),
+    )
+
+
+async def _run(mode: str, rounds: int, servers: list[StubServer]) -> dict:
+    for server in servers:
+        server.reset_counters()
+    await http.close_clients()
+    latencies: list[float] = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await _one_search("metformin diabetes")
+        latencies.append((time.perf_counter() - start) * 1000)
+        if mode == "unpooled":
+            await http.close_clients()
+    await http.close_clients()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rounds": rounds,
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "connections": sum(s.connections for s in servers),
+        "requests": sum(s.requests for s in servers),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency per request (s)")
+    args = parser.parse_args()
+
+    servers = [await StubServer(default_routes(), args.latency).start() for _ in range(4)]
+    settings.ncbi_base_url = servers[0].base_url
+    settings.clinical_trials_base_url = servers[1].base_url
+    settings.europe_pmc_base_url = servers[2].base_url
+    settings.openalex_base_url = servers[3].base_url
+    try:
+        results = [await _run(mode, args.rounds, servers) for mode in ("unpooled", "pooled")]
+    finally:
+        for server in servers:
+            await server.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""Load test: event-loop lag and search latency with and without parse offload.
+
+Serves large PubMed EFetch and OpenAlex payloads from the local stub server and
+runs concurrent PubMed + OpenAlex searches under each ``offload_mode``
+("off", "thread", "process"). A probe task sleeps in short intervals and
+records how late it wakes up, which is the event-loop lag every other request
+on the worker would see.
+
+Usage (from backend/):
+    python -m benchmarks.bench_offload --requests 200 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import time
+
+from app.config import settings
+from app.services import http, ncbi, offload
+from app.services.openalex import search_openalex
+from app.services.pubmed import search_pubmed
+from benchmarks.bench_pubmed_parse import synthetic_efetch
+from benchmarks.stub_server import StubServer, default_routes, json_response
+
+PROBE_INTERVAL = 0.005
+
+
+def _heavy_routes(records: int) -> dict:
+    words = [f"word{i}" for i in range(300)]
+    works = json.dumps({"results": [
+        {
+            "id": f"https://openalex.org/W{n}",
+            "title": f"Heavy OpenAlex work {n}",
+            "abstract_inverted_index": {w: [i, i + 300] for i, w in enumerate(words)},
+            "authorships": [{"author": {"display_name": f"Author {a}"}} for a in range(10)],
+            "publication_date": "2020-01-01",
+            "doi": f"https://doi.org/10.3000/heavy.{n}",
+            "primary_location": {"source": {"display_name": "Heavy Journal"}},
+        }
+        for n in range(records)
+    ]}).encode()
+    efetch = synthetic_efetch(records)
+    routes = default_routes()
+    routes["/works"] = lambda path, query, body: (200, "application/json", works)
+    routes["/efetch.fcgi"] = lambda path, query, body: (200, "text/xml", efetch)
+    return routes
+
+
+def _serve(records: int, port_queue: multiprocessing.Queue) -> None:
+    """Run the stub in its own process so its CPU does not skew the measured loop."""
+
+    async def serve() -> None:
+        server = await StubServer(_heavy_routes(records)).start()
+        port_queue.put(server.base_url)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+async def _probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+async def _run(mode: str, requests: int, concurrency: int, records: int) -> dict:
+    settings.offload_mode = mode
+    offload.shutdown_executors()
+    offload.start_executors()
+    # Warm the pools so process start-up is not counted
+    await asyncio.gather(search_pubmed("warm", records), search_openalex("warm", records))
+
+    latencies: list[float] = []
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.ensure_future(_probe(lags, stop))
+    queue = iter(range(requests))
+
+    async def worker() -> None:
+        for i in queue:
+            start = time.perf_counter()
+            await asyncio.gather(search_pubmed(f"q{i}", records), search_openalex(f"q{i}", records))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return {
+        "offload_mode": mode,
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_p50_ms": _pct(latencies, 0.5),
+        "latency_p99_ms": _pct(latencies, 0.99),
+        "loop_lag_p99_ms": _pct(lags, 0.99),
+        "loop_lag_max_ms": round(max(lags), 2),
+        "loop_lag_mean_ms": round(statistics.fmean(lags), 2),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--records", type=int, default=200, help="records per upstream response")
+    parser.add_argument("--modes", default="off,thread,process")
+    args = parser.parse_args()
+
+    port_queue: multiprocessing.Queue = multiprocessing.Queue()
+    stub = multiprocessing.Process(target=_serve, args=(args.records, port_queue), daemon=True)
+    stub.start()
+    base_url = port_queue.get(timeout=30)
+    settings.ncbi_base_url = base_url
+    settings.openalex_base_url = base_url
+    ncbi.scheduler.rate = ncbi.scheduler.burst = 10_000.0
+    try:
+        results = [
+            await _run(mode, args.requests, args.concurrency, args.records)
+            for mode in args.modes.split(",")
+        ]
+    finally:
+        offload.shutdown_executors()
+        await http.close_clients()
+        stub.terminate()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
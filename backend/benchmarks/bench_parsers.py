@@ -0,0 +1,101 @@
+"""Micro-benchmarks for each connector's payload parser, deduplication and ranking.
+
+Parsers run on the recorded fixtures (benchmarks/fixtures). Dedup and ranking
+run on the union of everything the fixtures parse to, which overlaps across
+sources the way live results do. Each case reports the best and median time
+per call over ``--repeat`` rounds of ``--number`` calls (timeit style).
+
+Usage (from backend/):
+    python -m benchmarks.bench_parsers --repeat 7 --number 20
+"""
+
+import argparse
+import json
+import statistics
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+
+from app.services.clinical_trials import _parse_trials_payload
+from app.services.dedup import Deduplicator, deduplicate_studies
+from app.services.europe_pmc import _parse_epmc_payload
+from app.services.openalex import _parse_openalex_payload
+from app.services.pubmed import _parse_efetch_payload, _parse_esummary_payload
+from app.services.ranking import rank_studies
+from app.services.spellcheck import _parse_espell
+from benchmarks.stub_server import FIXTURE_DIR
+
+QUERY = "metformin type 2 diabetes"
+
+
+def _time(fn: Callable[[], object], repeat: int, number: int) -> dict[str, float]:
+    rounds = [seconds / number for seconds in timeit.repeat(fn, repeat=repeat, number=number)]
+    return {
+        "best_us": round(min(rounds) * 1e6, 1),
+        "median_us": round(statistics.median(rounds) * 1e6, 1),
+    }
+
+
+def run(repeat: int = 7, number: int = 20, directory: Path = FIXTURE_DIR) -> list[dict]:
+    parsers: dict[str, tuple[Callable[[bytes], object], str]] = {
+        "_parse_efetch_payload": (_parse_efetch_payload, "efetch.xml"),
+        "_parse_trials_payload": (_parse_trials_payload, "clinicaltrials.json"),
+        "_parse_epmc_payload": (_parse_epmc_payload, "europepmc.json"),
+        "_parse_openalex_payload": (_parse_openalex_payload, "openalex.json"),
+        "_parse_espell": (_parse_espell, "espell.xml"),
+        # Lite search: metadata-only responses for the same results
+        "_parse_esummary_payload": (_parse_esummary_payload, "esummary.json"),
+        "_parse_trials_payload[lite]": (_parse_trials_payload, "clinicaltrials_lite.json"),
+        "_parse_epmc_payload[lite]": (_parse_epmc_payload, "europepmc_lite.json"),
+        "_parse_openalex_payload[lite]": (_parse_openalex_payload, "openalex_lite.json"),
+    }
+    payloads = {fixture: (directory / fixture).read_bytes() for _, fixture in parsers.values()}
+
+    results = []
+    for name, (parse, fixture) in parsers.items():
+        payload = payloads[fixture]
+        timing = _time(lambda: parse(payload), repeat, number)
+        results.append({
+            "case": name,
+            "bytes": len(payload),
+            **timing,
+            "mb_per_s": round(len(payload) / timing["best_us"], 1),
+        })
+
+    studies = [study for _, study in _parse_efetch_payload(payloads["efetch.xml"])]
+    for parse, fixture in (
+        (_parse_trials_payload, "clinicaltrials.json"),
+        (_parse_epmc_payload, "europepmc.json"),
+        (_parse_openalex_payload, "openalex.json"),
+    ):
+        studies += parse(payloads[fixture]).studies
+
+    def dedup_and_rank() -> None:
+        dedup = Deduplicator()
+        dedup.add_all(studies)
+        rank_studies(QUERY, dedup)
+
+    unique = len(deduplicate_studies(studies))
+    results.append({"case": "deduplicate_studies", "studies": len(studies), "unique": unique,
+                    **_time(lambda: deduplicate_studies(studies), repeat, number)})
+    results.append({"case": "dedup+rank_studies", "studies": len(studies),
+                    **_time(dedup_and_rank, repeat, number)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--number", type=int, default=20)
+    parser.add_argument("--output", type=Path, help="also write the JSON results here")
+    args = parser.parse_args()
+
+    text = json.dumps(run(args.repeat, args.number), indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
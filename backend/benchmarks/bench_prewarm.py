@@ -0,0 +1,139 @@
+"""Skewed search traffic against a short search-cache TTL, with and without pre-warming.
+
+Queries are drawn from ``--queries`` distinct searches with Zipf-distributed
+popularity and sent open-loop at ``--rate`` per second for ``--duration``
+seconds. Source caches are off, so every search-cache miss is a cold fan-out
+to the stub upstreams. Run once with and once without ``--prewarm`` and
+compare the latency percentiles, the search-cache hit ratio and the upstream
+requests spent.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prewarm --duration 30 --ttl 5
+    python -m benchmarks.bench_prewarm --duration 30 --ttl 5 --prewarm
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+import httpx
+
+from app.config import settings
+from benchmarks.bench_search import _percentile, configure, start_stub
+from benchmarks.stub_server import fixture_routes
+
+QUERY = "metformin diabetes"
+
+
+def zipf_weights(n: int, s: float) -> list[float]:
+    return [1 / rank**s for rank in range(1, n + 1)]
+
+
+async def drive(
+    client: httpx.AsyncClient, queries: list[str], weights: list[float], rate: float, duration: float
+) -> list[float]:
+    latencies: list[float] = []
+    rng = random.Random(7)
+
+    async def one(q: str) -> None:
+        start = time.perf_counter()
+        resp = await client.get("/api/search", params={"q": q})
+        if resp.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    tasks = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        q = rng.choices(queries, weights)[0]
+        tasks.append(asyncio.ensure_future(one(q)))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+async def run(
+    prewarm: bool,
+    duration: float = 30.0,
+    rate: float = 20.0,
+    queries: int = 200,
+    zipf: float = 1.1,
+    ttl: float = 5.0,
+    latency: float = 0.2,
+    openai_latency: float = 0.3,
+) -> dict:
+    server = start_stub(fixture_routes(), latency, openai_latency)
+    configure(server, warm=True, ncbi_rate=10_000.0)
+    settings.source_cache_enabled = False
+    settings.search_cache_ttl = ttl
+    settings.prewarm_enabled = prewarm
+    settings.prewarm_interval = max(0.2, ttl / 10)
+    settings.prewarm_lead = ttl / 3
+    settings.prewarm_min_hits = 2
+    # Imported late: the module-level caches read settings on import
+    from app.main import app
+    from app.routes import _search_cache, prewarmer
+
+    names = [f"{QUERY} {i}" for i in range(queries)]
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            server.reset_counters()
+            latencies = await drive(client, names, zipf_weights(queries, zipf), rate, duration)
+    latencies.sort()
+    memory = _search_cache.stats()["tiers"]["memory"]
+    lookups = memory["hits"] + memory["misses"]
+    return {
+        "config": {
+            "prewarm": prewarm,
+            "duration_s": duration,
+            "rate_rps": rate,
+            "queries": queries,
+            "zipf_s": zipf,
+            "search_cache_ttl_s": ttl,
+            "upstream_latency_s": latency,
+        },
+        "requests": len(latencies),
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "mean_ms": round(statistics.fmean(latencies), 1),
+        "search_cache_hit_ratio": round(memory["hits"] / lookups, 3) if lookups else 0.0,
+        "upstream_requests": server.requests,
+        "prewarm": prewarmer.stats(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prewarm", action="store_true", help="run the pre-warming worker")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--rate", type=float, default=20.0, help="searches per second")
+    parser.add_argument("--queries", type=int, default=200, help="distinct searches")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew exponent")
+    parser.add_argument("--ttl", type=float, default=5.0, help="search cache TTL (s)")
+    parser.add_argument("--latency", type=float, default=0.2, help="upstream latency (s)")
+    parser.add_argument("--output", type=Path, help="also write the JSON results here")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(
+        args.prewarm,
+        duration=args.duration,
+        rate=args.rate,
+        queries=args.queries,
+        zipf=args.zipf,
+        ttl=args.ttl,
+        latency=args.latency,
+    ))
+    text = json.dumps(result, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Micro-benchmark: whole-document PubMed EFetch parsing vs the incremental parser.
+
+"legacy" reproduces the previous approach (decode the full body, ``ET.fromstring``
+and ``.//`` descendant searches per article). "incremental" feeds the bytes to
+``PubmedArticleParser`` in 64 KiB chunks, as ``aiter_bytes`` does. Reports wall
+time and tracemalloc peak for each.
+
+By default a synthetic EFetch document is generated with realistic bulk per
+article (MeSH headings, reference lists); pass ``--fixture`` to use a saved
+EFetch response instead.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pubmed_parse --articles 5000
+    python -m benchmarks.bench_pubmed_parse --fixture efetch_large.xml
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from app.models.records import StudyRecord
+from app.services.pubmed import PubmedArticleParser, _get_text, _parse_pub_date
+
+CHUNK_SIZE = 64 * 1024
+
+
+def synthetic_efetch(articles: int) -> bytes:
+    mesh = "".join(
+        f"<MeshHeading><DescriptorName UI=\"D{i:06d}\">Term {i}</DescriptorName></MeshHeading>"
+        for i in range(15)
+    )
+    refs = "".join(
+        f"<Reference><Citation>Ref {i}. J Ref. 2001;1:1.</Citation><ArticleIdList>"
+        f"<ArticleId IdType=\"pubmed\">{10000 + i}</ArticleId></ArticleIdList></Reference>"
+        for i in range(40)
+    )
+    body = []
+    for n in range(articles):
+        pmid = 30000000 + n
+        body.append(
+            "<PubmedArticle><MedlineCitation Status=\"MEDLINE\">"
+            f"<PMID Version=\"1\">{pmid}</PMID><Article PubModel=\"Print\">"
+            "<Journal><JournalIssue><PubDate><Year>2023</Year><Month>Jan</Month></PubDate>"
+            "</JournalIssue><Title>Journal of Benchmark Medicine</Title></Journal>"
+            f"<ArticleTitle>Effect of intervention {n} on <i>cardiovascular</i> outcomes</ArticleTitle>"
+            "<Abstract>"
+            + "".join(
+                f"<AbstractText Label=\"{label}\">{label.title()} text for article {n}. " * 1
+                + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 6
+                + "</AbstractText>"
+                for label in ("BACKGROUND", "METHODS", "RESULTS", "CONCLUSIONS")
+            )
+            + "</Abstract><AuthorList>"
+            + "".join(
+                f"<Author><LastName>Author{a}</LastName><ForeName>F{a}</ForeName></Author>"
+                for a in range(8)
+            )
+            + f"</AuthorList><ELocationID EIdType=\"doi\">10.1000/bench.{pmid}</ELocationID>"
+            f"</Article><MeshHeadingList>{mesh}</MeshHeadingList></MedlineCitation>"
+            f"<PubmedData><ReferenceList>{refs}</ReferenceList></PubmedData></PubmedArticle>"
+        )
+    return (
+        '<?xml version="1.0" ?>\n'
+        '<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2024//EN" '
+        '"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_240101.dtd">\n'
+        "<PubmedArticleSet>" + "".join(body) + "</PubmedArticleSet>"
+    ).encode()
+
+
+def _legacy_parse_article(article_elem: ET.Element) -> StudyRecord:
+    medline = article_elem.find(".//MedlineCitation")
+    article = medline.find(".//Article") if medline is not None else None
+    title = _get_text(article.find(".//ArticleTitle") if article is not None else None)
+    abstract_parts: list[str] = []
+    if article is not None:
+        for abs_text in article.findall(".//Abstract/AbstractText"):
+            label = abs_text.get("Label", "")
+            text = _get_text(abs_text)
+            abstract_parts.append(f"{label}: {text}" if label else text)
+    authors: list[str] = []
+    if article is not None:
+        for author in article.findall(".//AuthorList/Author"):
+            last = _get_text(author.find("LastName"))
+            fore = _get_text(author.find("ForeName"))
+            if last:
+                authors.append(f"{fore} {last}".strip())
+    journal = _get_text(article.find(".//Journal/Title") if article is not None else None)
+    pub_date = _parse_pub_date(
+        article.find(".//Journal/JournalIssue/PubDate") if article is not None else None
+    )
+    pmid = _get_text(medline.find(".//PMID") if medline is not None else None)
+    doi = ""
+    if article is not None:
+        for eid in article.findall(".//ELocationID"):
+            if eid.get("EIdType") == "doi":
+                doi = _get_text(eid)
+                break
+    return StudyRecord(
+        title=title,
+        authors=authors,
+        abstract=" ".join(abstract_parts),
+        source="PubMed",
+        url=f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else "",
+        publication_date=pub_date,
+        journal=journal,
+        doi=doi,
+    )
+
+
+def parse_legacy(payload: bytes) -> list[StudyRecord]:
+    root = ET.fromstring(payload.decode())
+    return [_legacy_parse_article(elem) for elem in root.findall(".//PubmedArticle")]
+
+
+def parse_incremental(payload: bytes) -> list[StudyRecord]:
+    parser = PubmedArticleParser()
+    studies: list[StudyRecord] = []
+    for start in range(0, len(payload), CHUNK_SIZE):
+        studies.extend(study for _, study in parser.feed(payload[start:start + CHUNK_SIZE]))
+    studies.extend(study for _, study in parser.close())
+    return studies
+
+
+def _measure(name: str, fn, payload: bytes, repeat: int) -> tuple[dict, list[StudyRecord]]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(payload)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "parser": name,
+        "best_ms": round(min(timings) * 1000, 1),
+        "peak_mib": round(peak / 2**20, 1),
+        "articles": len(result),
+    }, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--fixture", help="path to a saved EFetch XML response")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.fixture:
+        with open(args.fixture, "rb") as f:
+            payload = f.read()
+    else:
+        payload = synthetic_efetch(args.articles)
+
+    legacy, legacy_studies = _measure("legacy", parse_legacy, payload, args.repeat)
+    incremental, incremental_studies = _measure("incremental", parse_incremental, payload, args.repeat)
+    assert legacy_studies == incremental_studies, "parsers disagree"
+    print(json.dumps({"payload_mib": round(len(payload) / 2**20, 1), "results": [legacy, incremental]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
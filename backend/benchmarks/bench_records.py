@@ -0,0 +1,121 @@
+"""Memory and serialization cost of the pydantic ``Study`` vs the slotted ``StudyRecord``.
+
+Memory: ``--studies`` records are built from freshly decoded fixture JSON (so
+strings are not shared by accident) and the retained size is measured with
+tracemalloc. Serialization: a ``--top-k`` study response is encoded the way
+each path does it. "pydantic" is SearchResponse construction plus FastAPI's
+response_model round trip (dump, re-validate, dump) and json.dumps. "records"
+is SearchResult plus the fast encoder.
+
+Usage (from backend/):
+    python -m benchmarks.bench_records --studies 10000 --top-k 200
+"""
+
+import argparse
+import gc
+import json
+import timeit
+import tracemalloc
+from collections.abc import Callable
+
+from app.models.records import SearchResult, StudyRecord
+from app.models.schemas import SearchResponse, SourceStatus, Study
+from app.services import encoding
+from app.services.clinical_trials import _parse_trials_payload
+from app.services.europe_pmc import _parse_epmc_payload
+from app.services.openalex import _parse_openalex_payload
+from app.services.pubmed import _parse_efetch_payload
+from benchmarks.stub_server import FIXTURE_DIR
+
+STATUSES = [SourceStatus(source=s, status="ok", elapsed_ms=120.0, result_count=50)
+            for s in ("PubMed", "ClinicalTrials", "EuropePMC", "OpenAlex")]
+
+
+def _fixture_blob() -> bytes:
+    """All fixture studies as one JSON array."""
+    read = lambda name: (FIXTURE_DIR / name).read_bytes()  # noqa: E731
+    studies = [study for _, study in _parse_efetch_payload(read("efetch.xml"))]
+    studies += _parse_trials_payload(read("clinicaltrials.json")).studies
+    studies += _parse_epmc_payload(read("europepmc.json")).studies
+    studies += _parse_openalex_payload(read("openalex.json")).studies
+    return encoding.dumps(studies)
+
+
+def _build(factory: Callable[..., object], blob: bytes, count: int) -> list:
+    built: list = []
+    while len(built) < count:
+        built.extend(factory(**item) for item in json.loads(blob))
+    return built[:count]
+
+
+def _retained_bytes(factory: Callable[..., object], blob: bytes, count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    built = _build(factory, blob, count)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return current
+
+
+def _pydantic_response(studies: list[Study]) -> bytes:
+    response = SearchResponse(
+        query="metformin", total_results=len(studies), studies=studies,
+        summary="Summary.", sources_queried=["PubMed"], source_status=STATUSES,
+    )
+    # What FastAPI does with a returned model and response_model=SearchResponse
+    content = SearchResponse.model_validate(response.model_dump())
+    return json.dumps(content.model_dump(mode="json")).encode()
+
+
+def _records_response(studies: list[StudyRecord]) -> bytes:
+    result = SearchResult(
+        query="metformin", total_results=len(studies), studies=studies,
+        summary="Summary.", sources_queried=["PubMed"], source_status=STATUSES,
+    )
+    return encoding.dumps(result.to_dict())
+
+
+def run(count: int = 10_000, top_k: int = 200, number: int = 20) -> dict:
+    blob = _fixture_blob()
+    study_from_dict = lambda **item: Study(**item)  # noqa: E731
+    record_from_dict = lambda **item: StudyRecord.from_dict(item)  # noqa: E731
+
+    pydantic_bytes = _retained_bytes(study_from_dict, blob, count)
+    records_bytes = _retained_bytes(record_from_dict, blob, count)
+
+    models = _build(study_from_dict, blob, top_k)
+    records = _build(record_from_dict, blob, top_k)
+    assert json.loads(_pydantic_response(models)) == json.loads(_records_response(records))
+
+    def per_call_ms(fn: Callable[[], object]) -> float:
+        return round(min(timeit.repeat(fn, repeat=5, number=number)) / number * 1000, 3)
+
+    build_pydantic = per_call_ms(lambda: _build(study_from_dict, blob, top_k))
+    build_records = per_call_ms(lambda: _build(record_from_dict, blob, top_k))
+    return {
+        "memory_per_10k_studies_mb": {
+            "pydantic": round(pydantic_bytes / count * 10_000 / 2**20, 2),
+            "records": round(records_bytes / count * 10_000 / 2**20, 2),
+        },
+        f"construct_{top_k}_ms": {"pydantic": build_pydantic, "records": build_records},
+        f"serialize_{top_k}_ms": {
+            "pydantic": per_call_ms(lambda: _pydantic_response(models)),
+            "records": per_call_ms(lambda: _records_response(records)),
+        },
+        "encoder": "orjson" if encoding.orjson is not None else "json",
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--studies", type=int, default=10_000)
+    parser.add_argument("--top-k", type=int, default=200)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.studies, args.top_k, args.number), indent=2))
+
+
+if __name__ == "__main__":
+    main()
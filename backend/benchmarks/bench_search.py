@@ -0,0 +1,194 @@
+"""End-to-end /api/search throughput and latency percentiles against the stub upstreams.
+
+The stub server (recorded fixtures by default, ``--synthetic`` for generated
+payloads) runs on its own event loop thread, so its work does not share the
+app's loop. The app is driven in-process through httpx's ASGI transport with
+its lifespan running. Each concurrency level sends ``--requests`` searches
+with distinct queries, so caches do not short-circuit the work unless
+``--warm`` is given. Per-stage times are averaged from the Server-Timing
+header.
+
+Usage (from backend/):
+    python -m benchmarks.bench_search --concurrency 1,8,32 --requests 200 --latency 0.05
+    python -m benchmarks.bench_search --output results/search.json
+    python -m benchmarks.bench_search --detail lite
+    python -m benchmarks.bench_search --sources ClinicalTrials
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from app.config import settings
+from app.services.ncbi import scheduler as ncbi_scheduler
+from benchmarks.stub_server import StubServer, default_routes, fixture_routes
+
+UPSTREAM_ROUTES = (
+    "/espell.fcgi", "/esearch.fcgi", "/esummary.fcgi", "/efetch.fcgi", "/studies", "/search", "/works"
+)
+
+
+def start_stub(routes: dict, latency: float, openai_latency: float) -> StubServer:
+    """Start a StubServer on a daemon thread with its own event loop."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="stub", daemon=True).start()
+    server = asyncio.run_coroutine_threadsafe(StubServer(routes).start(), loop).result()
+    for route in UPSTREAM_ROUTES:
+        server.route_latency[route] = latency
+    server.route_latency["/chat/completions"] = openai_latency
+    return server
+
+
+def configure(server: StubServer, warm: bool, ncbi_rate: float) -> None:
+    """Point every upstream at the stub. Must run before app.main is imported."""
+    settings.ncbi_base_url = server.base_url
+    settings.clinical_trials_base_url = server.base_url
+    settings.europe_pmc_base_url = server.base_url
+    settings.openalex_base_url = server.base_url
+    settings.openai_base_url = f"{server.base_url}/v1"
+    settings.openai_api_key = "bench"
+    settings.ncbi_rate_limit = ncbi_rate
+    ncbi_scheduler.rate = ncbi_scheduler.burst = ncbi_rate
+    settings.search_cache_enabled = warm
+    settings.source_cache_enabled = warm
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+def _parse_server_timing(header: str) -> dict[str, float]:
+    timings = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, dur = entry.partition(";dur=")
+        if dur:
+            timings[name] = float(dur)
+    return timings
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    concurrency: int,
+    requests: int,
+    query: str,
+    warm: bool,
+    detail: str = "full",
+    sources: str = "",
+) -> dict:
+    latencies: list[float] = []
+    stages: dict[str, list[float]] = defaultdict(list)
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            q = query if warm else f"{query} {concurrency}x{i}"
+            start = time.perf_counter()
+            params = {"q": q, "max_results": 50, "detail": detail}
+            if sources:
+                params["sources"] = sources
+            resp = await client.get("/api/search", params=params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if resp.status_code != 200:
+                errors += 1
+            for name, ms in _parse_server_timing(resp.headers.get("server-timing", "")).items():
+                stages[name].append(ms)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "max_ms": round(latencies[-1], 1),
+        "mean_ms": round(statistics.fmean(latencies), 1),
+        "stage_mean_ms": {name: round(statistics.fmean(values), 2) for name, values in stages.items()},
+    }
+
+
+async def run(
+    concurrency: list[int],
+    requests: int,
+    latency: float = 0.05,
+    openai_latency: float = 0.3,
+    synthetic: bool = False,
+    warm: bool = False,
+    ncbi_rate: float = 10_000.0,
+    query: str = "metformin diabetes",
+    detail: str = "full",
+    sources: str = "",
+) -> dict:
+    server = start_stub(default_routes() if synthetic else fixture_routes(), latency, openai_latency)
+    configure(server, warm, ncbi_rate)
+    # Imported late: the module-level search and source caches read settings on import
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            await client.get("/api/search", params={"q": f"{query} warmup"})
+            for level in concurrency:
+                results.append(await run_level(client, level, requests, query, warm, detail, sources))
+    return {
+        "config": {
+            "payloads": "synthetic" if synthetic else "fixtures",
+            "upstream_latency_s": latency,
+            "openai_latency_s": openai_latency,
+            "warm_caches": warm,
+            "ncbi_rate": ncbi_rate,
+            "detail": detail,
+            "sources": sources or "default",
+        },
+        "levels": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="searches per level")
+    parser.add_argument("--latency", type=float, default=0.05, help="upstream latency (s)")
+    parser.add_argument("--openai-latency", type=float, default=0.3)
+    parser.add_argument("--synthetic", action="store_true", help="generated payloads instead of fixtures")
+    parser.add_argument("--warm", action="store_true", help="repeat one query with caches on")
+    parser.add_argument("--ncbi-rate", type=float, default=10_000.0, help="NCBI req/s (3 = production)")
+    parser.add_argument("--detail", choices=("full", "lite"), default="full", help="search detail level")
+    parser.add_argument("--sources", default="", help="comma-separated sources (default: all)")
+    parser.add_argument("--output", type=Path, help="also write the JSON results here")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(
+        [int(level) for level in args.concurrency.split(",")],
+        args.requests,
+        latency=args.latency,
+        openai_latency=args.openai_latency,
+        synthetic=args.synthetic,
+        warm=args.warm,
+        ncbi_rate=args.ncbi_rate,
+        detail=args.detail,
+        sources=args.sources,
+    ))
+    text = json.dumps(result, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Summary prompt packing and LLM fallback latency.
+
+Prompt: the ranked studies from the recorded fixtures are packed by the
+token-budget builder and, for comparison, by the previous fixed slicing (first
+15 studies, 500 characters of abstract each). Token counts use the model's
+tokenizer when available, else the same estimate the summarizer falls back to.
+
+Latency: ``summarize_studies`` and ``stream_summary`` against a fake
+OpenAI-compatible endpoint answering after ``--llm-latency`` seconds, with
+``summary_timeout`` set to ``--timeout``. A latency above the timeout shows the
+extractive fallback taking over at the timeout.
+
+Usage (from backend/):
+    python -m benchmarks.bench_summarizer --llm-latency 0.3 --timeout 1.0
+    python -m benchmarks.bench_summarizer --llm-latency 3 --timeout 1.0
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+import timeit
+from pathlib import Path
+
+from app.config import settings
+from app.models.records import StudyRecord
+from app.services import summarizer
+from app.services.clinical_trials import _parse_trials_payload
+from app.services.dedup import Deduplicator
+from app.services.europe_pmc import _parse_epmc_payload
+from app.services.openalex import _parse_openalex_payload
+from app.services.pubmed import _parse_efetch_payload
+from app.services.ranking import rank_studies
+from benchmarks.stub_server import FIXTURE_DIR, StubServer, openai_chat_handler
+
+QUERY = "metformin type 2 diabetes"
+
+
+def ranked_fixture_studies(directory: Path = FIXTURE_DIR) -> list[StudyRecord]:
+    studies = [study for _, study in _parse_efetch_payload((directory / "efetch.xml").read_bytes())]
+    for parse, fixture in (
+        (_parse_trials_payload, "clinicaltrials.json"),
+        (_parse_epmc_payload, "europepmc.json"),
+        (_parse_openalex_payload, "openalex.json"),
+    ):
+        studies += parse((directory / fixture).read_bytes()).studies
+    dedup = Deduplicator()
+    dedup.add_all(studies)
+    return rank_studies(QUERY, dedup)
+
+
+def _legacy_message(query: str, studies: list[StudyRecord]) -> str:
+    """The prompt as built before token budgeting, for comparison."""
+    context = "\n\n".join(
+        f"{i}. [{study.source}] {study.title}\n   "
+        f"{study.abstract[:500] if study.abstract else 'No abstract available.'}"
+        for i, study in enumerate(studies[:15], 1)
+    )
+    return (
+        f"Search query: \"{query}\"\n\nStudies found ({len(studies)} total):\n\n{context}\n\n"
+        "Provide a 2-3 sentence evidence-based summary."
+    )
+
+
+def prompt_cases(studies: list[StudyRecord], repeat: int, number: int) -> list[dict]:
+    results = []
+    for name, build in (
+        ("legacy_slicing", _legacy_message),
+        ("token_budget", summarizer._build_user_message),
+    ):
+        message = build(QUERY, studies)
+        rounds = timeit.repeat(lambda: build(QUERY, studies), repeat=repeat, number=number)
+        results.append({
+            "case": name,
+            "prompt_tokens": summarizer.count_tokens(summarizer.SYSTEM_PROMPT + message),
+            "studies_included": message.count("\n   "),
+            "build_us": round(min(rounds) / number * 1e6, 1),
+        })
+    rounds = timeit.repeat(
+        lambda: summarizer.extractive_summary(QUERY, studies), repeat=repeat, number=number
+    )
+    results.append({"case": "extractive_summary", "build_us": round(min(rounds) / number * 1e6, 1)})
+    return results
+
+
+async def latency_cases(studies: list[StudyRecord], rounds: int) -> dict[str, dict[str, float]]:
+    summarize_ms: list[float] = []
+    first_delta_ms: list[float] = []
+    for i in range(rounds):
+        # A new query each round so the summary cache never answers
+        start = time.perf_counter()
+        await summarizer.summarize_studies(f"{QUERY} {i}", studies)
+        summarize_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        async for _ in summarizer.stream_summary(f"{QUERY} stream {i}", studies):
+            first_delta_ms.append((time.perf_counter() - start) * 1000)
+            break
+    await summarizer.close_client()
+    return {
+        name: {"p50_ms": round(statistics.median(values), 1), "max_ms": round(max(values), 1)}
+        for name, values in (("summarize", summarize_ms), ("stream_first_delta", first_delta_ms))
+    }
+
+
+def run(
+    llm_latency: float = 0.3, timeout: float = 1.0, rounds: int = 10, repeat: int = 5, number: int = 20
+) -> dict:
+    studies = ranked_fixture_studies()
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="stub", daemon=True).start()
+    routes = {"/chat/completions": openai_chat_handler("Stub summary of the retrieved studies.")}
+    server = asyncio.run_coroutine_threadsafe(StubServer(routes).start(), loop).result()
+    server.route_latency["/chat/completions"] = llm_latency
+    settings.openai_api_key = "bench"
+    settings.openai_base_url = f"{server.base_url}/v1"
+    settings.summary_timeout = timeout
+
+    outcomes_before = dict(summarizer._outcomes)
+    latency = asyncio.run(latency_cases(studies, rounds))
+    return {
+        "config": {
+            "studies": len(studies),
+            "llm_latency_s": llm_latency,
+            "summary_timeout_s": timeout,
+            "tokenizer": "tiktoken" if summarizer._encoding() is not None else "estimate",
+        },
+        "prompt": prompt_cases(studies, repeat, number),
+        "latency": latency,
+        "outcomes": {
+            name: count - outcomes_before[name] for name, count in summarizer._outcomes.items()
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake LLM latency (s)")
+    parser.add_argument("--timeout", type=float, default=1.0, help="summary_timeout (s)")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="also write the JSON results here")
+    args = parser.parse_args()
+
+    text = json.dumps(run(args.llm_latency, args.timeout, args.rounds), indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
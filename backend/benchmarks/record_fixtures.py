@@ -0,0 +1,94 @@
+"""Record real upstream responses into benchmarks/fixtures for replay by the stub server.
+
+Runs the app's own connectors, full and lite (so the request parameters
+match production), against the live APIs and saves the first response body
+seen for each stub route. With OPENAI_API_KEY set, one summary completion is recorded as well.
+
+Usage (from backend/, needs network access):
+    python -m benchmarks.record_fixtures --query "metformin type 2 diabetes" --max-results 50
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.config import settings
+from app.services import http
+from app.services.clinical_trials import search_clinical_trials, search_clinical_trials_lite_page
+from app.services.europe_pmc import search_europe_pmc, search_europe_pmc_lite_page
+from app.services.openalex import search_openalex, search_openalex_lite_page
+from app.services.pubmed import search_pubmed, search_pubmed_lite_page
+from app.services.spellcheck import correct_query
+from app.services.summarizer import MODEL, _messages
+from benchmarks.stub_server import (
+    FIXTURE_DIR,
+    FIXTURE_FILES,
+    LITE_FIXTURE_FILES,
+    OPENAI_FIXTURE,
+    is_lite_request,
+)
+
+
+def _recorder(directory: Path, saved: dict[str, str]):
+    async def record(response: httpx.Response) -> None:
+        lite = is_lite_request(parse_qs(response.url.query.decode()))
+        for route, (name, _) in FIXTURE_FILES.items():
+            if lite and route in LITE_FIXTURE_FILES:
+                route, name = f"{route} (lite)", LITE_FIXTURE_FILES[route]
+            if response.url.path.endswith(route.split()[0]) and route not in saved and response.is_success:
+                await response.aread()
+                (directory / name).write_bytes(response.content)
+                saved[route] = name
+                return
+
+    return record
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--query", default="metformin type 2 diabetes")
+    parser.add_argument("--max-results", type=int, default=50)
+    parser.add_argument("--output", type=Path, default=FIXTURE_DIR)
+    args = parser.parse_args()
+    args.output.mkdir(parents=True, exist_ok=True)
+
+    saved: dict[str, str] = {}
+    await http.start_clients()
+    for host in (http.NCBI, http.CLINICAL_TRIALS, http.EUROPE_PMC, http.OPENALEX):
+        http.get_client(host).event_hooks["response"].append(_recorder(args.output, saved))
+    try:
+        await correct_query(args.query)
+        results = await asyncio.gather(
+            search_pubmed(args.query, args.max_results),
+            search_clinical_trials(args.query, args.max_results),
+            search_europe_pmc(args.query, args.max_results),
+            search_openalex(args.query, args.max_results),
+        )
+        await asyncio.gather(
+            search_pubmed_lite_page(args.query, args.max_results),
+            search_clinical_trials_lite_page(args.query, args.max_results),
+            search_europe_pmc_lite_page(args.query, args.max_results),
+            search_openalex_lite_page(args.query, args.max_results),
+        )
+    finally:
+        await http.close_clients()
+
+    if settings.openai_api_key:
+        client = AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None)
+        studies = [study for source in results for study in source]
+        raw = await client.chat.completions.with_raw_response.create(
+            model=MODEL, messages=_messages(args.query, studies), max_tokens=300, temperature=0.3
+        )
+        (args.output / OPENAI_FIXTURE).write_text(raw.http_response.text)
+        saved["/chat/completions"] = OPENAI_FIXTURE
+
+    print(json.dumps({"query": args.query, "saved": saved}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""Run the micro-benchmarks and the end-to-end search benchmark into one JSON report.
+
+The report records the git revision and interpreter so runs can be compared;
+``--compare`` prints the relative change of every timing against an earlier
+report (negative is faster).
+
+Usage (from backend/):
+    python -m benchmarks.run_suite --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.run_suite --quick --compare results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+from benchmarks import bench_parsers, bench_search
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _timings(report: dict) -> dict[str, float]:
+    """Flatten a report to {metric: value} for the numbers worth comparing."""
+    flat = {}
+    for case in report["micro"]:
+        flat[f"micro.{case['case']}.best_us"] = case["best_us"]
+    for level in report["search"]["levels"]:
+        prefix = f"search.c{level['concurrency']}"
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            flat[f"{prefix}.{key}"] = level[key]
+    return flat
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    before, after = _timings(baseline), _timings(current)
+    lines = [f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for metric, value in after.items():
+        old = before.get(metric)
+        change = f"{(value - old) / old:+.1%}" if old else "n/a"
+        lines.append(f"{metric:<48} {old if old is not None else '-':>12} {value:>12} {change:>8}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="fewer rounds, for a smoke check")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--openai-latency", type=float, default=0.3)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="earlier report to diff against")
+    args = parser.parse_args()
+
+    repeat, number, requests = (3, 5, 20) if args.quick else (7, 20, 200)
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "micro": bench_parsers.run(repeat, number),
+        "search": asyncio.run(bench_search.run(
+            [int(level) for level in args.concurrency.split(",")],
+            requests,
+            latency=args.latency,
+            openai_latency=args.openai_latency,
+        )),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    if args.compare:
+        print("\n".join(compare(report, json.loads(args.compare.read_text()))))
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""Minimal local HTTP/1.1 stub server used by the benchmarks.
+
+Serves canned upstream payloads (synthetic, or recorded fixtures replayed from
+disk) with keep-alive support, an optional per-route latency, and counts the
+TCP connections it accepts so pooled and unpooled clients can be compared. A
+fake OpenAI chat-completions route lets the summarizer run without a key.
+"""
+
+import asyncio
+import json
+import re
+import xml.etree.ElementTree as ET
+from collections.abc import Callable
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+Handler = Callable[[str, dict[str, list[str]], bytes], tuple[int, str, bytes]]
+
+
+class StubServer:
+    """An asyncio HTTP server that routes on the request path suffix."""
+
+    def __init__(self, routes: dict[str, Handler], latency: float = 0.0) -> None:
+        self.routes = routes
+        self.latency = latency
+        # Per-route latency override: seconds, or a callable returning seconds
+        self.route_latency: dict[str, float | Callable[[], float]] = {}
+        self.connections = 0
+        self.requests = 0
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self) -> "StubServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def reset_counters(self) -> None:
+        self.connections = 0
+        self.requests = 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                self.requests += 1
+                status, content_type, payload = await self._dispatch(target, body)
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    "Connection: keep-alive\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, target: str, body: bytes) -> tuple[int, str, bytes]:
+        parts = urlsplit(target)
+        for suffix, handler in self.routes.items():
+            if parts.path.endswith(suffix):
+                delay = self.route_latency.get(suffix, self.latency)
+                if callable(delay):
+                    delay = delay()
+                if delay:
+                    await asyncio.sleep(delay)
+                return handler(parts.path, parse_qs(parts.query), body)
+        return 404, "text/plain", b"not found"
+
+
+def json_response(payload: object) -> tuple[int, str, bytes]:
+    return 200, "application/json", json.dumps(payload).encode()
+
+
+def xml_response(payload: str) -> tuple[int, str, bytes]:
+    return 200, "text/xml", payload.encode()
+
+
+def openai_chat_handler(content: str, model: str = "gpt-4o-mini") -> Handler:
+    """Fake ``/chat/completions``: a completion of ``content``, or SSE chunks when streaming."""
+
+    def completion(path, query, body):
+        request = json.loads(body or b"{}")
+        if not request.get("stream"):
+            return json_response({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        events = []
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            events.append({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0,
+                           "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        events.append({"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0,
+                       "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        stream = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        return 200, "text/event-stream", stream.encode()
+
+    return completion
+
+
+# Recorded response per stub route (see record_fixtures.py)
+FIXTURE_FILES = {
+    "/espell.fcgi": ("espell.xml", "text/xml"),
+    "/esearch.fcgi": ("esearch.json", "application/json"),
+    "/esummary.fcgi": ("esummary.json", "application/json"),
+    "/efetch.fcgi": ("efetch.xml", "text/xml"),
+    "/studies": ("clinicaltrials.json", "application/json"),
+    "/search": ("europepmc.json", "application/json"),
+    "/works": ("openalex.json", "application/json"),
+}
+# Metadata-only ("lite" search) responses of the routes that serve both kinds
+LITE_FIXTURE_FILES = {
+    "/studies": "clinicaltrials_lite.json",
+    "/search": "europepmc_lite.json",
+    "/works": "openalex_lite.json",
+}
+OPENAI_FIXTURE = "openai_chat.json"
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def is_lite_request(query: dict[str, list[str]]) -> bool:
+    """Whether a request asks for metadata only (the connectors' lite search)."""
+    return "select" in query or "fields" in query or query.get("resultType") == ["lite"]
+
+
+def fixture_routes(directory: Path = FIXTURE_DIR) -> dict[str, Handler]:
+    """Replay recorded upstream responses verbatim, whatever the query parameters
+    (except full vs lite, which have a recording each)."""
+
+    def replay(content_type: str, payload: bytes, lite: bytes | None = None) -> Handler:
+        if lite is None:
+            return lambda path, query, body: (200, content_type, payload)
+        return lambda path, query, body: (
+            200, content_type, lite if is_lite_request(query) else payload
+        )
+
+    routes = {
+        route: replay(
+            content_type,
+            (directory / name).read_bytes(),
+            (directory / LITE_FIXTURE_FILES[route]).read_bytes() if route in LITE_FIXTURE_FILES else None,
+        )
+        for route, (name, content_type) in FIXTURE_FILES.items()
+    }
+    espell = ET.fromstring((directory / FIXTURE_FILES["/espell.fcgi"][0]).read_bytes())
+    if espell.findtext("Query") == espell.findtext("CorrectedQuery"):
+        # A recorded "no correction" answer is echoed for whatever term is asked,
+        # so distinct benchmark queries stay distinct
+        routes["/espell.fcgi"] = lambda path, query, body: xml_response(
+            "<eSpellResult><Query>{0}</Query><CorrectedQuery>{0}</CorrectedQuery></eSpellResult>".format(
+                escape(query.get("term", [""])[0])
+            )
+        )
+    recorded = json.loads((directory / OPENAI_FIXTURE).read_text())
+    routes["/chat/completions"] = openai_chat_handler(
+        recorded["choices"][0]["message"]["content"], recorded.get("model", "gpt-4o-mini")
+    )
+    return routes
+
+
+def _pubmed_article(pmid: int) -> str:
+    return (
+        "<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+        "<Journal><JournalIssue><PubDate><Year>2023</Year></PubDate></JournalIssue>"
+        "<Title>Journal of Stub Medicine</Title></Journal>"
+        "<ArticleTitle>Stub trial of metformin outcomes {pmid}</ArticleTitle>"
+        "<Abstract><AbstractText Label=\"RESULTS\">Metformin reduced HbA1c in cohort {pmid}.</AbstractText></Abstract>"
+        "<AuthorList><Author><LastName>Doe</LastName><ForeName>Jane</ForeName></Author></AuthorList>"
+        "<ELocationID EIdType=\"doi\">10.1000/stub.{pmid}</ELocationID>"
+        "</Article></MedlineCitation></PubmedArticle>"
+    ).format(pmid=pmid)
+
+
+def default_routes(history_size: int = 5000) -> dict[str, Handler]:
+    """Synthetic payloads shaped like each upstream's real responses.
+
+    ``history_size`` is the result count reported for PubMed searches and the
+    number of records each other source pages through (retstart, pageToken,
+    cursorMark, cursor).
+    """
+
+    def offset(token: str) -> int:
+        return int(token[1:]) if token.startswith("o") else 0
+
+    def lookup(value: str, pattern: str) -> range | None:
+        """The one record an identifier lookup asks for, if ``value`` is one."""
+        match = re.search(pattern, value)
+        return range(int(match.group(1)), int(match.group(1)) + 1) if match else None
+
+    def next_token(start: int, size: int) -> str | None:
+        return f"o{start + size}" if start + size < history_size else None
+
+    def espell(path, query, body):
+        term = query.get("term", [""])[0]
+        return xml_response(
+            f"<eSpellResult><Query>{term}</Query><CorrectedQuery>{term}</CorrectedQuery></eSpellResult>"
+        )
+
+    def esearch(path, query, body):
+        retmax = int(query.get("retmax", ["10"])[0])
+        start = int(query.get("retstart", ["0"])[0])
+        stop = min(start + retmax, history_size)
+        result = {"count": str(history_size), "idlist": [str(30000000 + i) for i in range(start, stop)]}
+        if query.get("usehistory") == ["y"]:
+            result.update(webenv="STUB_WEBENV", querykey="1")
+        return json_response({"esearchresult": result})
+
+    def esummary(path, query, body):
+        ids = [i for i in query.get("id", [""])[0].split(",") if i]
+        return json_response({"result": {"uids": ids, **{i: {
+            "uid": i, "pubdate": "2023", "source": "J Stub Med", "fulljournalname": "Journal of Stub Medicine",
+            "title": f"Stub trial of metformin outcomes {i}",
+            "authors": [{"name": "Doe J", "authtype": "Author"}],
+            "articleids": [{"idtype": "pubmed", "value": i}, {"idtype": "doi", "value": f"10.1000/stub.{i}"}],
+        } for i in ids}}})
+
+    def efetch(path, query, body):
+        if "WebEnv" in query:
+            start = int(query["retstart"][0])
+            stop = min(start + int(query["retmax"][0]), history_size)
+            ids = [str(30000000 + i) for i in range(start, stop)]
+        else:
+            ids = query.get("id", [""])[0].split(",")
+        articles = "".join(_pubmed_article(int(i)) for i in ids if i)
+        return xml_response(f"<PubmedArticleSet>{articles}</PubmedArticleSet>")
+
+    def ctgov(path, query, body):
+        size = int(query.get("pageSize", ["10"])[0])
+        start = offset(query.get("pageToken", [""])[0])
+        ids = lookup(query.get("filter.ids", [""])[0], r"NCT(\d+)")
+        studies = [
+            {"protocolSection": {
+                "identificationModule": {"nctId": f"NCT0{i:07d}", "briefTitle": f"Stub registered trial {i}"},
+                "descriptionModule": {"briefSummary": "A stub trial summary."},
+                "statusModule": {"startDateStruct": {"date": "2022-01"}},
+                "sponsorCollaboratorsModule": {"leadSponsor": {"name": "Stub Sponsor"}},
+            }} for i in ids or range(start, min(start + size, history_size))
+        ]
+        if is_lite_request(query):
+            for study in studies:
+                del study["protocolSection"]["descriptionModule"]
+        return json_response({"studies": studies, "nextPageToken": None if ids else next_token(start, size)})
+
+    def epmc(path, query, body):
+        size = int(query.get("pageSize", ["10"])[0])
+        mark = query.get("cursorMark", ["*"])[0]
+        start = offset(mark)
+        ids = lookup(query.get("query", [""])[0], r"EXT_ID:4(\d{7})")
+        results = [
+            {"title": f"Europe PMC stub article {i}", "pmid": str(40000000 + i),
+             "firstPublicationDate": "2021-05-01", "authorString": "Roe R."}
+            for i in ids or range(start, min(start + size, history_size))
+        ]
+        if not is_lite_request(query):
+            for result in results:
+                result.update(abstractText="Stub abstract.", authorList={"author": [{"fullName": "Roe R"}]},
+                              journalInfo={"journal": {"title": "Stub Journal"}})
+        else:
+            for result in results:
+                result["journalTitle"] = "Stub Journal"
+        next_mark = None if ids else next_token(start, size)
+        return json_response({"nextCursorMark": next_mark or mark, "resultList": {"result": results}})
+
+    def openalex(path, query, body):
+        size = int(query.get("per_page", ["10"])[0])
+        start = offset(query.get("cursor", ["*"])[0])
+        ids = lookup(query.get("filter", [""])[0], r"(?:W|oa\.)(\d+)$")
+        works = [
+            {"id": f"https://openalex.org/W{i}", "title": f"OpenAlex stub work {i}",
+             "abstract_inverted_index": {"Stub": [0], "abstract": [1]},
+             "publication_date": "2020-02-02", "doi": f"https://doi.org/10.2000/oa.{i}",
+             "authorships": [{"author": {"display_name": "Poe P"}}],
+             "primary_location": {"source": {"display_name": "Stub Source"}}}
+            for i in ids or range(start, min(start + size, history_size))
+        ]
+        if is_lite_request(query):
+            for work in works:
+                del work["abstract_inverted_index"]
+        return json_response({"meta": {"next_cursor": None if ids else next_token(start, size)}, "results": works})
+
+    return {
+        "/espell.fcgi": espell,
+        "/esearch.fcgi": esearch,
+        "/esummary.fcgi": esummary,
+        "/efetch.fcgi": efetch,
+        "/studies": ctgov,
+        "/search": epmc,
+        "/works": openalex,
+        "/chat/completions": openai_chat_handler(
+            "Stub summary: metformin lowered HbA1c across the retrieved studies."
+        ),
+    }
@@ -0,0 +1,25 @@
+import pytest
+
+from app import routes
+from app.config import settings
+from app.services.connectors import Connector, ConnectorRegistry
+from app.services.paging import PageFn
+
+
+@pytest.fixture
+def connectors(monkeypatch):
+    """Install a connector registry over fake page functions for the routes.
+
+    Source caches are disabled so every call reaches the fakes.
+    """
+    monkeypatch.setattr(settings, "source_cache_enabled", False)
+    monkeypatch.setattr(settings, "search_sources", "")
+
+    def install(pages: dict[str, PageFn]) -> ConnectorRegistry:
+        registry = ConnectorRegistry()
+        for name, fn in pages.items():
+            registry.register(Connector(name, fn))
+        monkeypatch.setattr(routes, "registry", registry)
+        return registry
+
+    return install
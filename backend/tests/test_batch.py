@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from app import routes
+from app.models.records import SearchResult
+from app.models.schemas import BatchSearchRequest
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    calls: list[tuple[str, bool]] = []
+
+    async def run_search(q, max_results, top_k, mode, summarize=True, detail="full", *, sources):
+        calls.append((q, summarize))
+        if q == "boom":
+            raise RuntimeError("upstream exploded")
+        return SearchResult(query=q, total_results=0, studies=[])
+
+    monkeypatch.setattr(routes, "_run_search", run_search)
+    return calls
+
+
+async def frames(request: BatchSearchRequest) -> list[dict]:
+    return [json.loads(line) async for line in routes._batch_events(request, routes.registry.select())]
+
+
+async def test_identical_queries_run_once(searches):
+    result = await frames(BatchSearchRequest(queries=["Metformin", " metformin ", "statins"]))
+    assert searches == [("Metformin", False), ("statins", False)]
+    by_query = {frame["query"]: frame["indices"] for frame in result if frame["event"] == "result"}
+    assert by_query == {"Metformin": [0, 1], "statins": [2]}
+    assert result[-1] == {"event": "done", "queries": 3, "unique": 2, "failed": 0}
+
+
+async def test_a_failing_query_yields_an_error_frame_and_the_batch_continues(searches):
+    result = await frames(BatchSearchRequest(queries=["boom", "statins"], summarize=True))
+    events = sorted(frame["event"] for frame in result[:-1])
+    assert events == ["error", "result"]
+    error = next(frame for frame in result if frame["event"] == "error")
+    assert error == {"event": "error", "indices": [0], "query": "boom", "detail": "upstream exploded"}
+    assert result[-1] == {"event": "done", "queries": 2, "unique": 2, "failed": 1}
+    assert ("statins", True) in searches
+
+
+def test_summary_less_results_are_cached_under_their_own_key():
+    sources = routes.registry.select()
+    assert routes._search_cache_key("Metformin", 10, sources=sources) != routes._search_cache_key(
+        "metformin", 10, False, sources=sources
+    )
@@ -0,0 +1,153 @@
+import asyncio
+
+from app.services.cache import MISSING, SingleFlight, SQLiteCache, TieredCache, TTLCache
+
+
+class Upstream:
+    """Counts calls and blocks each one until ``release`` is set."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        call = self.calls
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"result {call}"
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test", max_size=2, ttl=60)
+    cache.set_nowait("a", 1)
+    cache.set_nowait("b", 2)
+    assert cache.get_nowait("a") == 1
+    cache.set_nowait("c", 3)
+    assert cache.get_nowait("b") is MISSING
+    assert cache.get_nowait("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache("test", max_size=2, ttl=0)
+    cache.set_nowait("a", 1)
+    assert cache.get_nowait("a") is MISSING
+    assert cache.stats()["expirations"] == 1
+
+
+def test_ttl_cache_stores_none():
+    cache = TTLCache("test", max_size=2, ttl=60)
+    cache.set_nowait("a", None)
+    assert cache.get_nowait("a") is None
+
+
+async def test_sqlite_cache_round_trips_and_evicts_oldest(tmp_path):
+    cache = SQLiteCache("sqlite", str(tmp_path / "cache.db"), ttl=60, max_entries=2)
+    try:
+        await cache.set("a", {"studies": [1, 2]})
+        await cache.set("b", 2)
+        await cache.set("c", 3)
+        assert await cache.get("a") is MISSING
+        assert await cache.get("c") == 3
+        assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "expirations": 0}
+    finally:
+        cache.close()
+
+
+async def test_sqlite_cache_counts_concurrent_hits(tmp_path):
+    cache = SQLiteCache("sqlite", str(tmp_path / "cache.db"), ttl=60)
+    try:
+        await cache.set("a", 1)
+        assert await asyncio.gather(*(cache.get("a") for _ in range(20))) == [1] * 20
+        assert cache.stats()["hits"] == 20
+    finally:
+        cache.close()
+
+
+async def test_sqlite_cache_expires_entries(tmp_path):
+    cache = SQLiteCache("sqlite", str(tmp_path / "cache.db"), ttl=0)
+    try:
+        await cache.set("a", 1)
+        assert await cache.get("a") is MISSING
+        assert cache.stats()["expirations"] == 1
+    finally:
+        cache.close()
+
+
+async def test_concurrent_callers_share_one_call():
+    flight, upstream = SingleFlight(), Upstream()
+    callers = [asyncio.ensure_future(flight.do("k", upstream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    assert await asyncio.gather(*callers) == ["result 1"] * 3
+    assert upstream.calls == 1
+    assert flight.coalesced == 2
+    assert len(flight) == 0
+
+
+async def test_cancelled_caller_leaves_the_call_running_for_others():
+    flight, upstream = SingleFlight(), Upstream()
+    leaving = asyncio.ensure_future(flight.do("k", upstream))
+    staying = asyncio.ensure_future(flight.do("k", upstream))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+    assert await staying == "result 1"
+    assert upstream.cancelled == 0
+
+
+async def test_last_waiter_cancelling_cancels_and_forgets_the_call():
+    flight, upstream = SingleFlight(), Upstream()
+    caller = asyncio.ensure_future(flight.do("k", upstream))
+    await asyncio.sleep(0)
+    caller.cancel()
+    await asyncio.sleep(0)
+    assert len(flight) == 0
+    # Arriving while the cancelled call winds down starts a fresh one
+    upstream.release.set()
+    assert await flight.do("k", upstream) == "result 2"
+    assert upstream.cancelled == 1
+
+
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def failing() -> str:
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flight.do("k", failing), flight.do("k", failing), return_exceptions=True
+    )
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert len(flight) == 0
+
+
+async def test_tiered_cache_backfills_faster_tiers():
+    fast, slow = TTLCache("fast", 10, 60), TTLCache("slow", 10, 60)
+    slow.set_nowait("k", "value")
+    cache = TieredCache([fast, slow])
+    assert await cache.get("k") == "value"
+    assert fast.get_nowait("k") == "value"
+
+
+async def test_get_or_load_coalesces_and_respects_should_cache():
+    cache = TieredCache([TTLCache("fast", 10, 60)])
+    upstream = Upstream()
+    callers = [
+        asyncio.ensure_future(cache.get_or_load("k", upstream, should_cache=lambda v: False))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    assert await asyncio.gather(*callers) == ["result 1"] * 2
+    assert cache.stats()["coalesced"] == 1
+    assert await cache.get_or_load("k", upstream) == "result 2"
+    assert await cache.get_or_load("k", upstream) == "result 2"
+    assert upstream.calls == 2
@@ -0,0 +1,151 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import retry
+from app.services.connectors import (
+    Connector,
+    ConnectorRegistry,
+    UnknownSourceError,
+    default_registry,
+)
+from app.services.paging import SourcePage
+from app.services.retry import SERVER_ERROR_STATUSES, backoff_delay, with_retries
+
+
+async def empty_page(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+    return SourcePage([], "")
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(settings, "source_cache_enabled", False)
+    monkeypatch.setattr(settings, "search_sources", "")
+    registry = ConnectorRegistry()
+    for name in ("PubMed", "ClinicalTrials", "OpenAlex"):
+        registry.register(Connector(name, empty_page))
+    return registry
+
+
+def test_select_matches_names_in_registration_order(registry):
+    assert registry.select() == ("PubMed", "ClinicalTrials", "OpenAlex")
+    assert registry.select(["openalex, PUBMED"]) == ("PubMed", "OpenAlex")
+    assert registry.select(["OpenAlex", "clinicaltrials"]) == ("ClinicalTrials", "OpenAlex")
+    assert registry.select([" , "]) == registry.select()
+
+
+def test_select_defaults_to_the_configured_sources(registry, monkeypatch):
+    monkeypatch.setattr(settings, "search_sources", "openalex,pubmed")
+    assert registry.select() == ("PubMed", "OpenAlex")
+    assert registry.select(["ClinicalTrials"]) == ("ClinicalTrials",)
+
+
+def test_select_rejects_unknown_sources(registry):
+    with pytest.raises(UnknownSourceError, match="Scopus"):
+        registry.select(["PubMed,Scopus"])
+
+
+def test_a_name_registers_once(registry):
+    with pytest.raises(ValueError):
+        registry.register(Connector("pubmed", empty_page))
+
+
+async def test_sources_with_a_fresh_cached_page_make_no_upstream_call(monkeypatch):
+    monkeypatch.setattr(settings, "source_cache_enabled", True)
+    registry = ConnectorRegistry()
+    for name in ("PubMed", "OpenAlex"):
+        registry.register(Connector(name, empty_page))
+    sources = registry.select()
+    assert registry.upstream_calls("metformin", 10, sources) == 2
+    await registry.calls("metformin", 10, {"PubMed": ""})["PubMed"]()
+    assert registry.upstream_calls("Metformin", 10, sources) == 1
+    assert registry.upstream_calls("metformin", 20, sources) == 2
+
+
+async def test_a_slow_connector_times_out(monkeypatch):
+    monkeypatch.setattr(settings, "source_cache_enabled", False)
+
+    async def slow(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        await asyncio.sleep(1)
+        return SourcePage([], "")
+
+    registry = ConnectorRegistry()
+    registry.register(Connector("Slow", slow, timeout=0.01))
+    with pytest.raises(asyncio.TimeoutError):
+        await registry.calls("metformin", 10, {"Slow": ""})["Slow"]()
+
+
+def status_error(status: int, headers: dict[str, str] | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://example.org")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(retry.asyncio, "sleep", sleep)
+    return delays
+
+
+def failing(*errors: Exception):
+    """A call that raises ``errors`` in turn, then returns the attempt count."""
+    attempts: list[int] = []
+
+    async def call() -> int:
+        attempts.append(1)
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return len(attempts)
+
+    return call
+
+
+@pytest.mark.parametrize(
+    "error", [httpx.ConnectError("refused"), status_error(429), status_error(503)]
+)
+async def test_transient_errors_are_retried(no_sleep, error):
+    assert await with_retries("PubMed", failing(error, error), 2, 0.1, 1.0) == 3
+    assert len(no_sleep) == 2
+
+
+@pytest.mark.parametrize("error", [status_error(404), ValueError("bad payload")])
+async def test_other_errors_are_not_retried(no_sleep, error):
+    with pytest.raises(type(error)):
+        await with_retries("PubMed", failing(error), 2, 0.1, 1.0)
+    assert no_sleep == []
+
+
+async def test_a_429_is_not_retried_when_the_status_is_excluded(no_sleep):
+    error = status_error(429)
+    with pytest.raises(httpx.HTTPStatusError):
+        await with_retries("PubMed", failing(error), 2, 0.1, 1.0, SERVER_ERROR_STATUSES)
+    assert no_sleep == []
+    server_error = failing(status_error(503))
+    assert await with_retries("PubMed", server_error, 2, 0.1, 1.0, SERVER_ERROR_STATUSES) == 2
+
+
+def test_pubmed_leaves_429s_to_the_ncbi_scheduler():
+    policies = {name: stats["policy"] for name, stats in default_registry().stats().items()}
+    assert 429 not in policies["PubMed"]["retry_statuses"]
+    assert 429 in policies["OpenAlex"]["retry_statuses"]
+
+
+async def test_retries_stop_at_the_limit(no_sleep):
+    error = httpx.ReadTimeout("slow")
+    with pytest.raises(httpx.ReadTimeout):
+        await with_retries("PubMed", failing(error, error, error), 2, 0.1, 1.0)
+    assert len(no_sleep) == 2
+
+
+def test_backoff_honours_retry_after_within_the_cap():
+    assert backoff_delay(0, 0.1, 5.0, status_error(429, {"Retry-After": "2"})) == 2.0
+    assert backoff_delay(0, 0.1, 5.0, status_error(429, {"Retry-After": "60"})) == 5.0
+    assert 0 <= backoff_delay(3, 0.1, 5.0, status_error(503, {"Retry-After": "soon"})) <= 0.8
+    assert 0 <= backoff_delay(10, 0.1, 5.0, httpx.ConnectError("refused")) <= 5.0
@@ -0,0 +1,97 @@
+from app.models.records import SourceLinkRecord, StudyRecord
+from app.services.dedup import Deduplicator, deduplicate_studies, identifiers, merge_group, minhash, normalize_doi
+
+TITLE = "Metformin and cardiovascular outcomes in adults with type 2 diabetes mellitus"
+
+
+def study(title: str = TITLE, source: str = "PubMed", **fields: object) -> StudyRecord:
+    return StudyRecord(title=title, source=source, **fields)
+
+
+def test_normalize_doi_strips_resolvers_and_case():
+    assert normalize_doi(" https://doi.org/10.1000/ABC ") == "10.1000/abc"
+    assert normalize_doi("doi: 10.1000/Abc") == "10.1000/abc"
+
+
+def test_identifiers_fall_back_to_the_url():
+    assert identifiers(study(url="https://pubmed.ncbi.nlm.nih.gov/12345/")) == [("pmid", "12345")]
+    assert identifiers(study(url="https://clinicaltrials.gov/study/nct01234567")) == [
+        ("nct", "NCT01234567")
+    ]
+
+
+def test_shared_identifier_merges_despite_different_titles():
+    dedup = Deduplicator()
+    dedup.add(study("Completely different wording", doi="10.1/x"))
+    assert not dedup.add(study("Another title", source="OpenAlex", doi="https://doi.org/10.1/X"))
+    assert len(dedup.groups()) == 1
+
+
+def test_near_duplicate_titles_merge_via_minhash():
+    dedup = Deduplicator()
+    dedup.add(study(TITLE))
+    # One extra word: token Jaccard 11/12, not an exact normalized match
+    assert not dedup.add(study(f"{TITLE} cohort", source="EuropePMC"))
+    assert len(dedup.groups()) == 1
+
+
+def test_punctuation_and_case_do_not_split_a_title():
+    assert len(deduplicate_studies([study("Aspirin: a review."), study("ASPIRIN - A REVIEW")])) == 1
+
+
+def test_dissimilar_titles_stay_apart():
+    dedup = Deduplicator()
+    dedup.add(study(TITLE))
+    assert dedup.add(study("Statin therapy and stroke prevention in elderly patients with atrial fibrillation"))
+    assert len(dedup.groups()) == 2
+
+
+def test_conflicting_identifiers_block_a_title_match():
+    dedup = Deduplicator()
+    dedup.add(study(pmid="1"))
+    assert dedup.add(study(source="EuropePMC", pmid="2"))
+    assert dedup.add(study(f"{TITLE} cohort", source="OpenAlex", pmid="3"))
+    assert len(dedup.groups()) == 3
+
+
+def test_short_titles_only_match_exactly():
+    dedup = Deduplicator()
+    dedup.add(study("Reply to the editor"))
+    assert dedup.add(study("Reply to editor"))
+    assert not dedup.add(study("Reply to the editor.", source="OpenAlex"))
+    assert len(dedup.groups()) == 2
+
+
+def test_a_bridging_record_merges_two_groups():
+    dedup = Deduplicator()
+    dedup.add(study("First wording of the title", doi="10.1/x"))
+    dedup.add(study("Second, unrelated wording", source="OpenAlex", pmid="42"))
+    assert not dedup.add(study("Third wording", source="EuropePMC", doi="10.1/x", pmid="42"))
+    assert [[s.source for s in group] for group in dedup.groups()] == [
+        ["PubMed", "OpenAlex", "EuropePMC"]
+    ]
+
+
+def test_minhash_is_deterministic_and_order_free():
+    tokens = set(TITLE.lower().split())
+    assert minhash(tokens) == minhash(set(reversed(sorted(tokens))))
+
+
+def test_merge_group_prefers_primary_and_fills_gaps():
+    primary = study(source="PubMed", url="https://pubmed/1", pmid="1", abstract="Short.")
+    other = study(
+        source="EuropePMC",
+        url="https://epmc/1",
+        doi="10.1/x",
+        abstract="A much longer abstract.",
+        authors=["A", "B"],
+        journal="Journal",
+    )
+    merged = merge_group([primary, other])
+    assert (merged.source, merged.url, merged.pmid) == ("PubMed", "https://pubmed/1", "1")
+    assert (merged.doi, merged.journal, merged.authors) == ("10.1/x", "Journal", ["A", "B"])
+    assert merged.abstract == "A much longer abstract."
+    assert merged.links == [
+        SourceLinkRecord(source="PubMed", url="https://pubmed/1"),
+        SourceLinkRecord(source="EuropePMC", url="https://epmc/1"),
+    ]
@@ -0,0 +1,112 @@
+import asyncio
+
+from app.config import settings
+from app.models.records import StudyRecord
+from app.services.cache import SingleFlight
+from app.services.fanout import HedgedSource, gather_sources, iter_sources
+from app.services.paging import SourcePage
+
+
+def call(title: str, delay: float = 0.0, error: Exception | None = None):
+    async def run() -> SourcePage:
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return SourcePage([StudyRecord(title=title, source="PubMed")])
+
+    return run
+
+
+async def test_gather_keeps_call_order_and_reports_each_source():
+    pages, statuses = await gather_sources(
+        {
+            "PubMed": call("slow", delay=0.02),
+            "OpenAlex": call("fast"),
+            "EuropePMC": call("broken", error=RuntimeError("upstream down")),
+        },
+        deadline=1.0,
+    )
+    assert {label: [s.title for s in page.studies] for label, page in pages.items()} == {
+        "PubMed": ["slow"],
+        "OpenAlex": ["fast"],
+        "EuropePMC": [],
+    }
+    assert [(s.source, s.status, s.result_count) for s in statuses] == [
+        ("PubMed", "ok", 1),
+        ("OpenAlex", "ok", 1),
+        ("EuropePMC", "error", 0),
+    ]
+
+
+async def test_calls_past_the_deadline_are_cancelled_and_reported():
+    cancelled = asyncio.Event()
+
+    async def hanging() -> SourcePage:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return SourcePage()
+
+    statuses = [
+        status
+        async for _, status in iter_sources({"PubMed": hanging, "OpenAlex": call("fast")}, deadline=0.05)
+    ]
+    assert [(s.source, s.status) for s in statuses] == [("OpenAlex", "ok"), ("PubMed", "timeout")]
+    assert statuses[1].elapsed_ms == 50.0
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+
+
+async def test_hedge_wins_when_the_primary_is_slow(monkeypatch):
+    monkeypatch.setattr(settings, "hedging_enabled", True)
+    monkeypatch.setattr(settings, "hedge_min_samples", 1)
+    delays = [10.0, 0.0]
+
+    async def connector(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        await asyncio.sleep(delays.pop(0))
+        return SourcePage([StudyRecord(title=query, source="PubMed")])
+
+    hedged = HedgedSource("PubMed", connector)
+    hedged.latency.record(0.01)
+    page = await asyncio.wait_for(hedged("metformin"), 1)
+    assert [study.title for study in page.studies] == ["metformin"]
+    assert hedged.stats()["hedges"] == hedged.stats()["hedge_wins"] == 1
+
+
+async def test_no_hedge_without_enough_samples(monkeypatch):
+    monkeypatch.setattr(settings, "hedging_enabled", True)
+    calls = []
+
+    async def connector(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        calls.append(query)
+        await asyncio.sleep(0.02)
+        return SourcePage()
+
+    hedged = HedgedSource("PubMed", connector)
+    assert await hedged("metformin") == SourcePage()
+    assert calls == ["metformin"]
+    assert hedged.hedges == 0
+
+
+async def test_a_cancelled_shared_call_is_reported_as_an_error():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def upstream() -> SourcePage:
+        await release.wait()
+        return SourcePage()
+
+    async def cancelled_source() -> SourcePage:
+        # Another request's call for the same key, cancelled by its last waiter
+        caller = asyncio.ensure_future(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0)
+        return await caller
+
+    statuses = {}
+    async for _, status in iter_sources({"A": cancelled_source, "B": call("B")}, deadline=1.0):
+        statuses[status.source] = status.status
+    assert statuses == {"A": "error", "B": "ok"}
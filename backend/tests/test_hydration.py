@@ -0,0 +1,170 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app import routes
+from app.models.records import StudyRecord
+from app.services import hydration
+from app.services.cache import SingleFlight, TTLCache
+from app.services.hydration import InvalidStudyIdError, hydrate, hydrate_studies, parse_study_id
+from app.services.study_store import StudyStore
+
+
+@pytest.mark.parametrize(
+    "study_id, expected",
+    [
+        ("pmid: 123", ("pmid", "123")),
+        ("nct:nct00000001", ("nct", "NCT00000001")),
+        ("pmcid:pmc42", ("pmcid", "PMC42")),
+        ("doi:https://doi.org/10.1/ABC", ("doi", "10.1/abc")),
+        ("openalex:w123", ("openalex", "W123")),
+    ],
+)
+def test_parse_study_id_normalizes_values(study_id, expected):
+    assert parse_study_id(study_id) == expected
+
+
+@pytest.mark.parametrize(
+    "study_id",
+    [
+        "",
+        "123",
+        "isbn:1",
+        "pmid:",
+        "pmid:abc",
+        "nct:123",
+        "pmcid:42",
+        "openalex:W1|W2",
+        "doi:11.1/a",
+        'doi:10.1/a" OR "x',
+        "doi:10.1/a,10.1/b",
+    ],
+)
+def test_parse_study_id_rejects_unknown_or_malformed_ids(study_id):
+    with pytest.raises(InvalidStudyIdError):
+        parse_study_id(study_id)
+
+
+def test_records_derive_the_cheapest_id():
+    assert StudyRecord(title="t", source="PubMed", pmid="1", doi="10.1/a").id == "pmid:1"
+    assert StudyRecord(title="t", source="OpenAlex", doi="10.1/A").id == "doi:10.1/a"
+    assert StudyRecord(title="t", source="OpenAlex", url="https://openalex.org/W9").id == "openalex:W9"
+    assert StudyRecord(title="t", source="OpenAlex").id == ""
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    """Fake lookups: PubMed answers every PMID, Europe PMC has no abstracts."""
+    calls: list[tuple[str, object]] = []
+
+    async def fetch_pubmed_articles(pmids: list[str]) -> dict[str, StudyRecord]:
+        calls.append(("pubmed", sorted(pmids)))
+        return {
+            pmid: StudyRecord(title=f"Study {pmid}", abstract="Full text.", source="PubMed", pmid=pmid)
+            for pmid in pmids
+        }
+
+    async def europe_pmc(kind: str, value: str) -> list[StudyRecord]:
+        calls.append(("europepmc", value))
+        return [StudyRecord(title="Lite", source="EuropePMC", doi=value)]
+
+    async def openalex(kind: str, value: str) -> list[StudyRecord]:
+        calls.append(("openalex", value))
+        if value == "10.1/missing":
+            raise RuntimeError("OpenAlex down")
+        return [StudyRecord(title="Full", abstract="From OpenAlex.", source="OpenAlex", doi=value)]
+
+    async def pubmed(kind: str, value: str) -> list[StudyRecord]:
+        return list((await fetch_pubmed_articles([value])).values())
+
+    monkeypatch.setattr(hydration, "fetch_pubmed_articles", fetch_pubmed_articles)
+    monkeypatch.setitem(hydration._LOOKUPS, "pmid", (pubmed,))
+    monkeypatch.setitem(hydration._LOOKUPS, "doi", (europe_pmc, openalex))
+    monkeypatch.setattr(hydration, "_studies", TTLCache("studies", 100, 60))
+    monkeypatch.setattr(hydration, "_flight", SingleFlight())
+    return calls
+
+
+async def test_hydrate_falls_back_until_a_source_has_the_abstract(upstreams):
+    study = await hydrate("doi:10.1/A")
+    assert (study.source, study.abstract) == ("OpenAlex", "From OpenAlex.")
+    assert await hydrate("doi:10.1/a") is study
+    assert upstreams == [("europepmc", "10.1/a"), ("openalex", "10.1/a")]
+
+
+async def test_hydrate_returns_the_best_match_when_a_later_source_fails(upstreams):
+    study = await hydrate("doi:10.1/missing")
+    assert (study.source, study.abstract) == ("EuropePMC", "")
+
+
+async def test_hydrate_studies_batches_pmids_into_one_fetch(upstreams):
+    studies = [
+        StudyRecord(title="Lite 1", source="PubMed", pmid="1"),
+        StudyRecord(title="Has abstract", abstract="Kept.", source="PubMed", pmid="2"),
+        StudyRecord(title="Lite 3", source="EuropePMC", pmid="3"),
+        StudyRecord(title="Lite DOI", source="OpenAlex", doi="10.1/a"),
+        StudyRecord(title="No id", source="OpenAlex"),
+    ]
+    hydrated = await hydrate_studies(studies)
+    assert [study.abstract for study in hydrated] == [
+        "Full text.",
+        "Kept.",
+        "Full text.",
+        "From OpenAlex.",
+        "",
+    ]
+    # Merged into the lite record, which keeps its own source
+    assert [study.source for study in hydrated] == [study.source for study in studies]
+    assert ("pubmed", ["1", "3"]) in upstreams
+    assert len([call for call in upstreams if call[0] == "pubmed"]) == 1
+
+    upstreams.clear()
+    await hydrate_studies(studies)
+    assert upstreams == []
+
+
+async def test_hydrate_studies_leaves_studies_unchanged_when_lookups_fail(upstreams, monkeypatch):
+    async def failing(pmids: list[str]) -> dict[str, StudyRecord]:
+        raise RuntimeError("NCBI down")
+
+    monkeypatch.setattr(hydration, "fetch_pubmed_articles", failing)
+    study = StudyRecord(title="Lite", source="PubMed", pmid="1")
+    assert await hydrate_studies([study]) == [study]
+
+
+async def test_hydrate_studies_skips_malformed_ids(upstreams):
+    study = StudyRecord(title="Bad DOI", source="OpenAlex", doi="10.1/a,10.1/b")
+    assert await hydrate_studies([study]) == [study]
+    assert upstreams == []
+
+
+async def test_get_study_prefers_the_store_then_hydrates(upstreams, monkeypatch):
+    store = StudyStore(":memory:")
+    monkeypatch.setattr(routes, "_study_store", store)
+    monkeypatch.setattr(routes, "hydrate", hydrate)
+    await store.upsert([StudyRecord(title="Stored", abstract="Local.", source="PubMed", pmid="7")])
+
+    stored = json.loads((await routes.get_study("pmid:7")).body)
+    assert (stored["id"], stored["abstract"]) == ("pmid:7", "Local.")
+    assert upstreams == []
+
+    hydrated = json.loads((await routes.get_study("pmid:8")).body)
+    assert hydrated["abstract"] == "Full text."
+    while store.stats()["pending_writes"]:
+        await asyncio.sleep(0.01)
+    assert (await store.get("pmid:8")).abstract == "Full text."
+    store.close()
+
+
+@pytest.mark.parametrize("study_id, status", [("isbn:1", 400), ("nct:NCT00000001", 404)])
+async def test_get_study_errors(upstreams, monkeypatch, study_id, status):
+    async def nothing(kind: str, value: str) -> list[StudyRecord]:
+        return []
+
+    monkeypatch.setitem(hydration._LOOKUPS, "nct", (nothing,))
+    monkeypatch.setattr(routes, "_study_store", None)
+    with pytest.raises(HTTPException) as excinfo:
+        await routes.get_study(study_id)
+    assert excinfo.value.status_code == status
@@ -0,0 +1,92 @@
+import httpx
+from fastapi import APIRouter, FastAPI
+
+from app.services import metrics
+from app.services.metrics import Counter, Gauge, Histogram, MetricsMiddleware, Registry
+
+
+def test_render_uses_the_prometheus_text_format():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests", ["route"])
+    inflight = Gauge("inflight", "In flight")
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for metric in (requests, inflight, latency):
+        registry.register(metric)
+
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    inflight.inc()
+    inflight.dec(0.5)
+    latency.observe(0.05)
+    latency.observe(0.1)
+    latency.observe(3)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b"} 3',
+        "# HELP inflight In flight",
+        "# TYPE inflight gauge",
+        "inflight 0.5",
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 3.15",
+        "latency_seconds_count 3",
+    ]
+
+
+def test_collectors_are_read_at_scrape_time():
+    registry = Registry()
+    size = {"value": 1}
+
+    def collect():
+        gauge = Gauge("cache_size", "Entries")
+        gauge.set(size["value"])
+        return [gauge]
+
+    registry.register_collector(collect)
+    size["value"] = 7
+    assert "cache_size 7" in registry.render()
+
+
+def test_server_timing_lists_each_stage_and_the_total():
+    assert metrics.server_timing({"spellcheck": 0.0123, "sources": 0.2}, 0.25) == (
+        "spellcheck;dur=12.3, sources;dur=200.0, total;dur=250.0"
+    )
+
+
+def build_app() -> FastAPI:
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    async def item(item_id: str) -> dict:
+        with metrics.stage("lookup"):
+            pass
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def request_count(route: str, status: str) -> float:
+    return metrics.HTTP_REQUESTS._values.get((route, "GET", status), 0.0)
+
+
+async def test_middleware_labels_requests_by_route_template_and_adds_server_timing():
+    before = request_count("/api/items/{item_id}", "200")
+    unmatched = request_count("unmatched", "404")
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/items/42")
+        missing = await client.get("/nowhere")
+
+    assert response.headers["server-timing"].startswith("lookup;dur=")
+    assert "total;dur=" in response.headers["server-timing"]
+    assert "server-timing" not in missing.headers
+    assert request_count("/api/items/{item_id}", "200") == before + 1
+    assert request_count("unmatched", "404") == unmatched + 1
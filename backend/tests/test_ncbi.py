@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import ncbi
+from app.services.ncbi import FETCH, SEARCH, SPELL, KeyBatcher, NCBIScheduler, ncbi_get
+
+
+async def test_burst_is_served_without_waiting():
+    scheduler = NCBIScheduler(rate=10, burst=3)
+    start = time.monotonic()
+    for _ in range(3):
+        await scheduler.acquire(SEARCH)
+    assert time.monotonic() - start < 0.05
+    assert scheduler.stats()["lanes"][SEARCH]["requests"] == 3
+
+
+async def test_bucket_limits_the_rate():
+    scheduler = NCBIScheduler(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        await scheduler.acquire(SEARCH)
+    # One from the burst, then four refills at 20 ms each
+    assert time.monotonic() - start >= 0.07
+
+
+async def test_higher_priority_lanes_are_served_first():
+    scheduler = NCBIScheduler(rate=50, burst=1)
+    await scheduler.acquire(SEARCH)
+    served: list[str] = []
+
+    async def request(lane: str) -> None:
+        await scheduler.acquire(lane)
+        served.append(lane)
+
+    await asyncio.gather(request(SPELL), request(SEARCH), request(FETCH), request(SPELL))
+    assert served == [FETCH, SEARCH, SPELL, SPELL]
+    assert scheduler.stats()["lanes"][SPELL]["queued"] == 0
+
+
+async def test_cancelled_waiter_passes_its_slot_on():
+    scheduler = NCBIScheduler(rate=50, burst=1)
+    await scheduler.acquire(SEARCH)
+    cancelled = asyncio.ensure_future(scheduler.acquire(FETCH))
+    waiting = asyncio.ensure_future(scheduler.acquire(SPELL))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.wait_for(waiting, 1)
+    assert scheduler.lanes[FETCH]["requests"] == 0
+    assert scheduler.lanes[SPELL]["requests"] == 1
+
+
+async def test_penalize_empties_the_bucket():
+    scheduler = NCBIScheduler(rate=100, burst=5)
+    scheduler.penalize(0.05)
+    start = time.monotonic()
+    await scheduler.acquire(FETCH)
+    assert time.monotonic() - start >= 0.05
+    assert scheduler.stats()["throttled"] == 1
+
+
+@pytest.fixture
+def ncbi_responses(monkeypatch):
+    """Answer E-utilities calls with the queued status codes."""
+    statuses: list[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(statuses.pop(0), headers={"Retry-After": "0"}, text="<ok/>")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://ncbi.test")
+    monkeypatch.setattr(ncbi, "get_client", lambda host: client)
+    monkeypatch.setattr(ncbi, "scheduler", NCBIScheduler(rate=1000, burst=10))
+    monkeypatch.setattr(settings, "ncbi_max_retries", 1)
+    return statuses
+
+
+async def test_ncbi_get_retries_a_429_after_backing_off(ncbi_responses):
+    ncbi_responses.extend([429, 200])
+    resp = await ncbi_get("/esearch.fcgi", {"term": "metformin"}, lane=SEARCH, timeout=1)
+    assert resp.status_code == 200
+    assert ncbi.scheduler.stats()["throttled"] == 1
+
+
+async def test_ncbi_get_raises_once_retries_run_out(ncbi_responses):
+    ncbi_responses.extend([429, 429])
+    with pytest.raises(httpx.HTTPStatusError):
+        await ncbi_get("/esearch.fcgi", {"term": "metformin"}, lane=SEARCH, timeout=1)
+    assert ncbi_responses == []
+
+
+class RecordingFetch:
+    def __init__(self, error: Exception | None = None) -> None:
+        self.calls: list[list[str]] = []
+        self.error = error
+
+    async def __call__(self, keys: list[str]) -> dict[str, str]:
+        self.calls.append(keys)
+        if self.error is not None:
+            raise self.error
+        return {key: key.upper() for key in keys}
+
+
+async def test_concurrent_loads_share_one_fetch():
+    fetch = RecordingFetch()
+    batcher = KeyBatcher(fetch, window=0.01, max_keys=10)
+    first, second = await asyncio.gather(batcher.load(["a", "b"]), batcher.load(["b", "c"]))
+    assert fetch.calls == [["a", "b", "c"]]
+    assert first == {"a": "A", "b": "B"}
+    assert second == {"b": "B", "c": "C"}
+    assert batcher.stats() == {"batches": 1, "merged_calls": 1}
+
+
+async def test_missing_keys_are_left_out():
+    async def fetch(keys: list[str]) -> dict[str, str]:
+        return {"a": "A"}
+
+    batcher = KeyBatcher(fetch, window=0.0, max_keys=10)
+    assert await batcher.load(["a", "missing"]) == {"a": "A"}
+
+
+async def test_full_batch_is_sealed_early():
+    fetch = RecordingFetch()
+    batcher = KeyBatcher(fetch, window=0.01, max_keys=3)
+    await asyncio.gather(batcher.load(["a", "b"]), batcher.load(["c", "d"]))
+    assert fetch.calls == [["a", "b"], ["c", "d"]]
+    assert batcher.batches == 2
+
+
+async def test_keys_join_while_the_gate_is_closed():
+    fetch = RecordingFetch()
+    gate = asyncio.Event()
+    batcher = KeyBatcher(fetch, window=0.0, max_keys=10, gate=gate.wait)
+    first = asyncio.ensure_future(batcher.load(["a"]))
+    await asyncio.sleep(0.01)
+    second = asyncio.ensure_future(batcher.load(["b"]))
+    await asyncio.sleep(0)
+    gate.set()
+    assert await first == {"a": "A"}
+    assert await second == {"b": "B"}
+    assert fetch.calls == [["a", "b"]]
+
+
+async def test_fetch_error_reaches_every_caller():
+    fetch = RecordingFetch(error=RuntimeError("upstream down"))
+    batcher = KeyBatcher(fetch, window=0.01, max_keys=10)
+    results = await asyncio.gather(batcher.load(["a"]), batcher.load(["b"]), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # The failed batch is not reused
+    fetch.error = None
+    assert await batcher.load(["a"]) == {"a": "A"}
+
+
+async def test_cancelled_caller_does_not_cancel_the_batch():
+    fetch = RecordingFetch()
+    batcher = KeyBatcher(fetch, window=0.01, max_keys=10)
+    leaving = asyncio.ensure_future(batcher.load(["a"]))
+    staying = asyncio.ensure_future(batcher.load(["b"]))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    assert await staying == {"b": "B"}
+    with pytest.raises(asyncio.CancelledError):
+        await leaving
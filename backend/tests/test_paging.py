@@ -0,0 +1,209 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app import routes
+from app.config import settings
+from app.models.records import StudyRecord
+from app.services import paging
+from app.services.cache import TieredCache, TTLCache
+from app.services.paging import (
+    CURSOR_VERSION,
+    InvalidCursorError,
+    SourcePage,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def _forge(cursor: str, **changes: object) -> str:
+    """Rewrite the payload of ``cursor`` and keep its original signature."""
+    payload, tag = cursor.split(".")
+    state = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    state.update(changes)
+    forged = base64.urlsafe_b64encode(json.dumps(state).encode()).decode().rstrip("=")
+    return f"{forged}.{tag}"
+
+
+def test_round_trip():
+    state = {"s": "abc", "q": "metformin", "n": 10, "c": {"PubMed": "20"}, "p": 2}
+    assert decode_cursor(encode_cursor(state)) == state
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"q": "a/b+c?d=e&f"})
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.")
+
+
+def test_tampered_payload_is_rejected():
+    cursor = encode_cursor({"n": 10, "c": {"PubMed": "20"}})
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(_forge(cursor, n=5000))
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(_forge(cursor, c={"PubMed": "0&retmax=100000"}))
+
+
+def test_tampered_signature_is_rejected():
+    payload, tag = encode_cursor({"n": 10}).split(".")
+    flipped = ("A" if tag[0] != "A" else "B") + tag[1:]
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(f"{payload}.{flipped}")
+
+
+@pytest.mark.parametrize("cursor", ["", "garbage", "a.b.c", "é.é", "eyJ2IjoyfQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_cursor_signed_with_another_secret_is_rejected(monkeypatch):
+    cursor = encode_cursor({"n": 10})
+    monkeypatch.setattr(settings, "cursor_secret", "another worker's secret")
+    paging._cursor_key.cache_clear()
+    try:
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor)
+    finally:
+        paging._cursor_key.cache_clear()
+
+
+def test_unsigned_version_mismatch_is_rejected():
+    payload = json.dumps({"v": CURSOR_VERSION - 1, "n": 10}).encode()
+    cursor = f"{paging._b64encode(payload)}.{paging._b64encode(paging._tag(payload))}"
+    with pytest.raises(InvalidCursorError, match="version"):
+        decode_cursor(cursor)
+
+
+# PubMed pages by cursor; its second slice repeats a first-page study
+PUBMED_PAGES = {
+    "": SourcePage(
+        [
+            StudyRecord(title="Metformin trial", source="PubMed", pmid="1"),
+            StudyRecord(title="Metformin cohort", source="PubMed", pmid="2"),
+            StudyRecord(title="Metformin registry", source="PubMed", pmid="3"),
+        ],
+        next_cursor="3",
+    ),
+    "3": SourcePage(
+        [
+            StudyRecord(title="Metformin trial", source="PubMed", pmid="1"),
+            StudyRecord(title="Metformin dosing", source="PubMed", pmid="4"),
+        ]
+    ),
+}
+
+
+@pytest.fixture
+def paged_sources(monkeypatch, connectors):
+    calls: list[tuple[str, str]] = []
+
+    async def correct(q: str, corrected: str | None = None) -> tuple[str, str]:
+        return q, ""
+
+    async def summarize(query: str, studies: list[StudyRecord]) -> tuple[str, str]:
+        return "summary", "llm"
+
+    def connector(label: str):
+        async def search(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+            calls.append((label, cursor))
+            return PUBMED_PAGES[cursor] if label == "PubMed" else SourcePage()
+
+        return search
+
+    monkeypatch.setattr(routes, "_correct", correct)
+    monkeypatch.setattr(routes, "_search_cache", None)
+    monkeypatch.setattr(routes, "_page_sessions", TTLCache("pages", 100, 60))
+    monkeypatch.setattr(routes, "summarize_studies", summarize)
+    connectors({label: connector(label) for label in ("PubMed", "ClinicalTrials", "EuropePMC", "OpenAlex")})
+    return calls
+
+
+async def search(q: str, cursor: str | None = None):
+    return await routes._dispatch_search(q, 10, 2, None, cursor, None)
+
+
+async def test_pages_carry_over_ranked_studies_and_skip_earlier_hits(paged_sources):
+    first = await search("metformin")
+    assert len(first.studies) == 2
+    assert first.next_cursor
+
+    paged_sources.clear()
+    second = await search("metformin", first.next_cursor)
+    # Only PubMed still had a slice; the repeated study merges into page 1's
+    assert paged_sources == [("PubMed", "3")]
+    shown = {s.pmid for s in first.studies}
+    assert {s.pmid for s in second.studies} == {"1", "2", "3", "4"} - shown
+    assert second.summary == ""
+    assert second.next_cursor == ""
+
+    # A retried page is served again without calling the sources
+    paged_sources.clear()
+    assert await search("metformin", first.next_cursor) == second
+    assert paged_sources == []
+
+
+async def test_cache_hits_build_no_session_state(paged_sources, monkeypatch):
+    monkeypatch.setattr(routes, "_search_cache", TieredCache([TTLCache("memory", 10, 60)]))
+    first = await search("metformin")
+
+    def no_dedup():
+        raise AssertionError("a cached first page built dedup state")
+
+    monkeypatch.setattr(routes, "Deduplicator", no_dedup)
+    assert await search("metformin") == first
+    # Repeats share the one entry kept for the first page
+    assert len(routes._page_sessions) == 1
+
+
+async def test_page_two_skips_shown_studies_once_the_first_page_is_gone(
+    paged_sources, monkeypatch
+):
+    first = await search("metformin")
+    monkeypatch.setattr(routes, "_page_sessions", TTLCache("pages", 100, 60))
+    second = await search("metformin", first.next_cursor)
+    shown = {s.pmid for s in first.studies}
+    # The carried-over study is lost, but nothing shown on page 1 repeats
+    assert {s.pmid for s in second.studies} == {"1", "4"} - shown
+
+
+async def test_next_page_rejects_a_malformed_cursor(paged_sources):
+    with pytest.raises(HTTPException) as excinfo:
+        await search("metformin", "garbage!")
+    assert excinfo.value.status_code == 400
+    assert excinfo.value.detail == "Invalid cursor"
+
+
+async def test_next_page_rejects_a_cursor_from_another_search(paged_sources):
+    first = await search("metformin")
+    with pytest.raises(HTTPException) as excinfo:
+        await search("statins", first.next_cursor)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.mark.parametrize("max_results, page", [(0, 2), (51, 2), (5000, 2), (10, 0), (10, -1)])
+async def test_next_page_rejects_out_of_range_values(max_results, page):
+    # Validly signed, as if issued by a buggy or older server
+    cursor = routes._encode_page("sid", "metformin", "metformin", max_results, {}, page)
+    with pytest.raises(HTTPException) as excinfo:
+        await routes._next_page("metformin", cursor, 10)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.mark.parametrize("missing", ["d", "o", "k", "r", "c"])
+async def test_next_page_rejects_a_cursor_missing_a_field(missing):
+    # Signed but incomplete, as if issued by a buggy server
+    state = decode_cursor(routes._encode_page("sid", "metformin", "metformin", 10, {}, 2))
+    del state[missing]
+    with pytest.raises(HTTPException) as excinfo:
+        await routes._next_page("metformin", encode_cursor(state), 10)
+    assert (excinfo.value.status_code, excinfo.value.detail) == (400, "Invalid cursor")
+
+
+async def test_next_page_rejects_a_forged_cursor():
+    cursor = _forge(routes._encode_page("sid", "metformin", "metformin", 10, {}, 2), n=5000)
+    with pytest.raises(HTTPException) as excinfo:
+        await routes._next_page("metformin", cursor, 10)
+    assert excinfo.value.status_code == 400
+    assert excinfo.value.detail == "Invalid cursor"
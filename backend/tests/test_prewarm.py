@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from app.config import settings
+from app.services.prewarm import CountMinSketch, Prewarmer, TopK
+
+
+def test_sketch_never_undercounts():
+    sketch = CountMinSketch(width=64, depth=3)
+    rng = random.Random(7)
+    truth: dict[str, int] = {}
+    for _ in range(2000):
+        key = f"q{rng.randrange(300)}"
+        truth[key] = truth.get(key, 0) + 1
+        sketch.add(key)
+    assert all(sketch.estimate(key) >= count for key, count in truth.items())
+    assert sketch.total == 2000
+
+
+def test_sketch_is_exact_without_collisions():
+    sketch = CountMinSketch()
+    assert sketch.add("metformin", 3) == 3
+    assert sketch.add("metformin") == 4
+    assert sketch.estimate("metformin") == 4
+    assert sketch.estimate("never seen") == 0
+
+
+def test_sketch_decay_halves_counts():
+    sketch = CountMinSketch()
+    sketch.add("metformin", 5)
+    sketch.decay()
+    assert sketch.estimate("metformin") == 2
+    assert sketch.total == 2
+
+
+def test_top_k_keeps_heavy_hitters_among_noise():
+    top = TopK(3, CountMinSketch(width=256, depth=4))
+    for i in range(200):
+        for key in ("a", "b", "c"):
+            top.add(key)
+        top.add(f"noise{i}")
+    assert {key for key, _ in top.most_common()} == {"a", "b", "c"}
+    assert top.most_common(1)[0][1] == 200
+
+
+def test_top_k_reports_the_displaced_key():
+    top = TopK(2, CountMinSketch())
+    top.add("cold")
+    for _ in range(3):
+        top.add("hot")
+    assert top.add("new") is None
+    assert "new" not in top
+    assert top.add("new") == "cold"
+    assert "new" in top and "cold" not in top
+
+
+def test_top_k_decay_drops_single_hits():
+    top = TopK(3, CountMinSketch())
+    top.add("once")
+    for _ in range(4):
+        top.add("often")
+    top.decay()
+    assert top.most_common() == [("often", 2)]
+
+
+@pytest.fixture
+def prewarm_settings(monkeypatch):
+    monkeypatch.setattr(settings, "prewarm_enabled", True)
+    monkeypatch.setattr(settings, "prewarm_top_k", 10)
+    monkeypatch.setattr(settings, "prewarm_min_hits", 2)
+    monkeypatch.setattr(settings, "prewarm_lead", 60.0)
+    monkeypatch.setattr(settings, "prewarm_budget", 5)
+
+
+async def test_prewarmer_refreshes_hot_searches_near_expiry(prewarm_settings):
+    refreshed: list[tuple[str, object]] = []
+    expires = {"hot": 10.0, "fresh": 3600.0, "cold": 10.0}
+
+    async def refresh(key: str, params: object) -> None:
+        refreshed.append((key, params))
+
+    prewarmer = Prewarmer(refresh, expires.get)
+    for key in ("hot", "hot", "hot", "fresh", "fresh", "cold", "gone", "gone"):
+        prewarmer.record(key, params=(key, 10))
+    assert prewarmer.due() == ["hot", "gone"]
+    assert await prewarmer.run_once() == 2
+    assert refreshed == [("hot", ("hot", 10)), ("gone", ("gone", 10))]
+    # Attempted searches wait out the lead time before being tried again
+    assert prewarmer.due() == []
+
+
+async def test_prewarmer_defers_searches_over_budget(prewarm_settings):
+    refreshed: list[str] = []
+
+    async def refresh(key: str, params: object) -> None:
+        refreshed.append(key)
+
+    costs = {"a": 3, "b": 3, "c": 2}
+    prewarmer = Prewarmer(refresh, lambda key: None, costs.get)
+    for key in ("a", "a", "a", "b", "b", "c", "c"):
+        prewarmer.record(key, params=key)
+    assert await prewarmer.run_once() == 2
+    assert refreshed == ["a", "c"]
+    assert prewarmer.stats()["deferred"] == 1
+
+
+async def test_prewarmer_counts_failed_refreshes(prewarm_settings):
+    async def refresh(key: str, params: object) -> None:
+        raise RuntimeError("upstream down")
+
+    prewarmer = Prewarmer(refresh, lambda key: None)
+    prewarmer.record("a", params="a")
+    prewarmer.record("a", params="a")
+    await prewarmer.run_once()
+    assert (prewarmer.refreshed, prewarmer.failed) == (0, 1)
+
+
+def test_prewarmer_ignores_traffic_when_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "prewarm_enabled", False)
+
+    async def refresh(key: str, params: object) -> None: ...
+
+    prewarmer = Prewarmer(refresh, lambda key: None)
+    prewarmer.record("a", params="a")
+    assert len(prewarmer.top) == 0
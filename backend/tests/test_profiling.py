@@ -0,0 +1,78 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import routes
+from app.config import settings
+from app.services import profiling
+from app.services.cache import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_artifacts(monkeypatch):
+    monkeypatch.setattr(profiling, "_artifacts", TTLCache("profiles", 10, 60))
+    monkeypatch.setattr(settings, "profile_interval", 0.001)
+    monkeypatch.setattr(settings, "profile_lag_interval", 0.001)
+    monkeypatch.setattr(settings, "profile_dir", "")
+
+
+def test_request_id_keeps_a_safe_caller_id():
+    assert routes._request_id("req-42_a.b") == "req-42_a.b"
+
+
+@pytest.mark.parametrize("requested", [None, "", "..", "../etc/passwd", "a b", "x" * 65])
+def test_request_id_replaces_ids_unsafe_as_file_names(requested):
+    generated = routes._request_id(requested)
+    assert generated != requested
+    assert len(generated) == 16
+
+
+def test_debug_token_is_required(monkeypatch):
+    monkeypatch.setattr(settings, "debug_token", "")
+    with pytest.raises(HTTPException) as excinfo:
+        routes._check_debug_token("anything")
+    assert excinfo.value.detail == "Debug endpoints are disabled"
+
+    monkeypatch.setattr(settings, "debug_token", "s3cret")
+    for token in (None, "wrong"):
+        with pytest.raises(HTTPException) as excinfo:
+            routes._check_debug_token(token)
+        assert excinfo.value.status_code == 403
+    routes._check_debug_token("s3cret")
+
+
+async def test_profile_request_keeps_the_artifact(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+
+    def busy_loop() -> None:
+        deadline = time.perf_counter() + 0.03
+        while time.perf_counter() < deadline:
+            pass
+
+    async with profiling.profile_request("req-1", {"query": "metformin"}):
+        await asyncio.sleep(0.005)
+        busy_loop()
+        await asyncio.sleep(0.005)
+
+    summary, collapsed = profiling.get_profile("req-1")
+    assert summary["request_id"] == "req-1"
+    assert summary["query"] == "metformin"
+    assert summary["samples"] > 0
+    # The loop was blocked by the busy wait, so the lag monitor saw it
+    assert summary["loop_lag"]["max_ms"] >= 10
+    assert "busy_loop" in collapsed
+    assert json.loads((tmp_path / "req-1.json").read_text())["request_id"] == "req-1"
+    assert (tmp_path / "req-1.collapsed").read_text() == collapsed
+    assert profiling.get_profile("unknown") is None
+
+
+def test_lag_monitor_without_checks_reports_zeros():
+    assert profiling.LoopLagMonitor(0.01).stats() == {
+        "checks": 0,
+        "max_ms": 0.0,
+        "p50_ms": 0.0,
+        "p99_ms": 0.0,
+    }
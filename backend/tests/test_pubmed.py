@@ -0,0 +1,77 @@
+import json
+
+import httpx
+import pytest
+
+from app import routes
+from app.config import settings
+from app.services import ncbi
+from app.services.ncbi import NCBIScheduler
+from app.services.pubmed import iter_pubmed_deep
+
+
+def efetch_page(retstart: int, retmax: int) -> str:
+    articles = "".join(
+        f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+        f"<ArticleTitle>Study {pmid}</ArticleTitle></Article></MedlineCitation></PubmedArticle>"
+        for pmid in range(retstart + 1, retstart + retmax + 1)
+    )
+    return f"<PubmedArticleSet>{articles}</PubmedArticleSet>"
+
+
+class HistoryServer:
+    """Fake ESearch/EFetch pair backed by a history-server result set of ``count`` records."""
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+        self.pages: list[tuple[int, int]] = []
+        self.fail_at: int | None = None
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if request.url.path.endswith("/esearch.fcgi"):
+            assert params["usehistory"] == "y"
+            result = {"count": str(self.count), "webenv": "WEB1", "querykey": "1"}
+            return httpx.Response(200, json={"esearchresult": result})
+        assert (params["WebEnv"], params["query_key"]) == ("WEB1", "1")
+        retstart, retmax = int(params["retstart"]), int(params["retmax"])
+        self.pages.append((retstart, retmax))
+        if retstart == self.fail_at:
+            return httpx.Response(500)
+        return httpx.Response(200, text=efetch_page(retstart, retmax))
+
+
+@pytest.fixture
+def history_server(monkeypatch):
+    server = HistoryServer(count=250)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server), base_url="https://ncbi.test")
+    monkeypatch.setattr(ncbi, "get_client", lambda host: client)
+    monkeypatch.setattr(ncbi, "scheduler", NCBIScheduler(rate=1000, burst=100))
+    monkeypatch.setattr(settings, "pubmed_deep_page_size", 40)
+    monkeypatch.setattr(settings, "pubmed_deep_concurrency", 2)
+    return server
+
+
+async def test_deep_export_pages_through_the_history_server_in_order(history_server):
+    titles = [study.title async for study in iter_pubmed_deep("metformin", limit=1000)]
+    assert titles == [f"Study {pmid}" for pmid in range(1, 251)]
+    assert sorted(history_server.pages) == [(start, min(40, 250 - start)) for start in range(0, 250, 40)]
+
+
+async def test_deep_export_stops_at_the_limit(history_server):
+    studies = [study async for study in iter_pubmed_deep("metformin", limit=50)]
+    assert len(studies) == 50
+    assert sorted(history_server.pages) == [(0, 40), (40, 10)]
+
+
+async def test_empty_result_set_fetches_nothing(history_server):
+    history_server.count = 0
+    assert [study async for study in iter_pubmed_deep("metformin", limit=100)] == []
+    assert history_server.pages == []
+
+
+async def test_failed_page_ends_the_export_with_an_error_line(history_server):
+    history_server.fail_at = 80
+    lines = [json.loads(line) async for line in routes._export_lines("metformin", 1000)]
+    assert len(lines) == 81
+    assert lines[-1] == {"event": "error", "message": "PubMed export failed", "exported": 80}
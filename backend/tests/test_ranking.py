@@ -0,0 +1,61 @@
+from app.models.records import StudyRecord
+from app.services.dedup import Deduplicator
+from app.services.ranking import bm25_scores, rank_groups, rank_studies
+
+
+def study(title: str, source: str = "PubMed", abstract: str = "", **fields: object) -> StudyRecord:
+    return StudyRecord(title=title, source=source, abstract=abstract, **fields)
+
+
+def test_bm25_scores_matching_studies_only():
+    studies = [
+        study("Statins and stroke", abstract="Statins lowered stroke risk."),
+        study("Metformin in type 2 diabetes", abstract="Metformin lowered HbA1c."),
+    ]
+    unrelated, relevant = bm25_scores("metformin", studies)
+    assert unrelated == 0.0
+    assert relevant > 0.0
+
+
+def test_bm25_weights_title_terms_above_abstract_terms():
+    in_title = study("Metformin outcomes", abstract="A cohort of adults.")
+    in_abstract = study("Diabetes outcomes", abstract="A cohort of adults on metformin.")
+    filler = study("Unrelated", abstract="Nothing relevant here.")
+    title_score, abstract_score, _ = bm25_scores("metformin", [in_title, in_abstract, filler])
+    assert title_score > abstract_score > 0
+
+
+def test_bm25_without_query_terms_is_all_zero():
+    assert bm25_scores("!!", [study("Metformin")]) == [0.0]
+    assert bm25_scores("metformin", []) == []
+
+
+def test_agreement_across_sources_ranks_first():
+    dedup = Deduplicator()
+    dedup.add_all([study("Alpha study on one topic", pmid="1"), study("Beta study on another", pmid="2")])
+    dedup.add_all([study("Beta study on another", source="OpenAlex", pmid="2")])
+    # No query term anywhere, so the order is reciprocal-rank fusion alone
+    assert [s.pmid for s in rank_studies("zzz", dedup)] == ["2", "1"]
+
+
+def test_bm25_breaks_a_fusion_tie():
+    dedup = Deduplicator()
+    dedup.add(study("Statins and stroke", pmid="1"))
+    dedup.add(study("Metformin and HbA1c", source="OpenAlex", pmid="2"))
+    assert [s.pmid for s in rank_studies("metformin", dedup)] == ["2", "1"]
+
+
+def test_ties_keep_first_seen_order():
+    dedup = Deduplicator()
+    dedup.add(study("First title here ok", source="PubMed", pmid="1"))
+    dedup.add(study("Second title here ok", source="OpenAlex", pmid="2"))
+    dedup.add(study("Third title here ok", source="EuropePMC", pmid="3"))
+    assert [s.pmid for s in rank_studies("zzz", dedup)] == ["1", "2", "3"]
+
+
+
+def test_rank_groups_returns_stable_group_ids():
+    dedup = Deduplicator()
+    dedup.add_all([study("Alpha study on one topic", pmid="1"), study("Metformin trial", pmid="2")])
+    ranked = rank_groups("metformin", dedup)
+    assert [(group_id, s.pmid) for group_id, s in ranked] == [(1, "2"), (0, "1")]
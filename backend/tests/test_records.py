@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from app.models.records import SearchResult, SourceLinkRecord, StudyRecord
+from app.models.schemas import SearchResponse, SourceStatus, Study
+from app.services import encoding
+
+
+def full_study() -> StudyRecord:
+    return StudyRecord(
+        title="Metformin trial",
+        authors=["Smith J", "Doe A"],
+        abstract="Metformin lowered HbA1c.",
+        source="PubMed",
+        url="https://pubmed.ncbi.nlm.nih.gov/1/",
+        publication_date="2024-01-01",
+        journal="Lancet",
+        doi="10.1/a",
+        pmid="1",
+        pmcid="PMC1",
+        nct_id="NCT00000001",
+        links=[SourceLinkRecord(source="PubMed", url="https://pubmed.ncbi.nlm.nih.gov/1/")],
+    )
+
+
+def test_from_dict_round_trips_the_encoding():
+    study = full_study()
+    assert StudyRecord.from_dict(encoding.loads(encoding.dumps(study))) == study
+
+
+def test_record_json_matches_the_api_schema():
+    study = full_study()
+    assert encoding.loads(encoding.dumps(study)) == Study.model_validate(
+        encoding.loads(encoding.dumps(study))
+    ).model_dump()
+
+
+def test_repeated_strings_are_interned():
+    first = StudyRecord(title="a", source="".join(["Pub", "Med"]), journal="".join(["Lan", "cet"]))
+    second = StudyRecord(title="b", source="PubMed", journal="Lancet")
+    assert first.source is second.source
+    assert first.journal is second.journal
+
+
+def test_search_result_encodes_like_the_response_model():
+    result = SearchResult(
+        query="metformin",
+        total_results=1,
+        studies=[full_study()],
+        source_status=[SourceStatus(source="PubMed", status="ok", result_count=1)],
+    )
+    body = json.loads(encoding.FastJSONResponse(result.to_dict()).body)
+    assert body == SearchResponse.model_validate(body).model_dump()
+    assert list(body) == list(SearchResponse.model_fields)
+
+
+def test_unknown_objects_are_not_serializable():
+    with pytest.raises(TypeError):
+        encoding.dumps({"value": object()})
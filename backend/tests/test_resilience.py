@@ -0,0 +1,161 @@
+import pytest
+from fastapi import HTTPException
+
+from app import routes
+from app.config import settings
+from app.services.fanout import gather_sources
+from app.services.paging import SourcePage
+from app.services.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    AdaptiveLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ConcurrencyLimitError,
+    GuardedSource,
+)
+
+
+def make_breaker(**overrides: float) -> CircuitBreaker:
+    options = dict(
+        failure_rate=0.5,
+        min_calls=4,
+        window=10,
+        slow_call_seconds=1.0,
+        open_seconds=60.0,
+        half_open_calls=1,
+    )
+    options.update(overrides)
+    return CircuitBreaker("PubMed", **options)
+
+
+def make_limiter(**overrides: float) -> AdaptiveLimiter:
+    options = dict(initial=2.0, min_limit=1.0, max_limit=4.0, latency_target=1.0, backoff=0.5)
+    options.update(overrides)
+    return AdaptiveLimiter("PubMed", **options)
+
+
+def test_breaker_waits_for_min_calls():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_at_failure_rate_and_rejects():
+    breaker = make_breaker()
+    for ok in (True, False, True, False):
+        breaker.before_call()
+        breaker.record(ok, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected == 1
+
+
+def test_slow_calls_count_as_failures():
+    breaker = make_breaker()
+    for elapsed in (0.1, 2.0, 0.1, 2.0):
+        breaker.record(True, elapsed)
+    assert breaker.state == OPEN
+
+
+def test_half_open_admits_limited_probes_then_closes():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    breaker.open_seconds = 0.0
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_failed_probe_reopens():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    breaker.open_seconds = 0.0
+    breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+
+
+def test_limiter_rejects_over_the_limit_and_cancel_frees_a_slot():
+    limiter = make_limiter()
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(ConcurrencyLimitError):
+        limiter.acquire()
+    assert limiter.rejected == 1
+    limiter.cancel()
+    limiter.acquire()
+    assert limiter.inflight == 2
+
+
+def test_limiter_grows_additively_on_fast_successes():
+    limiter = make_limiter()
+    limiter.acquire()
+    limiter.release(True, 0.1)
+    assert limiter.limit == pytest.approx(2.5)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(True, 0.1)
+    assert limiter.limit == 4.0
+
+
+@pytest.mark.parametrize("ok, elapsed", [(False, 0.1), (True, 2.0)])
+def test_limiter_backs_off_on_errors_and_slow_calls(ok, elapsed):
+    limiter = make_limiter(initial=4.0)
+    limiter.acquire()
+    limiter.release(ok, elapsed)
+    assert limiter.limit == 2.0
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(ok, elapsed)
+    assert limiter.limit == 1.0
+    assert limiter.inflight == 0
+
+
+async def test_guarded_source_skips_the_upstream_while_open(monkeypatch):
+    monkeypatch.setattr(settings, "breaker_min_calls", 2)
+    monkeypatch.setattr(settings, "breaker_failure_rate", 0.5)
+    calls = []
+
+    async def failing(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        calls.append(query)
+        raise RuntimeError("upstream down")
+
+    guarded = GuardedSource("PubMed", failing)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await guarded("metformin")
+    with pytest.raises(CircuitOpenError):
+        await guarded("metformin")
+    assert len(calls) == 2
+    assert guarded.stats()["limiter"]["inflight"] == 0
+
+
+async def test_unavailable_source_is_reported_as_such():
+    async def rejected() -> SourcePage:
+        raise CircuitOpenError("PubMed circuit is open")
+
+    _, statuses = await gather_sources({"PubMed": rejected}, deadline=1.0)
+    assert [status.status for status in statuses] == ["unavailable"]
+
+
+@pytest.mark.parametrize("endpoint", [routes.upstream_stats, routes.cache_stats])
+async def test_admin_endpoints_need_the_debug_token(monkeypatch, endpoint):
+    monkeypatch.setattr(settings, "debug_token", "s3cret")
+    for token in (None, "wrong"):
+        with pytest.raises(HTTPException) as excinfo:
+            await endpoint(token)
+        assert excinfo.value.status_code == 403
+    assert "sources" in await endpoint("s3cret")
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import pytest
+
+from app import routes
+from app.config import settings
+from app.models.records import StudyRecord
+from app.models.schemas import SourceStatus
+from app.services.cache import TieredCache, TTLCache
+from app.services.paging import SourcePage
+
+
+def source(name: str, titles: list[str], delay: float):
+    async def search(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        await asyncio.sleep(delay)
+        return SourcePage([StudyRecord(title=title, source=name) for title in titles])
+
+    return search
+
+
+async def fake_stream_summary(query: str, studies: list[StudyRecord]):
+    for delta in ("Metformin lowers HbA1c. ", "Evidence is consistent."):
+        yield delta, "llm"
+
+
+SOURCES = ("PubMed", "ClinicalTrials", "EuropePMC", "OpenAlex")
+FAKE_PAGES = {
+    "PubMed": source("PubMed", ["Shared trial", "PubMed only"], 0.06),
+    "ClinicalTrials": source("ClinicalTrials", ["NCT study"], 0.0),
+    "EuropePMC": source("EuropePMC", ["Shared trial"], 0.02),
+    "OpenAlex": source("OpenAlex", [], 0.04),
+}
+
+
+@pytest.fixture
+def fake_sources(monkeypatch, connectors):
+    async def correct(q: str, corrected: str | None = None) -> tuple[str, str]:
+        return q, ""
+
+    monkeypatch.setattr(routes, "_correct", correct)
+    monkeypatch.setattr(routes, "_search_cache", TieredCache([TTLCache("memory", 10, 60)]))
+    monkeypatch.setattr(routes, "stream_summary", fake_stream_summary)
+    connectors(FAKE_PAGES)
+
+
+async def frames(events) -> list[dict]:
+    return [json.loads(frame) async for frame in events]
+
+
+async def test_stream_frames_arrive_in_completion_order(fake_sources):
+    result = await frames(routes._search_events("metformin", 10, 20, SOURCES))
+    assert [frame["event"] for frame in result] == [
+        "correction",
+        "studies",
+        "studies",
+        "studies",
+        "studies",
+        "ranked",
+        "summary_delta",
+        "summary_delta",
+        "summary",
+    ]
+    studies = [(frame["source"], [s["title"] for s in frame["studies"]]) for frame in result[1:5]]
+    # Sources in the order they answered; a duplicate is only sent the first time
+    assert studies == [
+        ("ClinicalTrials", ["NCT study"]),
+        ("EuropePMC", ["Shared trial"]),
+        ("OpenAlex", []),
+        ("PubMed", ["PubMed only"]),
+    ]
+    assert len(result[5]["studies"]) == 3
+    assert result[-1]["summary"] == "Metformin lowers HbA1c. Evidence is consistent."
+    assert result[-1]["summary_kind"] == "llm"
+    assert result[-1]["total_results"] == 3
+
+
+async def test_ranked_frame_is_trimmed_to_top_k(fake_sources):
+    result = await frames(routes._search_events("metformin", 10, 2, SOURCES))
+    ranked = next(frame for frame in result if frame["event"] == "ranked")
+    assert len(ranked["studies"]) == 2
+    assert result[-1]["total_results"] == 2
+
+
+async def test_cached_stream_is_replayed_without_deltas(fake_sources):
+    await frames(routes._search_events("metformin", 10, 20, SOURCES))
+    replay = await frames(routes._search_events("Metformin", 10, 20, SOURCES))
+    assert [frame["event"] for frame in replay] == ["correction"] + ["studies"] * 4 + ["ranked", "summary"]
+    assert replay[-1]["summary"] == "Metformin lowers HbA1c. Evidence is consistent."
+
+
+async def test_failed_source_sends_an_empty_frame(fake_sources, connectors):
+    async def failing(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        raise RuntimeError("upstream down")
+
+    connectors({**FAKE_PAGES, "OpenAlex": failing})
+    result = await frames(routes._search_events("metformin", 10, 20, SOURCES))
+    openalex = [frame for frame in result if frame.get("source") == "OpenAlex"]
+    assert [(frame["status"], frame["studies"]) for frame in openalex] == [("error", [])]
+    assert result[-1]["event"] == "summary"
+
+
+async def test_stream_reports_sources_past_the_deadline(fake_sources, monkeypatch):
+    monkeypatch.setattr(settings, "search_deadline", 0.03)
+    result = await frames(routes._search_events("metformin", 10, 20, SOURCES))
+    statuses = {frame["source"]: frame["status"] for frame in result if frame["event"] == "studies"}
+    assert statuses == {
+        "ClinicalTrials": "ok",
+        "EuropePMC": "ok",
+        "OpenAlex": "timeout",
+        "PubMed": "timeout",
+    }
+    # A partial result is not cached, so the next request searches again
+    replay = await frames(routes._search_events("metformin", 10, 20, SOURCES))
+    assert "summary_delta" in [frame["event"] for frame in replay]
+    # Let the cancelled calls unwind before the loop closes
+    await asyncio.sleep(0.01)
+
+
+def test_cached_results_round_trip_through_the_persistent_format():
+    result = {
+        "studies": [StudyRecord(title="Metformin trial", source="PubMed", pmid="1")],
+        "summary": "Metformin lowers HbA1c.",
+        "summary_kind": "llm",
+        "source_status": [SourceStatus(source="PubMed", status="ok", result_count=1)],
+        "cursors": {"PubMed": "10"},
+    }
+    assert routes._deserialize_result(routes._serialize_result(result)) == result
+    # Entries in the older format live under keys this version never builds
+    key = routes._search_cache_key("metformin", 10, sources=routes.registry.select())
+    assert key.startswith(f"v{routes.SEARCH_CACHE_VERSION}:")
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.models.records import StudyRecord
+from app.services.paging import SourcePage
+from app.services.source_cache import SourceCache
+
+
+class Connector:
+    """Returns one study titled after the call number, or nothing when ``empty``."""
+
+    def __init__(self, empty: bool = False) -> None:
+        self.calls = 0
+        self.empty = empty
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        self.calls += 1
+        call = self.calls
+        await self.release.wait()
+        if self.empty:
+            return SourcePage()
+        return SourcePage([StudyRecord(title=f"{query}{cursor} v{call}", source="PubMed")], f"{cursor}+")
+
+
+def titles(page: SourcePage) -> list[str]:
+    return [study.title for study in page.studies]
+
+
+async def test_fresh_entries_are_served_from_the_cache():
+    connector = Connector()
+    cache = SourceCache("PubMed", connector, ttl=60, stale_ttl=60, max_size=10)
+    assert titles(await cache("Metformin")) == ["Metformin v1"]
+    # Keyed on the normalized query, max_results and cursor
+    assert titles(await cache("  metformin ")) == ["Metformin v1"]
+    assert titles(await cache("metformin", 20)) == ["metformin v2"]
+    page = await cache("metformin", 10, "+")
+    assert (titles(page), page.next_cursor) == (["metformin+ v3"], "++")
+    assert connector.calls == 3
+
+
+async def test_stale_entry_is_served_while_one_refresh_runs():
+    connector = Connector()
+    cache = SourceCache("PubMed", connector, ttl=0, stale_ttl=60, max_size=10)
+    await cache("metformin")
+    connector.release.clear()
+    assert titles(await cache("metformin")) == ["metformin v1"]
+    await asyncio.sleep(0)
+    # Served stale again; the refresh already in flight is not repeated
+    assert titles(await cache("metformin")) == ["metformin v1"]
+    connector.release.set()
+    await asyncio.sleep(0.01)
+    assert connector.calls == 2
+    assert cache.stats()["stale_hits"] == 2
+    assert cache.stats()["refreshing"] == 0
+    assert titles(await cache("metformin")) == ["metformin v2"]
+    await asyncio.sleep(0.01)
+
+
+async def test_entries_past_the_stale_window_are_reloaded():
+    connector = Connector()
+    cache = SourceCache("PubMed", connector, ttl=0, stale_ttl=0, max_size=10)
+    await cache("metformin")
+    assert titles(await cache("metformin")) == ["metformin v2"]
+    assert cache.stats()["stale_hits"] == 0
+
+
+async def test_only_entries_within_the_ttl_are_fresh():
+    cache = SourceCache("PubMed", Connector(), ttl=60, stale_ttl=60, max_size=10)
+    assert not cache.is_fresh("metformin")
+    await cache("metformin")
+    assert cache.is_fresh(" Metformin ")
+    assert not cache.is_fresh("metformin", 20)
+    stale = SourceCache("PubMed", Connector(), ttl=0, stale_ttl=60, max_size=10)
+    await stale("metformin")
+    assert not stale.is_fresh("metformin")
+    assert cache.stats()["hits"] == 0
+
+
+async def test_failures_are_not_cached_but_empty_results_are():
+    connector = Connector(empty=True)
+    cache = SourceCache("PubMed", connector, ttl=60, stale_ttl=60, max_size=10)
+    assert await cache("metformin") == SourcePage()
+    assert await cache("metformin") == SourcePage()
+    assert connector.calls == 1
+
+    async def failing(query: str, max_results: int = 10, cursor: str = "") -> SourcePage:
+        raise RuntimeError("upstream down")
+
+    cache = SourceCache("PubMed", failing, ttl=60, stale_ttl=60, max_size=10)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await cache("metformin")
+    assert cache.stats()["size"] == 0
+
+
+async def test_concurrent_misses_share_one_call():
+    connector = Connector()
+    connector.release.clear()
+    cache = SourceCache("PubMed", connector, ttl=60, stale_ttl=60, max_size=10)
+    pending = asyncio.gather(cache("metformin"), cache("metformin"))
+    await asyncio.sleep(0)
+    connector.release.set()
+    first, second = await pending
+    assert titles(first) == titles(second) == ["metformin v1"]
+    assert connector.calls == 1
@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app import routes
+from app.config import settings
+from app.services import spellcheck
+from app.services.cache import SingleFlight, TTLCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_dictionary(monkeypatch):
+    monkeypatch.setattr(spellcheck, "_corrections", TTLCache("spell", 100, 60))
+    monkeypatch.setattr(spellcheck, "_flight", SingleFlight())
+    monkeypatch.setattr(spellcheck, "_term_fixes", {})
+    monkeypatch.setattr(spellcheck, "_known_terms", set())
+    monkeypatch.setattr(spellcheck, "_stats", dict.fromkeys(spellcheck._stats, 0))
+
+
+@pytest.fixture
+def espell(monkeypatch):
+    """Answer ESpell from a {query: correction} map and record the queries sent."""
+    answers: dict[str, str] = {}
+    sent: list[str] = []
+
+    async def ncbi_get(path, params, lane, timeout):
+        sent.append(params["term"])
+        corrected = answers.get(params["term"], "")
+        body = f"<eSpellResult><CorrectedQuery>{corrected}</CorrectedQuery></eSpellResult>"
+        return SimpleNamespace(content=body.encode())
+
+    monkeypatch.setattr(spellcheck, "ncbi_get", ncbi_get)
+    return SimpleNamespace(answers=answers, sent=sent)
+
+
+def test_learn_records_only_changed_terms():
+    spellcheck._learn("metformn and diabetes", "metformin and diabetes")
+    assert spellcheck._term_fixes == {"metformn": "metformin"}
+    assert spellcheck._known_terms == {"metformin"}
+
+
+def test_learn_skips_misaligned_corrections():
+    spellcheck._learn("heart atack", "heart attack risk")
+    assert spellcheck._term_fixes == {}
+    assert spellcheck._known_terms == set()
+
+
+def test_learn_stops_at_the_dictionary_limit(monkeypatch):
+    monkeypatch.setattr(settings, "spell_dictionary_max", 2)
+    spellcheck._learn("aa bb cc", "ax bx cx")
+    assert len(spellcheck._known_terms) + len(spellcheck._term_fixes) == 2
+
+
+async def test_correction_is_learned_and_reused_for_new_queries(espell):
+    espell.answers["metformn diabetes"] = "metformin diabetes"
+    assert await spellcheck.correct_query("metformn diabetes") == "metformin diabetes"
+    assert spellcheck.cached_correction("Metformn") == "metformin"
+    assert spellcheck.cached_correction("metformn metformin") == "metformin metformin"
+    assert await spellcheck.correct_query("metformin") == "metformin"
+    # "diabetes" was left alone by ESpell, so it is not known to be correct
+    assert spellcheck.cached_correction("diabetes metformn") is None
+    assert espell.sent == ["metformn diabetes"]
+    assert spellcheck.spell_stats()["learned_fixes"] == 1
+
+
+async def test_uncorrected_query_is_cached_but_not_learned(espell):
+    # ESpell has no suggestion for a misspelling it does not know
+    assert await spellcheck.correct_query("asprin") == "asprin"
+    assert spellcheck._known_terms == set()
+    assert spellcheck.cached_correction("asprin") == "asprin"
+    assert spellcheck.cached_correction("asprin dose") is None
+
+
+async def test_cache_checked_skips_the_local_lookup(espell):
+    assert spellcheck.cached_correction("metformn") is None
+    espell.answers["metformn"] = "metformin"
+    assert await spellcheck.correct_query("metformn", cache_checked=True) == "metformin"
+    assert spellcheck.spell_stats()["misses"] == 1
+
+
+async def test_concurrent_lookups_share_one_call(espell):
+    espell.answers["metformn"] = "metformin"
+    results = await asyncio.gather(*(spellcheck.correct_query("metformn") for _ in range(3)))
+    assert results == ["metformin"] * 3
+    assert espell.sent == ["metformn"]
+
+
+async def test_espell_failure_returns_the_query_uncached(monkeypatch):
+    async def ncbi_get(path, params, lane, timeout):
+        raise RuntimeError("NCBI down")
+
+    monkeypatch.setattr(spellcheck, "ncbi_get", ncbi_get)
+    assert await spellcheck.correct_query("metformn") == "metformn"
+    assert spellcheck.cached_correction("metformn") is None
+
+
+def test_load_dictionary_seeds_terms(tmp_path):
+    path = tmp_path / "fixes.json"
+    path.write_text('{"Metformn": "Metformin"}')
+    spellcheck._load_dictionary(str(path))
+    assert spellcheck.cached_correction("metformn") == "metformin"
+
+
+@pytest.fixture
+def speculative(monkeypatch):
+    """Speculative mode with ESpell answering after the search has started."""
+    corrections: dict[str, str] = {}
+    searched: list[str] = []
+
+    async def correct_query(q: str, *, cache_checked: bool = False) -> str:
+        await asyncio.sleep(0.01)
+        return corrections.get(q, q)
+
+    async def fetch(
+        search_query: str,
+        max_results: int,
+        summarize: bool = True,
+        detail: str = "full",
+        *,
+        sources: tuple[str, ...],
+    ) -> dict:
+        searched.append(search_query)
+        await asyncio.sleep(0.02)
+        return {
+            "studies": [],
+            "summary": search_query,
+            "summary_kind": "llm",
+            "source_status": [],
+            "cursors": {},
+        }
+
+    monkeypatch.setattr(settings, "spellcheck_mode", "speculative")
+    monkeypatch.setattr(routes, "correct_query", correct_query)
+    monkeypatch.setattr(routes, "_fetch_evidence", fetch)
+    monkeypatch.setattr(routes, "_search_cache", None)
+    monkeypatch.setattr(routes, "_speculation", {"kept": 0, "discarded": 0})
+    return SimpleNamespace(corrections=corrections, searched=searched)
+
+
+async def test_speculative_search_is_kept_when_espell_has_no_correction(speculative):
+    response = await routes._run_search("metformin", 10, 20, None, sources=routes.registry.select())
+    assert response.summary == "metformin"
+    assert speculative.searched == ["metformin"]
+    assert routes._speculation == {"kept": 1, "discarded": 0}
+
+
+async def test_speculative_search_is_replaced_by_a_correction(speculative):
+    speculative.corrections["metformn"] = "metformin"
+    response = await routes._run_search("metformn", 10, 20, None, sources=routes.registry.select())
+    assert (response.summary, response.corrected_query) == ("metformin", "metformin")
+    assert speculative.searched == ["metformn", "metformin"]
+    assert routes._speculation == {"kept": 0, "discarded": 1}
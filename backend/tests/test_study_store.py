@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from app import routes
+from app.config import settings
+from app.models.records import StudyRecord
+from app.services.study_store import StudyStore
+
+
+@pytest.fixture
+def store():
+    store = StudyStore(":memory:")
+    yield store
+    store.close()
+
+
+async def test_search_matches_every_word_and_ranks_title_hits_first(store):
+    await store.upsert(
+        [
+            StudyRecord(title="Cohort of adults", abstract="Metformin lowered HbA1c.", source="PubMed", pmid="1"),
+            StudyRecord(title="Metformin and HbA1c", source="OpenAlex", doi="10.1/b"),
+            StudyRecord(title="Statins and stroke", source="PubMed", pmid="3"),
+        ]
+    )
+    assert [s.title for s in await store.search("metformin hba1c", 10)] == [
+        "Metformin and HbA1c",
+        "Cohort of adults",
+    ]
+    # Operators and punctuation in user input are matched literally
+    assert await store.search('metformin OR "stroke', 10) == []
+    assert await store.search("!!", 10) == []
+
+
+async def test_a_study_seen_under_another_identifier_merges_into_its_row(store):
+    await store.upsert([StudyRecord(title="Metformin trial", source="PubMed", pmid="1", doi="10.1/a")])
+    await store.upsert(
+        [StudyRecord(title="Metformin trial", abstract="Longer abstract.", source="OpenAlex", pmid="1")]
+    )
+    assert store.stats()["studies"] == 1
+    (study,) = await store.search("metformin", 10)
+    assert study.doi == "10.1/a"
+    assert study.abstract == "Longer abstract."
+
+
+async def test_an_updated_study_is_reindexed(store):
+    await store.upsert([StudyRecord(title="Metformin trial", source="PubMed", pmid="1")])
+    await store.upsert(
+        [StudyRecord(title="Metformin trial", abstract="Dapagliflozin arm.", source="OpenAlex", pmid="1")]
+    )
+    assert len(await store.search("metformin", 10)) == 1
+    assert [s.pmid for s in await store.search("dapagliflozin", 10)] == ["1"]
+
+
+async def test_remember_records_when_a_query_was_answered_upstream(store):
+    store.remember([StudyRecord(title="Metformin trial", source="PubMed", pmid="1")])
+    store.remember([], query="  Metformin ")
+    while store.stats()["pending_writes"]:
+        await asyncio.sleep(0.01)
+    assert await store.fetched_at("metformin") is not None
+    assert await store.fetched_at("statins") is None
+    assert store.stats()["stored"] == 1
+
+
+@pytest.fixture
+def local_search(monkeypatch, store):
+    refreshed: list[str] = []
+
+    async def correct(q: str, corrected: str | None = None) -> tuple[str, str]:
+        return q, ""
+
+    async def summarize(query: str, studies: list[StudyRecord]) -> tuple[str, str]:
+        return f"{len(studies)} studies", "llm"
+
+    monkeypatch.setattr(routes, "_correct", correct)
+    monkeypatch.setattr(routes, "_study_store", store)
+    monkeypatch.setattr(routes, "_search_cache", None)
+    monkeypatch.setattr(routes, "summarize_studies", summarize)
+    monkeypatch.setattr(routes, "_refresh_local", lambda query, max_results: refreshed.append(query))
+    monkeypatch.setattr(settings, "local_min_results", 2)
+    return refreshed
+
+
+async def test_local_mode_answers_from_the_store_and_refreshes_stale_queries(store, local_search):
+    await store.upsert(
+        [
+            StudyRecord(title="Metformin trial", source="PubMed", pmid="1"),
+            StudyRecord(title="Metformin cohort", source="OpenAlex", pmid="2"),
+        ]
+    )
+    response = await routes._run_search("metformin", 10, 20, "local", sources=routes.registry.select())
+    assert response.sources_queried == [routes.LOCAL_SOURCE]
+    assert response.total_results == 2
+    assert response.summary == "2 studies"
+    # Never fetched upstream, so a background refresh was started
+    assert local_search == ["metformin"]
+
+    await asyncio.to_thread(store._mark_fetched, "metformin")
+    await routes._run_search("metformin", 10, 20, "local", sources=routes.registry.select())
+    assert local_search == ["metformin"]
+
+
+async def test_local_mode_falls_through_with_too_few_matches(monkeypatch, store, local_search):
+    await store.upsert([StudyRecord(title="Metformin trial", source="PubMed", pmid="1")])
+
+    async def live(
+        search_query: str,
+        max_results: int,
+        summarize: bool = True,
+        detail: str = "full",
+        *,
+        sources: tuple[str, ...],
+    ) -> dict:
+        return {"studies": [], "summary": "live", "summary_kind": "llm", "source_status": [], "cursors": {}}
+
+    monkeypatch.setattr(routes, "_fetch_evidence", live)
+    response = await routes._run_search("metformin", 10, 20, "local", sources=routes.registry.select())
+    assert response.summary == "live"
+    assert local_search == []
@@ -0,0 +1,190 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.models.records import StudyRecord
+from app.services import summarizer
+from app.services.cache import SingleFlight, TTLCache
+from app.services.summarizer import EXTRACTIVE, LLM, SYSTEM_PROMPT
+
+ABSTRACT = (
+    "BACKGROUND: Metformin is the first-line therapy for type 2 diabetes in adults. "
+    "METHODS: We enrolled 1,200 adults in a randomized controlled trial over two years. "
+    "RESULTS: Metformin reduced HbA1c by 1.1 percentage points compared with placebo. "
+    "CONCLUSIONS: Metformin remains effective and well tolerated in this population."
+)
+
+
+def study(i: int, abstract: str = ABSTRACT, source: str = "PubMed") -> StudyRecord:
+    return StudyRecord(title=f"Metformin trial {i}", source=source, pmid=str(i), abstract=abstract)
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # The tokenizer's encoding files may not be downloadable; use the estimate
+    monkeypatch.setattr(summarizer, "_encoding", lambda: None)
+    monkeypatch.setattr(summarizer, "_summary_cache", TTLCache("summary", 100, 60))
+    monkeypatch.setattr(summarizer, "_summary_flight", SingleFlight())
+    monkeypatch.setattr(settings, "summary_fallback", "extractive")
+
+
+def test_prompt_fits_the_token_budget(monkeypatch):
+    monkeypatch.setattr(settings, "summary_prompt_tokens", 600)
+    message = summarizer._build_user_message("metformin", [study(i, ABSTRACT * 5) for i in range(40)])
+    assert summarizer.count_tokens(SYSTEM_PROMPT + message) <= 600
+    assert "1. [PubMed] Metformin trial 0" in message
+    assert "Studies found (40 total)" in message
+
+
+def test_prompt_keeps_rank_order_and_caps_studies(monkeypatch):
+    monkeypatch.setattr(settings, "summary_prompt_tokens", 100_000)
+    message = summarizer._build_user_message("metformin", [study(i) for i in range(40)])
+    assert message.index("Metformin trial 0\n") < message.index("Metformin trial 1\n")
+    assert "25. [PubMed] Metformin trial 24" in message
+    assert "Metformin trial 25" not in message
+
+
+async def test_tokenizer_is_loaded_off_the_event_loop(monkeypatch):
+    threads: list[int] = []
+    monkeypatch.setattr(summarizer, "_encoding", lambda: threads.append(threading.get_ident()))
+    await summarizer.load_tokenizer()
+    assert threads and threads[0] != threading.get_ident()
+
+
+async def test_prompt_is_built_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    monkeypatch.setattr(settings, "offload_mode", "thread")
+    threads: list[int] = []
+    build = summarizer._build_user_message
+
+    def build_user_message(query: str, studies: list[StudyRecord]) -> str:
+        threads.append(threading.get_ident())
+        return build(query, studies)
+
+    async def complete(query: str, user_message: str) -> str:
+        assert "Metformin trial 1" in user_message
+        return "An LLM summary."
+
+    monkeypatch.setattr(summarizer, "_build_user_message", build_user_message)
+    monkeypatch.setattr(summarizer, "_complete", complete)
+    assert await summarizer.summarize_studies("metformin", [study(1)]) == ("An LLM summary.", LLM)
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_truncate_cuts_at_a_sentence_end_when_near():
+    snippet = summarizer._truncate(ABSTRACT, 60)
+    assert summarizer.count_tokens(snippet) <= 60
+    assert snippet.endswith("over two years.")
+    assert summarizer._truncate(ABSTRACT, 1000) == ABSTRACT
+
+
+def test_truncate_falls_back_to_a_word_boundary():
+    snippet = summarizer._truncate("word " * 100, 10)
+    assert snippet == "word " * 7 + "word…"
+
+
+def test_abstracts_are_cut_to_the_per_study_cap(monkeypatch):
+    monkeypatch.setattr(settings, "summary_prompt_tokens", 100_000)
+    monkeypatch.setattr(settings, "summary_study_tokens", 40)
+    message = summarizer._build_user_message("metformin", [study(1, ABSTRACT * 3)])
+    snippet = message.split("\n   ", 1)[1].split("\n\n")[0]
+    assert summarizer.count_tokens(snippet) <= 40
+
+
+def test_extractive_summary_prefers_findings():
+    summary = summarizer.extractive_summary(
+        "metformin HbA1c", [study(1), study(2, source="OpenAlex")]
+    )
+    assert summary.startswith("2 studies found (1 PubMed, 1 OpenAlex).")
+    assert "reduced HbA1c" in summary
+    assert "BACKGROUND" not in summary
+
+
+def test_extractive_summary_without_usable_sentences_names_the_top_study():
+    summary = summarizer.extractive_summary("metformin", [study(1, abstract="")])
+    assert summary == '1 studies found (1 PubMed). Most relevant: "Metformin trial 1".'
+
+
+async def test_no_api_key_gives_the_extractive_summary(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "")
+    summary, kind = await summarizer.summarize_studies("metformin", [study(1)])
+    assert kind == EXTRACTIVE
+    assert summary.startswith("1 studies found")
+    assert summarizer.is_cacheable(kind)
+
+
+async def test_fallback_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "")
+    monkeypatch.setattr(settings, "summary_fallback", "off")
+    assert await summarizer.summarize_studies("metformin", [study(1)]) == ("", None)
+    assert await summarizer.summarize_studies("metformin", []) == ("", None)
+
+
+async def test_failed_completion_falls_back_without_caching(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    answers = ["", "An LLM summary."]
+
+    async def complete(query: str, user_message: str) -> str:
+        return answers.pop(0)
+
+    monkeypatch.setattr(summarizer, "_complete", complete)
+    summary, kind = await summarizer.summarize_studies("metformin", [study(1)])
+    assert kind == EXTRACTIVE
+    assert not summarizer.is_cacheable(kind)
+    # The next request tries the LLM again, and its answer is cached
+    assert await summarizer.summarize_studies("metformin", [study(1)]) == ("An LLM summary.", LLM)
+    assert await summarizer.summarize_studies("metformin", [study(1)]) == ("An LLM summary.", LLM)
+    assert answers == []
+
+
+class FakeStream:
+    def __init__(self, deltas: list[str]) -> None:
+        self.deltas = deltas
+        self.closed = False
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for delta in self.deltas:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def fake_client(stream: FakeStream) -> SimpleNamespace:
+    async def create(**kwargs):
+        return stream
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+async def test_stream_yields_llm_deltas_and_closes(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    stream = FakeStream(["Metformin ", "works."])
+    monkeypatch.setattr(summarizer, "_get_client", lambda: fake_client(stream))
+    parts = [part async for part in summarizer.stream_summary("metformin", [study(1)])]
+    assert parts == [("Metformin ", LLM), ("works.", LLM)]
+    assert stream.closed
+
+
+async def test_stream_closed_when_the_consumer_leaves(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    stream = FakeStream(["Metformin ", "works."])
+    monkeypatch.setattr(summarizer, "_get_client", lambda: fake_client(stream))
+    parts = summarizer.stream_summary("metformin", [study(1)])
+    assert await anext(parts) == ("Metformin ", LLM)
+    await parts.aclose()
+    assert stream.closed
+
+
+async def test_empty_stream_falls_back_to_extractive(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    stream = FakeStream([])
+    monkeypatch.setattr(summarizer, "_get_client", lambda: fake_client(stream))
+    parts = [part async for part in summarizer.stream_summary("metformin", [study(1)])]
+    assert [kind for _, kind in parts] == [EXTRACTIVE]
+    assert stream.closed
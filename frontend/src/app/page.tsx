@@ -92,6 +92,7 @@ export default function HomePage() {
           <>
             <SummaryCard
               summary={results.summary}
+              summaryKind={results.summary_kind}
               sourcesQueried={results.sources_queried}
               totalResults={results.total_results}
             />
@@ -1,13 +1,16 @@
-import { Sparkles } from "lucide-react";
+import { Quote, Sparkles } from "lucide-react";
+import type { SearchResponse } from "@/lib/api";
 
 interface SummaryCardProps {
   summary: string;
+  summaryKind: SearchResponse["summary_kind"];
   sourcesQueried: string[];
   totalResults: number;
 }
 
 export default function SummaryCard({
   summary,
+  summaryKind,
   sourcesQueried,
   totalResults,
 }: SummaryCardProps) {
@@ -15,14 +18,34 @@ export default function SummaryCard({
     return null;
   }
 
+  // Only an LLM summary is labeled as AI; anything else is shown as quoted excerpts
+  const isAI = summaryKind === "llm";
+
   return (
-    <div className="w-full max-w-3xl mx-auto rounded-xl border border-blue-100 bg-blue-50 p-6 shadow-sm">
+    <div
+      className={`w-full max-w-3xl mx-auto rounded-xl border p-6 shadow-sm ${
+        isAI ? "border-blue-100 bg-blue-50" : "border-gray-200 bg-gray-50"
+      }`}
+    >
       <div className="flex items-center gap-2 mb-3">
-        <Sparkles className="h-5 w-5 text-blue-600" />
-        <h2 className="text-sm font-semibold text-blue-900 uppercase tracking-wide">
-          AI Evidence Summary
+        {isAI ? (
+          <Sparkles className="h-5 w-5 text-blue-600" />
+        ) : (
+          <Quote className="h-5 w-5 text-gray-600" />
+        )}
+        <h2
+          className={`text-sm font-semibold uppercase tracking-wide ${
+            isAI ? "text-blue-900" : "text-gray-900"
+          }`}
+        >
+          {isAI ? "AI Evidence Summary" : "Key Excerpts from Top Studies"}
         </h2>
       </div>
+      {!isAI && (
+        <p className="mb-2 text-xs text-gray-500">
+          Sentences quoted from the highest-ranked abstracts. Not an AI summary.
+        </p>
+      )}
       <p className="text-gray-800 text-base leading-relaxed">{summary}</p>
       <div className="mt-4 flex flex-wrap items-center gap-3 text-xs text-gray-500">
         <span>{totalResults} studies found</span>
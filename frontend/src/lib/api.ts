@@ -15,6 +15,8 @@ export interface SearchResponse {
   total_results: number;
   studies: Study[];
   summary: string;
+  // "extractive": sentences quoted from the top abstracts, not AI-generated
+  summary_kind: "llm" | "extractive" | null;
   sources_queried: string[];
 }
 